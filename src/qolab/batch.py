@@ -0,0 +1,383 @@
+from __future__ import annotations
+
+import datetime as dt
+import json
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from .evaluation.aggregation import WeightProfile
+from .evaluation.judge import JUDGE_MAX_TOKENS, JUDGE_SYSTEM_PROMPT, build_judge_prompt, parse_judge_response
+from .evaluation.rubric import JudgeRubric, load_rubric
+from .generation.budget import BudgetGuard, DEFAULT_PRICING, max_tokens_for_words
+from .generation.client import DEFAULT_JUDGE_MODEL, DEFAULT_MAX_TOKENS, DEFAULT_MODEL
+from .logging.run_store import create_run_dir, results_filename, write_run
+from .logging.schemas import RunMetadata, RunResults, SampleRecord
+from .pipeline import (
+    TEMPERATURES,
+    apply_relevance,
+    build_case_config,
+    build_case_description,
+    build_prompts,
+    build_run_metadata,
+    build_sample_record,
+    build_variants,
+    ensure_single_case,
+    finalize_scores,
+    load_case,
+    load_keywords,
+    load_suite,
+    render_summary_markdown,
+    score_heuristics,
+)
+from .report import stats_from_results, write_stats
+from .utils.io import dump_json, load_json, loads_json
+
+
+# Offline sweeps through the provider's batch API. A run moves through
+# phases recorded in state.json: "generation" -> "judge" (with --use-judge)
+# -> "done". Every API call is followed by a state write, so `resume` can be
+# run from a fresh process at any point and continues where the last one
+# stopped. What a step is about to create (the uploaded input file, the run
+# path) is saved before the step, so a step interrupted halfway is finished
+# on resume instead of being repeated: no second batch is paid for and no
+# second run directory appears. Request/response files are kept next to the
+# state for auditing.
+STATE_VERSION = 1
+BATCH_ENDPOINT = "/v1/chat/completions"
+COMPLETION_WINDOW = "24h"
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+# batch requests are billed at half the synchronous price
+BATCH_PRICE_FACTOR = 0.5
+
+
+def _save_state(state_path: Path, state: Dict[str, Any]) -> None:
+    tmp = state_path.with_name(state_path.name + ".tmp")
+    dump_json(tmp, state)
+    tmp.replace(state_path)
+
+
+def _write_jsonl(path: Path, rows: List[Dict[str, Any]]) -> None:
+    with path.open("w", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+
+def _request(custom_id: str, body: Dict[str, Any]) -> Dict[str, Any]:
+    return {"custom_id": custom_id, "method": "POST", "url": BATCH_ENDPOINT, "body": body}
+
+
+def create_batch_run(
+    case_path: str,
+    suite_path: str,
+    batch_dir: str | Path,
+    runs_dir: str = "runs",
+    use_judge: bool = False,
+    model: str | None = None,
+    judge_model: str | None = None,
+    rubric_path: str | None = None,
+    repeats: int = 1,
+    compact: bool = False,
+    compression: str | None = None,
+    pricing: Dict[str, Dict[str, float]] | None = None,
+) -> Path:
+    # pricing: synchronous list prices (see load_pricing); the batch discount is applied on top
+    case_data = load_case(case_path)
+    ensure_single_case(case_data, "batch runs")
+    suite_data = load_suite(suite_path)
+    case = build_case_config(case_data)
+    variants = build_variants(suite_data)
+    model = model or DEFAULT_MODEL
+    judge_model = judge_model or DEFAULT_JUDGE_MODEL
+    metadata = build_run_metadata(case_data, suite_data, model, judge_model, use_judge)
+
+    batch_dir = Path(batch_dir) / metadata.run_id
+    batch_dir.mkdir(parents=True, exist_ok=True)
+    max_tokens = max_tokens_for_words(case.constraints.get("max_words"), DEFAULT_MAX_TOKENS)
+    cells = []
+    requests = []
+    for i, variant in enumerate(variants):
+        user_prompt, _ = build_prompts(case, variant)
+        for temp in TEMPERATURES:
+            for repeat in range(repeats):
+                custom_id = f"gen-{len(cells)}"
+                cells.append({"custom_id": custom_id, "variant_index": i, "temperature": temp, "repeat": repeat})
+                requests.append(
+                    _request(
+                        custom_id,
+                        {
+                            "model": model,
+                            "messages": [
+                                {"role": "system", "content": variant.system_prompt},
+                                {"role": "user", "content": user_prompt},
+                            ],
+                            "temperature": temp,
+                            "max_tokens": max_tokens,
+                        },
+                    )
+                )
+    _write_jsonl(batch_dir / "generation.jsonl", requests)
+
+    state = {
+        "version": STATE_VERSION,
+        "phase": "generation",
+        "metadata": metadata.model_dump(),
+        "keywords": load_keywords(case.keywords_file) if case.keywords_file else [],
+        "rubric": asdict(load_rubric(rubric_path or "configs/rubrics/judge_rubric_v1.json")) if use_judge else None,
+        "options": {
+            "runs_dir": str(Path(runs_dir).resolve()),
+            "model": model,
+            "judge_model": judge_model,
+            "use_judge": use_judge,
+            "compact": compact,
+            "compression": compression,
+            "pricing": pricing or DEFAULT_PRICING,
+        },
+        "cells": cells,
+        "batches": {},
+        "samples": [],
+        "failed": {},
+        "results": None,
+        "run_path": None,
+    }
+    state_path = batch_dir / "state.json"
+    _save_state(state_path, state)
+    return state_path
+
+
+def _submit(client: Any, state_path: Path, state: Dict[str, Any], phase: str) -> None:
+    # The input file id is saved before the batch is created. A process that
+    # died after creating the batch but before saving its id then finds the
+    # batch by that file instead of submitting (and paying for) another one.
+    # Dying between upload and save only leaves an unused file behind.
+    batch_dir = state_path.parent
+    batch = state["batches"].setdefault(phase, {"status": "uploading"})
+    if batch.get("input_file_id") is None:
+        with (batch_dir / f"{phase}.jsonl").open("rb") as f:
+            batch["input_file_id"] = client.files.create(file=f, purpose="batch").id
+        batch["status"] = "submitting"
+        _save_state(state_path, state)
+    remote = _find_batch(client, batch["input_file_id"]) or client.batches.create(
+        input_file_id=batch["input_file_id"],
+        endpoint=BATCH_ENDPOINT,
+        completion_window=COMPLETION_WINDOW,
+        metadata={"qolab_phase": phase, "qolab_run": batch_dir.name},
+    )
+    batch.update(id=remote.id, status=remote.status, submitted_at=dt.datetime.utcnow().isoformat())
+
+
+def _find_batch(client: Any, input_file_id: str) -> Any:
+    # a batch created moments ago is among the most recent ones
+    for remote in client.batches.list(limit=100).data:
+        if remote.input_file_id == input_file_id:
+            return remote
+    return None
+
+
+def _read_jsonl(path: Path) -> List[Dict[str, Any]]:
+    return [loads_json(line) for line in path.read_bytes().splitlines() if line.strip()]
+
+
+def _download(client: Any, file_id: str | None, path: Path) -> List[Dict[str, Any]]:
+    # kept on disk so a resumed process re-ingests without downloading again
+    if file_id is None:
+        return []
+    if not path.exists():
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_bytes(client.files.content(file_id).read())
+        tmp.replace(path)
+    return _read_jsonl(path)
+
+
+def _results_by_id(
+    client: Any, batch_dir: Path, phase: str, batch: Dict[str, Any]
+) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, str]]:
+    # successful response bodies and error messages, keyed by custom_id
+    rows = _download(client, batch.get("output_file_id"), batch_dir / f"{phase}_output.jsonl")
+    rows += _download(client, batch.get("error_file_id"), batch_dir / f"{phase}_errors.jsonl")
+    bodies: Dict[str, Dict[str, Any]] = {}
+    errors: Dict[str, str] = {}
+    for row in rows:
+        response = row.get("response") or {}
+        if row.get("error") or response.get("status_code") != 200:
+            error = row.get("error") or response.get("body", {}).get("error") or {}
+            errors[row["custom_id"]] = error.get("message") or f"status {response.get('status_code')}"
+        else:
+            bodies[row["custom_id"]] = response["body"]
+    return bodies, errors
+
+
+def _content(body: Dict[str, Any]) -> str:
+    return body["choices"][0]["message"].get("content") or ""
+
+
+def _record_usage(guard: BudgetGuard, model: str, body: Dict[str, Any]) -> None:
+    usage = body.get("usage") or {}
+    reservation = guard.reserve(model, 0, 0)
+    guard.settle(reservation, int(usage.get("prompt_tokens") or 0), int(usage.get("completion_tokens") or 0))
+
+
+def _ingest_generation(state: Dict[str, Any], bodies: Dict[str, Any], errors: Dict[str, str]) -> None:
+    metadata = state["metadata"]
+    case = build_case_config(metadata["case"])
+    variants = build_variants(metadata["suite"])
+    samples = []
+    for cell in state["cells"]:
+        custom_id = cell["custom_id"]
+        if custom_id not in bodies:
+            state["failed"][custom_id] = errors.get(custom_id, "no result returned")
+            continue
+        output = _content(bodies[custom_id])
+        variant = variants[cell["variant_index"]]
+        _, full_prompt = build_prompts(case, variant)
+        heuristics_scores = score_heuristics(output, case.constraints, state["keywords"])
+        record = build_sample_record(
+            variant.name, cell["temperature"], full_prompt, output, heuristics_scores, None, repeat=cell["repeat"]
+        )
+        samples.append({"custom_id": custom_id, "record": record.model_dump()})
+    state["samples"] = samples
+
+
+def _write_judge_requests(state: Dict[str, Any], batch_dir: Path) -> None:
+    metadata = state["metadata"]
+    case = build_case_config(metadata["case"])
+    rubric = JudgeRubric(**state["rubric"])
+    case_description = build_case_description(case)
+    requests = []
+    for sample in state["samples"]:
+        prompt = build_judge_prompt(
+            rubric, case_description, case.constraints, state["keywords"], sample["record"]["output_text"]
+        )
+        requests.append(
+            _request(
+                sample["custom_id"].replace("gen-", "judge-", 1),
+                {
+                    "model": state["options"]["judge_model"],
+                    "messages": [
+                        {"role": "system", "content": JUDGE_SYSTEM_PROMPT},
+                        {"role": "user", "content": prompt},
+                    ],
+                    "temperature": 0.0,
+                    "max_tokens": JUDGE_MAX_TOKENS,
+                },
+            )
+        )
+    _write_jsonl(batch_dir / "judge.jsonl", requests)
+
+
+def _ingest_judge(state: Dict[str, Any], bodies: Dict[str, Any], errors: Dict[str, str]) -> None:
+    for sample in state["samples"]:
+        custom_id = sample["custom_id"].replace("gen-", "judge-", 1)
+        if custom_id in bodies:
+            sample["record"]["scores"]["judge"] = parse_judge_response(_content(bodies[custom_id]))
+        else:
+            # same shape as an unparseable judge reply; the sample keeps its heuristic score
+            sample["record"]["scores"]["judge"] = {
+                **parse_judge_response(""),
+                "judge_error": f"batch request failed: {errors.get(custom_id, 'no result returned')}",
+            }
+
+
+def _finalize(state: Dict[str, Any], usage: BudgetGuard) -> Path:
+    # writes to the run path reserved in the state, so finishing twice overwrites one run
+    options = state["options"]
+    results = RunResults(metadata=state["metadata"])
+    results.samples = [SampleRecord(**s["record"]) for s in state["samples"]]
+    if state["failed"]:
+        results.metadata.stopped_reason = (
+            f"{len(state['failed'])} of {len(state['cells'])} generation requests failed in the batch"
+        )
+    results.metadata.usage = usage.summary()
+    apply_relevance(results.samples, build_case_config(results.metadata.case))
+    finalize_scores(
+        results.samples, used_judge=options["use_judge"], weights=WeightProfile.from_case(results.metadata.case)
+    )
+    results_path = write_run(results, state["run_path"], compact=options["compact"])
+    write_stats(results_path, stats_from_results(results))
+    render_summary_markdown(results_path)
+    return results_path
+
+
+def _usage(state: Dict[str, Any], batch_dir: Path) -> BudgetGuard:
+    # rebuilt from the saved output files so it survives restarts
+    list_prices = state["options"].get("pricing") or DEFAULT_PRICING
+    pricing = {m: {k: v * BATCH_PRICE_FACTOR for k, v in price.items()} for m, price in list_prices.items()}
+    guard = BudgetGuard(pricing=pricing)
+    for phase, model in (("generation", state["options"]["model"]), ("judge", state["options"]["judge_model"])):
+        path = batch_dir / f"{phase}_output.jsonl"
+        if path.exists():
+            for row in _read_jsonl(path):
+                body = (row.get("response") or {}).get("body") or {}
+                if body.get("usage"):
+                    _record_usage(guard, model, body)
+    return guard
+
+
+def advance(state_path: str | Path, client: Any) -> Dict[str, Any]:
+    # Performs at most one step (submit, poll, or ingest + next phase) and
+    # returns the updated state.
+    state_path = Path(state_path)
+    batch_dir = state_path.parent
+    state = load_json(state_path)
+    phase = state["phase"]
+    if phase == "done":
+        return state
+
+    batch = state["batches"].get(phase)
+    if batch is None or "id" not in batch:
+        _submit(client, state_path, state, phase)
+        _save_state(state_path, state)
+        return state
+
+    if batch["status"] not in TERMINAL_STATUSES:
+        remote = client.batches.retrieve(batch["id"])
+        batch.update(
+            status=remote.status,
+            output_file_id=getattr(remote, "output_file_id", None),
+            error_file_id=getattr(remote, "error_file_id", None),
+        )
+        _save_state(state_path, state)
+        if batch["status"] not in TERMINAL_STATUSES:
+            return state
+
+    # expired batches still return the requests that finished in time
+    bodies, errors = _results_by_id(client, batch_dir, phase, batch)
+    if phase == "generation":
+        _ingest_generation(state, bodies, errors)
+        if state["options"]["use_judge"] and state["samples"]:
+            _write_judge_requests(state, batch_dir)
+            state["phase"] = "judge"
+            _save_state(state_path, state)
+            return state
+    else:
+        _ingest_judge(state, bodies, errors)
+    if state.get("run_path") is None:
+        metadata = RunMetadata(**state["metadata"])
+        run_dir = create_run_dir(state["options"]["runs_dir"], metadata)
+        state["metadata"] = metadata.model_dump()
+        state["run_path"] = str(run_dir / results_filename(state["options"]["compression"]))
+        _save_state(state_path, state)
+    state["results"] = str(_finalize(state, _usage(state, batch_dir)))
+    state["phase"] = "done"
+    _save_state(state_path, state)
+    return state
+
+
+def resume(
+    state_path: str | Path,
+    client: Any,
+    wait: bool = False,
+    poll_interval: float = 60.0,
+) -> Dict[str, Any]:
+    # advances until the run is done or waiting on the provider; with `wait`
+    # keeps polling until done
+    while True:
+        state = advance(state_path, client)
+        if state["phase"] == "done":
+            return state
+        batch = state["batches"].get(state["phase"])
+        if batch is not None and batch["status"] not in TERMINAL_STATUSES:
+            if not wait:
+                return state
+            time.sleep(poll_interval)
@@ -1,17 +1,94 @@
 from __future__ import annotations
 
 import argparse
+from contextlib import ExitStack
 from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable
 
-from rich.console import Console
+if TYPE_CHECKING:
+    from rich.console import Console
 
-from .pipeline import run_experiment, render_summary_markdown
 
+# Heavy modules (pipeline, pydantic, rich, openai) are imported inside the
+# commands so that `qolab report` and `qolab run --dry-run` start quickly.
+_console: "Console | None" = None
 
-console = Console()
+
+def get_console() -> "Console":
+    global _console
+    if _console is None:
+        from rich.console import Console
+
+        _console = Console()
+    return _console
+
+
+def _add_metrics_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--metrics-file",
+        default=None,
+        help="Periodically write progress counters here in OpenMetrics text format",
+    )
+    parser.add_argument(
+        "--metrics-interval",
+        type=float,
+        default=10.0,
+        help="Seconds between --metrics-file updates",
+    )
+
+
+def _observe(metrics: Any, args: argparse.Namespace, live: bool) -> ExitStack:
+    from .logging.metrics import MetricsFileWriter
+
+    stack = ExitStack()
+    if args.metrics_file:
+        stack.enter_context(MetricsFileWriter(metrics, args.metrics_file, args.metrics_interval))
+    if live:
+        from .progress import LiveProgress
+
+        stack.enter_context(LiveProgress(metrics, get_console()))
+    return stack
+
+
+def _add_profile_arguments(parser: argparse.ArgumentParser) -> None:
+    from .profiling import DEFAULT_SAMPLE_INTERVAL, PROFILE_MODES
+
+    parser.add_argument(
+        "--profile",
+        choices=PROFILE_MODES,
+        default=None,
+        help="Profile the command and write the profile next to its results "
+        "(sampling is cheap enough to leave on; cprofile is exact but slows Python code down)",
+    )
+    parser.add_argument(
+        "--profile-interval",
+        type=float,
+        default=DEFAULT_SAMPLE_INTERVAL,
+        help="Seconds between stack samples with --profile sampling",
+    )
+
+
+def _profiled(args: argparse.Namespace, command: Callable[[argparse.Namespace], "Path | None"]) -> None:
+    # the command returns the file it wrote; the profile goes into its directory
+    from .profiling import make_profiler, render_profile
+
+    profiler = make_profiler(args.profile, args.profile_interval)
+    profiler.start()
+    try:
+        written = command(args)
+    finally:
+        profiler.stop()
+    report = profiler.save(Path(written).parent if written else Path.cwd())
+    console = get_console()
+    render_profile(report, console)
+    for path in report.files:
+        console.print(f"[green]Saved profile:[/green] {path}")
 
 
 def build_parser() -> argparse.ArgumentParser:
+    from .dataset import DEFAULT_ROWS_IN_FLIGHT
+    from .generation.hedging import DEFAULT_TIMEOUT
+
     parser = argparse.ArgumentParser(prog="qolab", description="AI Output Quality Lab CLI")
     subparsers = parser.add_subparsers(dest="command", required=True)
 
@@ -48,20 +125,392 @@ def build_parser() -> argparse.ArgumentParser:
         default=None,
         help="Path to judge rubric JSON",
     )
+    run_parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="Store prompts and responses in a deduplicated blob table without indentation",
+    )
+    run_parser.add_argument(
+        "--compress",
+        choices=["gzip", "zstd"],
+        default=None,
+        help="Compress results (zstd requires the 'zstandard' package)",
+    )
+    run_parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream generations and abort as soon as max_words or a banned phrase is violated",
+    )
+    run_parser.add_argument(
+        "--repeats",
+        type=int,
+        default=1,
+        help="Samples per variant × temperature cell",
+    )
+    run_parser.add_argument(
+        "--rows-in-flight",
+        type=int,
+        default=DEFAULT_ROWS_IN_FLIGHT,
+        help="For dataset cases, how many rows are generated concurrently",
+    )
+    run_parser.add_argument(
+        "--request-timeout",
+        type=float,
+        default=DEFAULT_TIMEOUT,
+        help="Seconds each generation or judge request may take",
+    )
+    run_parser.add_argument(
+        "--hedge",
+        action="store_true",
+        help="Send a duplicate request when a call is slower than the recent p95 and keep the first answer",
+    )
+    run_parser.add_argument(
+        "--deadline",
+        type=float,
+        default=None,
+        help="Seconds for the whole run; after that the remaining samples are generated but not judged",
+    )
+    run_parser.add_argument(
+        "--endpoints",
+        default=None,
+        help="JSON file of endpoint pools per model (keys, OpenAI-compatible base URLs, weights) to balance "
+        "and fail over between",
+    )
+    run_parser.add_argument(
+        "--queue",
+        default=None,
+        help="Enqueue the cells in this SQLite work queue for `qolab worker` processes instead of running locally",
+    )
+    run_parser.add_argument(
+        "--no-wait",
+        action="store_true",
+        help="With --queue, return after enqueueing; the last worker writes the results",
+    )
+    run_parser.add_argument(
+        "--surrogate",
+        default=None,
+        help="With --use-judge, score samples with this surrogate model and only send likely top-ranked "
+        "or uncertain ones to the real judge (see `qolab surrogate train`)",
+    )
+    run_parser.add_argument(
+        "--triage-margin",
+        type=float,
+        default=1.0,
+        help="Also judge samples predicted within this many held-out errors below the top-N boundary",
+    )
+    run_parser.add_argument(
+        "--no-progress",
+        action="store_true",
+        help="Do not show the live progress view (it is also off when stdout is not a terminal)",
+    )
+    _add_metrics_arguments(run_parser)
+    _add_profile_arguments(run_parser)
+    run_parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="Render every prompt, print estimated tokens and cost per model, and exit",
+    )
+    run_parser.add_argument(
+        "--max-tokens-budget",
+        type=int,
+        default=None,
+        help="Stop the run cleanly once this many tokens (input + output) would be exceeded",
+    )
+    run_parser.add_argument(
+        "--max-cost",
+        type=float,
+        default=None,
+        help="Stop the run cleanly once this cost in USD would be exceeded",
+    )
+    run_parser.add_argument(
+        "--pricing",
+        default=None,
+        help='JSON file of per-model prices, e.g. {"my-model": {"input": 0.4, "output": 1.6}} (USD per 1M tokens)',
+    )
 
     report_parser = subparsers.add_parser("report", help="Regenerate summary from results.json")
-    report_parser.add_argument(
+    report_target = report_parser.add_mutually_exclusive_group(required=True)
+    report_target.add_argument(
         "--run",
-        required=True,
-        help="Path to results.json",
+        help="Path to results.json (compact and compressed runs are detected automatically)",
+    )
+    report_target.add_argument(
+        "--compare",
+        nargs="+",
+        metavar="RUN",
+        help="Compare several runs (results.json files or run directories); the first is the baseline",
+    )
+    report_parser.add_argument(
+        "--output",
+        default=None,
+        help="Where to write the report (default: summary.md next to --run, comparison.md for --compare)",
+    )
+    _add_profile_arguments(report_parser)
+
+    rescore_parser = subparsers.add_parser(
+        "rescore", help="Recompute heuristic and final scores of an existing results.json"
+    )
+    rescore_parser.add_argument("--run", required=True, help="Path to results.json")
+    rescore_parser.add_argument(
+        "--case",
+        default=None,
+        help="Path to case JSON config (defaults to the case stored in the run)",
+    )
+    _add_profile_arguments(rescore_parser)
+
+    score_parser = subparsers.add_parser(
+        "score", help="Score outputs produced elsewhere, one JSON object per line (stdin to stdout by default)"
+    )
+    score_parser.add_argument("--case", required=True, help="Path to case JSON config (constraints and keywords)")
+    score_parser.add_argument("--input", default="-", help="JSONL file to score ('-' for stdin)")
+    score_parser.add_argument("--output", default="-", help="Where to write scored JSONL ('-' for stdout)")
+    score_parser.add_argument("--text-field", default="output_text", help="Field holding the text to score")
+    score_parser.add_argument("--id-field", default="id", help="Field copied to the output to identify records")
+    score_parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Scoring processes (default: one per CPU; 1 scores in this process)",
+    )
+    score_parser.add_argument("--chunk-size", type=int, default=512, help="Records per unit of work")
+    score_parser.add_argument(
+        "--unordered",
+        action="store_true",
+        help="Write chunks as they finish instead of in input order (records keep their line number and id)",
+    )
+    score_parser.add_argument("--use-judge", action="store_true", help="Also score every record with the LLM judge")
+    score_parser.add_argument("--judge-model", default=None, help="Judge model name")
+    score_parser.add_argument("--rubric", default=None, help="Path to judge rubric JSON")
+    score_parser.add_argument("--judge-concurrency", type=int, default=8, help="Judge calls in flight")
+    score_parser.add_argument(
+        "--relevance-idf",
+        default=None,
+        help="Relevance IDF saved by --save-relevance-idf (default: fitted on the input first; required for stdin)",
+    )
+    score_parser.add_argument("--save-relevance-idf", default=None, help="Write the relevance IDF used to this path")
+
+    watch_parser = subparsers.add_parser(
+        "watch", help="Re-evaluate only the affected cells whenever the case, suite, keywords or rubric change"
+    )
+    watch_parser.add_argument("--case", required=True, help="Path to case JSON config")
+    watch_parser.add_argument("--suite", required=True, help="Path to prompt suite JSON")
+    watch_parser.add_argument("--runs-dir", default="runs", help="Directory where the watch run folder is kept")
+    watch_parser.add_argument("--dry-run", action="store_true", help="Use canned outputs instead of the API")
+    watch_parser.add_argument("--use-judge", action="store_true", help="Also run the LLM judge")
+    watch_parser.add_argument("--model", default=None, help="Generator model name")
+    watch_parser.add_argument("--judge-model", default=None, help="Judge model name")
+    watch_parser.add_argument("--rubric", default=None, help="Path to judge rubric JSON")
+    watch_parser.add_argument("--repeats", type=int, default=1, help="Samples per variant × temperature cell")
+    watch_parser.add_argument("--stream", action="store_true", help="Stream generations and abort on violations")
+    watch_parser.add_argument("--interval", type=float, default=1.0, help="Seconds between checks for changes")
+    watch_parser.add_argument("--once", action="store_true", help="Refresh once and exit")
+
+    sensitivity_parser = subparsers.add_parser(
+        "sensitivity",
+        help="How stable are the variant and temperature rankings under other score weightings? (requires numpy)",
+    )
+    sensitivity_parser.add_argument("runs", nargs="+", help="results.json files or run directories")
+    sensitivity_parser.add_argument("--draws", type=int, default=2000, help="Weight vectors to evaluate")
+    sensitivity_parser.add_argument(
+        "--spread",
+        type=float,
+        default=0.5,
+        help="Scale of the weight perturbations (log scale for heuristic weights, logit scale for the judge weight)",
     )
+    sensitivity_parser.add_argument("--seed", type=int, default=0, help="Random seed for the weight draws")
+    sensitivity_parser.add_argument("--output", default=None, help="Write the markdown report here instead of printing it")
+
+    serve_parser = subparsers.add_parser(
+        "serve", help="Run a local job server that keeps configs, clients and caches warm"
+    )
+    serve_parser.add_argument("--host", default="127.0.0.1", help="Interface to bind")
+    serve_parser.add_argument("--port", type=int, default=8765, help="Port to listen on")
+    serve_parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=4,
+        help="Number of jobs processed in parallel",
+    )
+    serve_parser.add_argument("--verbose", action="store_true", help="Log every request")
+
+    surrogate_parser = subparsers.add_parser("surrogate", help="Local surrogate judge (requires numpy)")
+    surrogate_commands = surrogate_parser.add_subparsers(dest="surrogate_command", required=True)
+    train_parser = surrogate_commands.add_parser(
+        "train", help="Fit the surrogate on stored judge scores and report its held-out error"
+    )
+    train_parser.add_argument(
+        "--runs",
+        nargs="+",
+        default=["runs"],
+        help="results.json files or directories searched for them",
+    )
+    train_parser.add_argument("--output", required=True, help="Where to write the model (.npz)")
+    train_parser.add_argument("--folds", type=int, default=5, help="Cross-validation folds / ensemble size")
+    train_parser.add_argument("--dim", type=int, default=2048, help="Hashed n-gram feature dimension")
+    train_parser.add_argument("--alpha", type=float, default=1.0, help="Ridge regularisation strength")
+
+    batch_parser = subparsers.add_parser(
+        "batch", help="Run a sweep through the provider's batch API (cheaper, completes within 24h)"
+    )
+    batch_commands = batch_parser.add_subparsers(dest="batch_command", required=True)
+    submit_parser = batch_commands.add_parser("submit", help="Write and submit the generation batch")
+    submit_parser.add_argument("--case", required=True, help="Path to case JSON config")
+    submit_parser.add_argument("--suite", required=True, help="Path to prompt suite JSON")
+    submit_parser.add_argument("--runs-dir", default="runs", help="Directory where run folders are stored")
+    submit_parser.add_argument(
+        "--batch-dir",
+        default="runs/batches",
+        help="Where request/response files and state.json are kept",
+    )
+    submit_parser.add_argument("--use-judge", action="store_true", help="Judge the outputs in a second batch")
+    submit_parser.add_argument("--model", default=None, help="Generator model name")
+    submit_parser.add_argument("--judge-model", default=None, help="Judge model name")
+    submit_parser.add_argument("--rubric", default=None, help="Path to judge rubric JSON")
+    submit_parser.add_argument("--repeats", type=int, default=1, help="Samples per variant × temperature cell")
+    submit_parser.add_argument("--compact", action="store_true", help="Store results in the compact format")
+    submit_parser.add_argument("--compress", choices=["gzip", "zstd"], default=None, help="Compress results")
+    submit_parser.add_argument(
+        "--pricing",
+        default=None,
+        help="JSON file of per-model list prices (USD per 1M tokens); the batch discount is applied on top",
+    )
+    resume_parser = batch_commands.add_parser(
+        "resume", help="Poll a submitted batch run and ingest finished phases"
+    )
+    resume_parser.add_argument("--state", required=True, help="Path to the run's state.json")
+    resume_parser.add_argument("--wait", action="store_true", help="Keep polling until the run is done")
+    resume_parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=60.0,
+        help="Seconds between polls with --wait",
+    )
+
+    worker_parser = subparsers.add_parser(
+        "worker", help="Lease and execute cells from a shared work queue (see run --queue)"
+    )
+    worker_parser.add_argument("--queue", required=True, help="Path to the SQLite work queue")
+    worker_parser.add_argument(
+        "--lease-seconds",
+        type=float,
+        default=120.0,
+        help="Lease length; cells of a worker that stops renewing are retried after this long",
+    )
+    worker_parser.add_argument(
+        "--idle-exit",
+        type=float,
+        default=None,
+        help="Exit after the queue has been empty for this many seconds (default: run until interrupted)",
+    )
+    worker_parser.add_argument("--worker-id", default=None, help="Lease owner name (default: host:pid)")
+    _add_metrics_arguments(worker_parser)
 
     return parser
 
 
-def cmd_run(args: argparse.Namespace) -> None:
+def cmd_run(args: argparse.Namespace) -> Path | None:
+    from .generation.budget import BudgetGuard, load_pricing
+    from .logging.metrics import SweepMetrics
+    from .pipeline import run_experiment, render_summary_markdown
+
+    console = get_console()
+    pricing = load_pricing(args.pricing)
+    if args.plan:
+        from .planner import plan_experiment, render_plan
+
+        plan = plan_experiment(
+            case_path=args.case,
+            suite_path=args.suite,
+            use_judge=args.use_judge,
+            model=args.model,
+            judge_model=args.judge_model,
+            rubric_path=args.rubric,
+            pricing=pricing,
+            repeats=args.repeats,
+        )
+        render_plan(plan, console)
+        return None
+
+    if args.queue:
+        return _run_queued(args)
+
+    surrogate = None
+    if args.surrogate:
+        if not args.use_judge:
+            console.print("[red]--surrogate only applies together with --use-judge.[/red]")
+            raise SystemExit(2)
+        from .evaluation.surrogate import SurrogateJudge
+
+        surrogate = SurrogateJudge.load(args.surrogate)
+
+    budget = None
+    if args.max_tokens_budget is not None or args.max_cost is not None:
+        budget = BudgetGuard(args.max_tokens_budget, args.max_cost, pricing)
+
+    endpoints = None
+    if args.endpoints and not args.dry_run:
+        from .generation.endpoints import EndpointPools
+
+        endpoints = EndpointPools.load(args.endpoints)
+
+    metrics = SweepMetrics()
     console.print("[bold]Running experiment...[/bold]")
-    results_path = run_experiment(
+    with _observe(metrics, args, live=console.is_terminal and not args.no_progress):
+        results_path = run_experiment(
+            case_path=args.case,
+            suite_path=args.suite,
+            runs_dir=args.runs_dir,
+            dry_run=args.dry_run,
+            use_judge=args.use_judge,
+            model=args.model,
+            judge_model=args.judge_model,
+            rubric_path=args.rubric,
+            compact=args.compact,
+            compression=args.compress,
+            budget=budget,
+            stream=args.stream,
+            repeats=args.repeats,
+            metrics=metrics,
+            surrogate=surrogate,
+            triage_margin=args.triage_margin,
+            rows_in_flight=args.rows_in_flight,
+            request_timeout=args.request_timeout,
+            hedge=args.hedge,
+            deadline=args.deadline,
+            endpoints=endpoints,
+        )
+    if budget is not None:
+        usage = budget.summary()
+        console.print(
+            f"Usage: {usage['total_tokens']} tokens, ${usage['total_cost_usd']:.4f}"
+        )
+        if budget.exceeded:
+            console.print(f"[yellow]Stopped early, partial results kept:[/yellow] {budget.exceeded}")
+    if endpoints is not None:
+        for model, pool in endpoints.summary().items():
+            for e in pool["endpoints"]:
+                console.print(
+                    f"{model} @ {e['name']}: {e['requests']} calls, {e['errors']} errors, "
+                    f"{e['requests_per_second'] or 0:.2f} calls/s, breaker {e['breaker']}"
+                )
+    console.print(f"[green]Saved results:[/green] {results_path}")
+    summary_path = render_summary_markdown(results_path)
+    console.print(f"[green]Saved summary:[/green] {summary_path}")
+    return results_path
+
+
+def _run_queued(args: argparse.Namespace) -> Path | None:
+    from .workqueue import WorkQueue
+
+    console = get_console()
+    if args.max_tokens_budget is not None or args.max_cost is not None:
+        console.print("[yellow]Budgets are per process and are not enforced for queued runs.[/yellow]")
+    if args.surrogate:
+        console.print("[yellow]Surrogate triage needs the whole run and is ignored for queued runs.[/yellow]")
+    if args.endpoints:
+        console.print("[yellow]Workers use their own OPENAI_API_KEY; --endpoints is ignored for queued runs.[/yellow]")
+    queue = WorkQueue(args.queue)
+    sweep_id = queue.enqueue(
         case_path=args.case,
         suite_path=args.suite,
         runs_dir=args.runs_dir,
@@ -70,27 +519,317 @@ def cmd_run(args: argparse.Namespace) -> None:
         model=args.model,
         judge_model=args.judge_model,
         rubric_path=args.rubric,
+        repeats=args.repeats,
+        stream=args.stream,
+        compact=args.compact,
+        compression=args.compress,
     )
-    console.print(f"[green]Saved results:[/green] {results_path}")
-    summary_path = render_summary_markdown(results_path)
-    console.print(f"[green]Saved summary:[/green] {summary_path}")
+    console.print(f"[bold]Enqueued sweep {sweep_id}[/bold] in {args.queue}")
+    if args.no_wait:
+        return None
+    status = queue.wait(sweep_id)
+    if status["status"] == "failed":
+        raise RuntimeError(f"Sweep {sweep_id} could not be collected: {status['error']}")
+    cells = status["cells"]
+    if cells["failed"]:
+        console.print(f"[yellow]{cells['failed']} cells failed; see the run metadata.[/yellow]")
+    console.print(f"[green]Saved results:[/green] {status['results']}")
+    return Path(status["results"])
+
+
+def cmd_surrogate(args: argparse.Namespace) -> None:
+    from rich.table import Table
+
+    from .evaluation.surrogate import collect_training_samples, train_surrogate
+
+    console = get_console()
+    names = {"results.json", "results.json.gz", "results.json.zst"}
+    paths = []
+    for target in map(Path, args.runs):
+        if target.is_dir():
+            paths.extend(sorted(p for p in target.rglob("results.json*") if p.name in names))
+        else:
+            paths.append(target)
+    samples = collect_training_samples(paths)
+    console.print(f"Training on {len(samples)} judged samples from {len(paths)} runs...")
+    model, report = train_surrogate(samples, folds=args.folds, dim=args.dim, alpha=args.alpha)
+    model.save(args.output)
+
+    table = Table(title=f"Held-out error ({report['folds']}-fold)")
+    for column in ("Category", "RMSE", "MAE", "Baseline RMSE"):
+        table.add_column(column)
+    for name, err in report["errors"].items():
+        table.add_row(name, f"{err['rmse']:.3f}", f"{err['mae']:.3f}", f"{err['baseline_rmse']:.3f}")
+    console.print(table)
+    console.print(f"[green]Saved surrogate:[/green] {args.output}")
+
+
+def cmd_batch(args: argparse.Namespace) -> None:
+    import os
+
+    from dotenv import load_dotenv
+    from openai import OpenAI
+
+    from .batch import advance, create_batch_run, resume
+    from .generation.budget import load_pricing
+
+    load_dotenv()
+    console = get_console()
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise ValueError("OPENAI_API_KEY is required for batch runs.")
+    client = OpenAI(api_key=api_key)
+    if args.batch_command == "submit":
+        state_path = create_batch_run(
+            case_path=args.case,
+            suite_path=args.suite,
+            batch_dir=args.batch_dir,
+            runs_dir=args.runs_dir,
+            use_judge=args.use_judge,
+            model=args.model,
+            judge_model=args.judge_model,
+            rubric_path=args.rubric,
+            repeats=args.repeats,
+            compact=args.compact,
+            compression=args.compress,
+            pricing=load_pricing(args.pricing),
+        )
+        state = advance(state_path, client)
+        batch = state["batches"]["generation"]
+        console.print(f"[bold]Submitted generation batch[/bold] {batch['id']} ({len(state['cells'])} requests)")
+        console.print(f"Resume with: qolab batch resume --state {state_path}")
+        return
+
+    state = resume(args.state, client, wait=args.wait, poll_interval=args.poll_interval)
+    if state["phase"] == "done":
+        if state["failed"]:
+            console.print(f"[yellow]{len(state['failed'])} generation requests failed; see the run metadata.[/yellow]")
+        console.print(f"[green]Saved results:[/green] {state['results']}")
+        return
+    batch = state["batches"][state["phase"]]
+    console.print(f"{state['phase']} batch {batch['id']}: {batch['status']}")
 
 
-def cmd_report(args: argparse.Namespace) -> None:
+def cmd_worker(args: argparse.Namespace) -> None:
+    from .workqueue import WorkQueue, Worker
+
+    console = get_console()
+    worker = Worker(WorkQueue(args.queue), worker_id=args.worker_id, lease_seconds=args.lease_seconds)
+    console.print(f"[bold]qolab worker[/bold] {worker.worker_id} polling {args.queue}")
+    try:
+        # the queue total is shared by all workers, so there is no per-worker progress bar
+        with _observe(worker.metrics, args, live=False):
+            handled = worker.run(idle_exit=args.idle_exit)
+    except KeyboardInterrupt:
+        console.print("Stopping; leased cells are retried once their lease expires.")
+        return
+    console.print(f"Queue idle, exiting after {handled} tasks.")
+
+
+def cmd_report(args: argparse.Namespace) -> Path:
+    from .report import render_comparison, render_summary
+
+    console = get_console()
     console.print("[bold]Generating report...[/bold]")
+    if args.compare:
+        report_path = render_comparison(args.compare, args.output or "comparison.md")
+        console.print(f"[green]Saved comparison:[/green] {report_path}")
+        return report_path
     results_path = Path(args.run)
+    summary_path = render_summary(results_path, args.output)
+    console.print(f"[green]Saved summary:[/green] {summary_path}")
+    return summary_path
+
+
+def cmd_rescore(args: argparse.Namespace) -> Path:
+    from .pipeline import rescore_run, render_summary_markdown
+
+    console = get_console()
+    console.print("[bold]Rescoring run...[/bold]")
+    results_path = rescore_run(args.run, case_path=args.case)
+    console.print(f"[green]Saved results:[/green] {results_path}")
     summary_path = render_summary_markdown(results_path)
     console.print(f"[green]Saved summary:[/green] {summary_path}")
+    return results_path
+
+
+def cmd_score(args: argparse.Namespace) -> None:
+    import sys
+
+    from rich.console import Console
+
+    from .evaluation.aggregation import WeightProfile
+    from .pipeline import build_case_config, load_case, load_keywords, relevance_query
+    from .scoring import fit_input_idf, score_stream
+
+    # stdout may be the data stream, so all chatter goes to stderr
+    console = Console(stderr=True)
+    case_data = load_case(args.case)
+    case = build_case_config(case_data)
+    keywords = load_keywords(case.keywords_file) if case.keywords_file else []
+
+    judge = None
+    if args.use_judge:
+        import os
+
+        from dotenv import load_dotenv
+        from openai import OpenAI
+
+        from .evaluation.rubric import load_rubric
+        from .generation.client import DEFAULT_JUDGE_MODEL
+        from .pipeline import build_case_description, judge_output
+
+        load_dotenv()
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise ValueError("OPENAI_API_KEY is required when using --use-judge.")
+        judge_client = OpenAI(api_key=api_key)
+        judge_model = args.judge_model or DEFAULT_JUDGE_MODEL
+        rubric = load_rubric(args.rubric or "configs/rubrics/judge_rubric_v1.json")
+        case_desc = build_case_description(case)
+
+        def judge(text: str) -> dict:
+            return judge_output(judge_client, judge_model, rubric, case_desc, case.constraints, keywords, text)
+
+    idf = None
+    if case.constraints.get("relevance"):
+        from .evaluation.relevance import RelevanceIdf
+
+        if args.relevance_idf:
+            idf = RelevanceIdf.load(args.relevance_idf)
+        elif args.input == "-":
+            raise ValueError("Scoring relevance from stdin needs --relevance-idf; stdin cannot be read twice.")
+        else:
+            # a first pass, so every chunk is scored with the IDF of the whole input
+            with open(args.input, encoding="utf-8") as f:
+                idf = fit_input_idf(f, args.text_field)
+        if args.save_relevance_idf:
+            idf.save(args.save_relevance_idf)
+
+    with ExitStack() as stack:
+        source = sys.stdin if args.input == "-" else stack.enter_context(open(args.input, encoding="utf-8"))
+        sink = sys.stdout if args.output == "-" else stack.enter_context(open(args.output, "w", encoding="utf-8"))
+        counts = score_stream(
+            source,
+            sink,
+            case.constraints,
+            keywords,
+            weights=WeightProfile.from_case(case_data),
+            text_field=args.text_field,
+            id_field=args.id_field,
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+            ordered=not args.unordered,
+            judge=judge,
+            judge_concurrency=args.judge_concurrency,
+            relevance_query=relevance_query(case),
+            relevance_idf=idf,
+        )
+    console.print(f"Scored {counts['records']} records ({counts['errors']} unreadable)")
+
+
+def cmd_watch(args: argparse.Namespace) -> None:
+    from dotenv import load_dotenv
+
+    from .watch import Watcher
+
+    load_dotenv()
+    console = get_console()
+    watcher = Watcher(
+        case_path=args.case,
+        suite_path=args.suite,
+        runs_dir=args.runs_dir,
+        dry_run=args.dry_run,
+        use_judge=args.use_judge,
+        model=args.model,
+        judge_model=args.judge_model,
+        rubric_path=args.rubric,
+        repeats=args.repeats,
+        stream=args.stream,
+    )
+
+    def report(counts: dict) -> None:
+        when = f"{counts['at']} " if "at" in counts else ""
+        console.print(
+            f"{when}{counts['cells']} cells: {counts['generated']} generated, "
+            f"{counts['judged']} judged, {counts['reused']} reused "
+            f"({counts['seconds']:.1f}s) -> {counts['summary']}"
+        )
+
+    if args.once:
+        report(watcher.refresh())
+        return
+    console.print(f"Watching {', '.join(str(p) for p in watcher.watched_paths())} (Ctrl+C to stop)")
+    try:
+        watcher.run(
+            interval=args.interval,
+            on_refresh=report,
+            on_error=lambda exc: console.print(f"[red]Refresh failed:[/red] {exc}"),
+        )
+    except KeyboardInterrupt:
+        console.print("Stopped watching.")
+
+
+def cmd_sensitivity(args: argparse.Namespace) -> None:
+    from .sensitivity import analyze, render_sensitivity
+
+    console = get_console()
+    text = render_sensitivity(analyze(args.runs, draws=args.draws, spread=args.spread, seed=args.seed))
+    if args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+        console.print(f"[green]Saved sensitivity report:[/green] {args.output}")
+    else:
+        from rich.markdown import Markdown
+
+        console.print(Markdown(text))
+
+
+def cmd_serve(args: argparse.Namespace) -> None:
+    from .server import make_server
+
+    console = get_console()
+    server = make_server(args.host, args.port, concurrency=args.concurrency, verbose=args.verbose)
+    host, port = server.server_address[:2]
+    console.print(
+        f"[bold]qolab serve[/bold] listening on http://{host}:{port} "
+        f"(concurrency={args.concurrency}); relative paths resolve against {Path.cwd()}"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        console.print("Shutting down...")
+    finally:
+        server.server_close()
+        server.service.shutdown(wait=False)
 
 
 def main(argv: list[str] | None = None) -> None:
     parser = build_parser()
     args = parser.parse_args(argv)
 
-    if args.command == "run":
+    profiled = {"run": cmd_run, "report": cmd_report, "rescore": cmd_rescore}
+    if getattr(args, "profile", None):
+        _profiled(args, profiled[args.command])
+    elif args.command == "run":
         cmd_run(args)
     elif args.command == "report":
         cmd_report(args)
+    elif args.command == "rescore":
+        cmd_rescore(args)
+    elif args.command == "score":
+        cmd_score(args)
+    elif args.command == "watch":
+        cmd_watch(args)
+    elif args.command == "sensitivity":
+        cmd_sensitivity(args)
+    elif args.command == "serve":
+        cmd_serve(args)
+    elif args.command == "worker":
+        cmd_worker(args)
+    elif args.command == "surrogate":
+        cmd_surrogate(args)
+    elif args.command == "batch":
+        cmd_batch(args)
     else:
         parser.error(f"Unknown command {args.command}")
 
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+import random
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .utils.io import open_binary
+
+# Dataset-driven cases. Instead of one task, a case can point at a JSONL or
+# CSV file (optionally gzip/zstd compressed) whose rows fill the variant
+# templates next to the case fields:
+#
+#   "dataset": {"path": "data/tickets.jsonl", "id_field": "ticket_id",
+#               "sample": 500, "stratify": "category", "seed": 0}
+#
+# Rows are read lazily. Subsampling is a single pass of per-stratum reservoir
+# sampling, so it holds at most `sample` rows per stratum whatever the file
+# size, and the chosen rows come out in file order.
+DEFAULT_ROWS_IN_FLIGHT = 4
+
+
+@dataclass
+class DatasetSpec:
+    path: str
+    id_field: Optional[str] = None
+    sample: Optional[int] = None
+    stratify: Optional[str] = None
+    seed: int = 0
+
+    @classmethod
+    def from_case(cls, case_data: Dict[str, Any]) -> Optional["DatasetSpec"]:
+        data = case_data.get("dataset")
+        if not data:
+            return None
+        if isinstance(data, str):
+            data = {"path": data}
+        spec = cls(
+            path=data["path"],
+            id_field=data.get("id_field"),
+            sample=data.get("sample"),
+            stratify=data.get("stratify"),
+            seed=int(data.get("seed", 0)),
+        )
+        if spec.sample is not None and spec.sample < 1:
+            raise ValueError("dataset.sample must be a positive number of rows.")
+        if spec.stratify and spec.sample is None:
+            raise ValueError("dataset.stratify needs dataset.sample.")
+        return spec
+
+
+def _format(path: Path) -> str:
+    suffixes = [s for s in path.suffixes if s not in (".gz", ".zst")]
+    suffix = suffixes[-1] if suffixes else ""
+    if suffix in (".jsonl", ".ndjson"):
+        return "jsonl"
+    if suffix in (".csv", ".tsv"):
+        return suffix[1:]
+    raise ValueError(f"Unsupported dataset format for {path}; expected .jsonl, .ndjson, .csv or .tsv.")
+
+
+def iter_rows(path: str | Path) -> Iterator[Dict[str, Any]]:
+    path = Path(path)
+    kind = _format(path)
+    with open_binary(path) as raw, io.TextIOWrapper(raw, encoding="utf-8", newline="") as text:
+        if kind == "jsonl":
+            for lineno, line in enumerate(text, start=1):
+                if not line.strip():
+                    continue
+                row = json.loads(line)
+                if not isinstance(row, dict):
+                    raise ValueError(f"{path}:{lineno}: expected a JSON object per line.")
+                yield row
+        else:
+            yield from csv.DictReader(text, delimiter="\t" if kind == "tsv" else ",")
+
+
+def stratified_sample(
+    rows: Iterable[Tuple[int, Dict[str, Any]]],
+    size: int,
+    stratify: Optional[str] = None,
+    seed: int = 0,
+) -> Tuple[List[Tuple[int, Dict[str, Any]]], int]:
+    # (index, row) pairs -> (chosen pairs in index order, rows seen). Strata
+    # get shares proportional to their size (largest remainder); each keeps a
+    # uniform reservoir of up to `size` rows to draw its share from.
+    rng = random.Random(seed)
+    reservoirs: Dict[Any, List[Tuple[int, Dict[str, Any]]]] = {}
+    seen: Dict[Any, int] = {}
+    for item in rows:
+        stratum = item[1].get(stratify) if stratify else None
+        if isinstance(stratum, (dict, list)):
+            stratum = json.dumps(stratum, sort_keys=True)
+        n = seen.get(stratum, 0) + 1
+        seen[stratum] = n
+        reservoir = reservoirs.setdefault(stratum, [])
+        if len(reservoir) < size:
+            reservoir.append(item)
+        else:
+            j = rng.randrange(n)
+            if j < size:
+                reservoir[j] = item
+    total = sum(seen.values())
+    if total <= size:
+        chosen = [item for reservoir in reservoirs.values() for item in reservoir]
+    else:
+        quotas = {s: size * n / total for s, n in seen.items()}
+        shares = {s: int(q) for s, q in quotas.items()}
+        leftover = size - sum(shares.values())
+        for s in sorted(quotas, key=lambda s: quotas[s] - shares[s], reverse=True)[:leftover]:
+            shares[s] += 1
+        chosen = [item for s, reservoir in reservoirs.items() for item in rng.sample(reservoir, shares[s])]
+    chosen.sort(key=lambda item: item[0])
+    return chosen, total
+
+
+def dataset_rows(spec: DatasetSpec) -> Tuple[Iterator[Tuple[str, Dict[str, Any]]], Optional[int]]:
+    # (row_id, row) pairs and, when subsampling, the number of rows in the
+    # file (the unsampled stream is lazy and its length unknown up front)
+    indexed = enumerate(iter_rows(spec.path), start=1)
+
+    def row_id(index: int, row: Dict[str, Any]) -> str:
+        if spec.id_field and row.get(spec.id_field) not in (None, ""):
+            return str(row[spec.id_field])
+        return str(index)
+
+    if spec.sample is None:
+        return ((row_id(i, row), row) for i, row in indexed), None
+    chosen, total = stratified_sample(indexed, spec.sample, spec.stratify, spec.seed)
+    return iter([(row_id(i, row), row) for i, row in chosen]), total
@@ -1,12 +1,65 @@
 from __future__ import annotations
 
-from typing import Dict, Any
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
 
+# relevance is opt-in per case and counts as 0 where it was not scored
+HEURISTIC_SCORES = (
+    "length_fit",
+    "structure",
+    "keyword_coverage",
+    "clarity",
+    "repetition",
+    "brand_voice",
+    "relevance",
+)
+DEFAULT_JUDGE_WEIGHT = 0.6
 
-def compute_final_score(sample: Dict[str, Any], used_judge: bool) -> float:
-    heuristics_total = float(sample["scores"]["heuristics"]["total_heuristics"])
+
+# How a case combines its scores, from the optional "weights" block of the
+# case config, e.g. {"judge": 0.5, "heuristics": {"length_fit": 2}}. Heuristic
+# weights multiply the sub-scores (unlisted ones count once), so the default
+# profile reproduces total_heuristics exactly.
+@dataclass(frozen=True)
+class WeightProfile:
+    judge: float = DEFAULT_JUDGE_WEIGHT
+    heuristics: Dict[str, float] = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        if not 0.0 <= self.judge <= 1.0:
+            raise ValueError(f"Judge weight must be between 0 and 1, got {self.judge}.")
+        unknown = sorted(set(self.heuristics) - set(HEURISTIC_SCORES))
+        if unknown:
+            raise ValueError(f"Unknown heuristic weights: {', '.join(unknown)}.")
+
+    @classmethod
+    def from_case(cls, case_data: Dict[str, Any]) -> "WeightProfile":
+        weights = case_data.get("weights") or {}
+        return cls(
+            judge=float(weights.get("judge", DEFAULT_JUDGE_WEIGHT)),
+            heuristics={k: float(v) for k, v in (weights.get("heuristics") or {}).items()},
+        )
+
+    def heuristics_weights(self) -> Dict[str, float]:
+        return {name: self.heuristics.get(name, 1.0) for name in HEURISTIC_SCORES}
+
+    def heuristics_total(self, heuristics: Mapping) -> float:
+        if not self.heuristics:
+            return float(heuristics["total_heuristics"])
+        return sum(w * float(heuristics.get(name, 0)) for name, w in self.heuristics_weights().items())
+
+
+DEFAULT_PROFILE = WeightProfile()
+
+
+def compute_final_score(
+    sample: Dict[str, Any], used_judge: bool, weights: Optional[WeightProfile] = None
+) -> float:
+    weights = weights or DEFAULT_PROFILE
+    heuristics_total = weights.heuristics_total(sample["scores"]["heuristics"])
     judge_data = sample["scores"].get("judge")
-    judge_total = judge_data.get("total_judge") if isinstance(judge_data, dict) else None
+    judge_total = judge_data.get("total_judge") if isinstance(judge_data, Mapping) else None
     if used_judge and judge_total is not None:
-        return 0.6 * float(judge_total) + 0.4 * heuristics_total
+        return weights.judge * float(judge_total) + (1 - weights.judge) * heuristics_total
     return heuristics_total
@@ -88,9 +88,8 @@ def score_repetition(text: str) -> int:
     words = text.lower().split()
     if len(words) < 3:
         return 5
-    trigrams = []
-    for i in range(len(words) - 2):
-        trigrams.append(" ".join(words[i : i + 3]))
+    # split() words hold no spaces, so word tuples are distinct exactly when the joined trigrams are
+    trigrams = list(zip(words, words[1:], words[2:]))
     unique = len(set(trigrams))
     if not trigrams:
         return 5
@@ -1,12 +1,22 @@
 from __future__ import annotations
 
 import json
-from typing import Any, Dict
-
-from openai import OpenAI
+from typing import TYPE_CHECKING, Any, Dict
 
+from ..generation.budget import estimate_chat_tokens, response_usage
+from ..generation.hedging import RequestPolicy
 from .rubric import JudgeRubric
 
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+    from ..generation.budget import BudgetGuard
+    from ..generation.hedging import Deadline
+    from ..logging.metrics import SweepMetrics
+    from ..utils.cache import ResponseCache
+
+
+JUDGE_MAX_TOKENS = 400
 
 JUDGE_SYSTEM_PROMPT = (
     "You are an impartial writing quality judge for LinkedIn posts. "
@@ -91,18 +101,57 @@ def call_judge(
     constraints: Dict[str, Any],
     keywords: list[str],
     output_text: str,
+    cache: "ResponseCache | None" = None,
+    budget: "BudgetGuard | None" = None,
+    metrics: "SweepMetrics | None" = None,
+    policy: RequestPolicy | None = None,
+    deadline: "Deadline | None" = None,
 ) -> Dict[str, Any]:
     user_prompt = build_judge_prompt(rubric, case_description, constraints, keywords, output_text)
-    resp = client.chat.completions.create(
-        model=model,
-        messages=[
-            {"role": "system", "content": JUDGE_SYSTEM_PROMPT},
-            {"role": "user", "content": user_prompt},
-        ],
-        temperature=0.0,
-        max_tokens=400,
-    )
-    raw = resp.choices[0].message.content or ""
+    cache_key = ("judge", model, user_prompt)
+    raw = cache.get(cache_key) if cache is not None else None
+    if cache is not None and metrics is not None:
+        metrics.cache_lookup(raw is not None)
+    if raw is None:
+        input_estimate = estimate_chat_tokens(JUDGE_SYSTEM_PROMPT, user_prompt, model)
+
+        def request(timeout: float) -> str:
+            reservation = None
+            if budget is not None:
+                reservation = budget.reserve(model, input_estimate, JUDGE_MAX_TOKENS)
+            if metrics is not None:
+                metrics.request_started("judge")
+            try:
+                resp = client.chat.completions.create(
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": JUDGE_SYSTEM_PROMPT},
+                        {"role": "user", "content": user_prompt},
+                    ],
+                    temperature=0.0,
+                    max_tokens=JUDGE_MAX_TOKENS,
+                    timeout=timeout,
+                )
+            except Exception:
+                if reservation is not None:
+                    budget.release(reservation)
+                if metrics is not None:
+                    metrics.request_finished("judge", error=True)
+                raise
+            if metrics is not None:
+                metrics.request_finished("judge")
+            text = resp.choices[0].message.content or ""
+            if reservation is not None:
+                budget.settle(reservation, *response_usage(resp, input_estimate, text, model))
+            return text
+
+        raw = (policy or RequestPolicy()).call(request, deadline)
+        if cache is not None:
+            cache.put(cache_key, raw)
+    return parse_judge_response(raw)
+
+
+def parse_judge_response(raw: str) -> Dict[str, Any]:
     try:
         parsed = json.loads(raw)
         scores = parsed.get("scores", {}) or {}
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import re
+import zlib
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+# Is an output about the case at all? Words of the case task and audience and
+# of every output in a run are cut to their first six letters (a crude stem:
+# "forecasting" and "forecasts" meet) and hashed into one feature space,
+# weighted by sublinear TF times IDF fitted on all outputs of the run, and
+# each output scores by its cosine similarity to the case text. The whole run
+# is one sparse product: each distinct word is hashed once, the (document,
+# bucket) counts come from numpy, and the norms and dot products are
+# bincounts, so 100k outputs take a few seconds. Word bigrams and character n-grams were
+# tried too: bigrams only diluted the short query, and character n-grams
+# separate a little better at ~15x the features.
+RELEVANCE_DIM = 1 << 20
+STEM_LENGTH = 6
+# cosine at which the 0-5 score saturates; against their one-sentence task and
+# audience, on-topic outputs of the bundled runs reach 0.06-0.09 and
+# off-topic ones stay under 0.02
+FULL_RELEVANCE = 0.08
+
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+
+def _numpy() -> Any:
+    try:
+        import numpy
+    except ImportError as exc:  # pragma: no cover - depends on the environment
+        raise RuntimeError(
+            "The relevance heuristic needs numpy: pip install 'ai-output-quality-lab[relevance]'"
+        ) from exc
+    return numpy
+
+
+class _TokenHashes(dict):
+    # crc32 of each distinct token's stem, computed on first sight
+    def __missing__(self, token: str) -> int:
+        value = self[token] = zlib.crc32(token[:STEM_LENGTH].encode("utf-8"))
+        return value
+
+
+def _hash_tokens(texts: Sequence[str]) -> Tuple[List[int], List[int]]:
+    hashes = _TokenHashes()
+    flat: List[int] = []
+    lengths: List[int] = []
+    for text in texts:
+        tokens = _TOKEN_RE.findall(text.lower())
+        flat.extend(map(hashes.__getitem__, tokens))
+        lengths.append(len(tokens))
+    return flat, lengths
+
+
+class RelevanceIdf:
+    # Document frequencies of the hashed stems, built up a batch at a time so
+    # the outputs of a whole run can be fitted in one streaming pass and then
+    # scored in chunks or per dataset row with the same IDF. Fitted per
+    # batch instead, an output's score would depend on what it was batched with.
+    def __init__(self, dim: int = RELEVANCE_DIM):
+        np = _numpy()
+        self.dim = dim
+        self.docs = 0
+        self.df = np.zeros(dim, dtype=np.int64)
+        self._idf: Optional["np.ndarray"] = None
+
+    def add(self, texts: Sequence[str]) -> "RelevanceIdf":
+        np = _numpy()
+        if texts:
+            flat, lengths = _hash_tokens(texts)
+            doc = np.repeat(np.arange(len(lengths), dtype=np.int64), lengths)
+            keys = np.unique(doc * self.dim + np.array(flat, dtype=np.int64) % self.dim)
+            self.df += np.bincount(keys % self.dim, minlength=self.dim)
+            self.docs += len(texts)
+            self._idf = None
+        return self
+
+    def idf(self) -> "np.ndarray":
+        np = _numpy()
+        if self._idf is None:
+            self._idf = np.log((1.0 + self.docs) / (1.0 + self.df)) + 1.0
+        return self._idf
+
+    def save(self, path: str | Path) -> None:
+        np = _numpy()
+        buckets = np.flatnonzero(self.df)
+        # a file object, so numpy does not append .npz to the name
+        with Path(path).open("wb") as f:
+            np.savez_compressed(f, dim=self.dim, docs=self.docs, buckets=buckets, counts=self.df[buckets])
+
+    @classmethod
+    def load(cls, path: str | Path) -> "RelevanceIdf":
+        np = _numpy()
+        with np.load(Path(path)) as data:
+            fitted = cls(int(data["dim"]))
+            fitted.docs = int(data["docs"])
+            fitted.df[data["buckets"]] = data["counts"]
+        return fitted
+
+
+def fit_relevance_idf(texts: Iterable[str], batch_size: int = 4096) -> RelevanceIdf:
+    # one pass over any number of texts, holding a batch at a time
+    fitted = RelevanceIdf()
+    batch: List[str] = []
+    for text in texts:
+        batch.append(text)
+        if len(batch) >= batch_size:
+            fitted.add(batch)
+            batch = []
+    return fitted.add(batch)
+
+
+def relevance_similarities(
+    query: str,
+    texts: Sequence[str],
+    dim: int = RELEVANCE_DIM,
+    idf: RelevanceIdf | None = None,
+) -> "np.ndarray":
+    # cosine similarity of every text to the query, in [0, 1]; without a
+    # fitted `idf` the IDF is fitted on `texts`
+    np = _numpy()
+    if not texts:
+        return np.zeros(0)
+    if idf is not None:
+        dim = idf.dim
+    flat, lengths = _hash_tokens([query, *texts])
+    n_docs = len(lengths)
+    buckets = np.array(flat, dtype=np.int64) % dim
+    doc = np.repeat(np.arange(n_docs, dtype=np.int64), lengths)
+    keys, counts = np.unique(doc * dim + buckets, return_counts=True)
+    key_doc, key_bucket = keys // dim, keys % dim
+
+    # IDF is fitted on the outputs only; the query is weighted with it
+    outputs = key_doc > 0
+    if idf is None:
+        df = np.bincount(key_bucket[outputs], minlength=dim)
+        weights = (1.0 + np.log(counts)) * (np.log((1.0 + len(texts)) / (1.0 + df)) + 1.0)[key_bucket]
+    else:
+        weights = (1.0 + np.log(counts)) * idf.idf()[key_bucket]
+
+    query = np.zeros(dim)
+    query[key_bucket[~outputs]] = weights[~outputs]
+    norms = np.sqrt(np.bincount(key_doc, weights=weights * weights, minlength=n_docs))
+    dots = np.bincount(key_doc, weights=weights * query[key_bucket], minlength=n_docs)
+    denom = norms[1:] * norms[0]
+    return np.divide(dots[1:], denom, out=np.zeros(len(texts)), where=denom > 0)
+
+
+def relevance_scores(query: str, texts: Sequence[str], idf: RelevanceIdf | None = None) -> List[int]:
+    # 0-5 like the other heuristics
+    np = _numpy()
+    similarities = relevance_similarities(query, texts, idf=idf)
+    return np.clip(np.rint(5.0 * similarities / FULL_RELEVANCE), 0, 5).astype(int).tolist()
+
+
+def add_relevance(heuristics: Dict[str, Any], score: int) -> Dict[str, Any]:
+    # sets (or replaces) the relevance sub-score, keeping total_heuristics last and in step
+    scores = {k: v for k, v in heuristics.items() if k not in ("relevance", "total_heuristics")}
+    scores["relevance"] = score
+    scores["total_heuristics"] = heuristics["total_heuristics"] - heuristics.get("relevance", 0) + score
+    return scores
@@ -1,10 +1,13 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict, Any, List
+from typing import TYPE_CHECKING, Dict, Any, List
 
 from ..utils.io import load_json
 
+if TYPE_CHECKING:
+    from ..utils.cache import FileCache
+
 
 @dataclass
 class JudgeRubric:
@@ -12,8 +15,8 @@ class JudgeRubric:
     categories: Dict[str, str]
 
 
-def load_rubric(path: str) -> JudgeRubric:
-    data: Dict[str, Any] = load_json(path)
+def load_rubric(path: str, cache: "FileCache | None" = None) -> JudgeRubric:
+    data: Dict[str, Any] = cache.load_json(path) if cache is not None else load_json(path)
     return JudgeRubric(
         instructions=data["instructions"],
         categories=data["categories"],
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import math
+import re
+from typing import Dict, Iterable, Optional, Tuple
+
+from ..utils.text import compile_phrases
+
+
+_WORD_RUN_RE = re.compile(r"\w+")
+_CHUNK_RE = re.compile(r"\S+\s*|\s+")
+
+ABORT_MAX_WORDS = "max_words"
+ABORT_BANNED_PHRASE = "banned_phrase"
+# a stream may run this far past max_words before it is cut: up to 25% over,
+# score_length_fit only drops a point, so the full output would score the same
+# as unstreamed; only clear runaways are aborted
+DEFAULT_WORD_SLACK = 0.25
+
+
+class ConstraintMonitor:
+    # Incremental checks over a streamed completion. feed() returns an abort
+    # reason as soon as a hard constraint can no longer be satisfied: the word
+    # count is past max_words (+ slack) or a banned phrase has been emitted.
+    # word_slack defaults to DEFAULT_WORD_SLACK of max_words.
+    def __init__(
+        self,
+        max_words: Optional[int] = None,
+        banned_phrases: Iterable[str] = (),
+        word_slack: Optional[int] = None,
+    ):
+        if word_slack is None:
+            word_slack = math.ceil(max_words * DEFAULT_WORD_SLACK) if max_words else 0
+        self.max_words = max_words
+        self.word_slack = word_slack
+        self.words = 0
+        self.text = ""
+        self.abort_reason: Optional[str] = None
+        phrases = tuple(p for p in banned_phrases if p)
+        self._pattern = compile_phrases(tuple(p.lower() for p in phrases))
+        self._tail_len = max((len(p) for p in phrases), default=1) - 1
+        self._tail = ""
+        self._in_word = False
+
+    @classmethod
+    def from_constraints(cls, constraints: Dict, word_slack: Optional[int] = None) -> "ConstraintMonitor":
+        return cls(
+            max_words=constraints.get("max_words"),
+            banned_phrases=constraints.get("banned_phrases", []),
+            word_slack=word_slack,
+        )
+
+    def feed(self, chunk: str) -> Optional[str]:
+        if self.abort_reason is not None or not chunk:
+            return self.abort_reason
+        self.text += chunk
+
+        runs = len(_WORD_RUN_RE.findall(chunk))
+        if runs and self._in_word and _WORD_RUN_RE.match(chunk):
+            runs -= 1  # the first run continues a word split across chunks
+        self.words += runs
+        self._in_word = bool(_WORD_RUN_RE.match(chunk[-1]))
+
+        if self._pattern is not None:
+            window = self._tail + chunk.lower()
+            match = self._pattern.search(window)
+            if match:
+                self.abort_reason = f"{ABORT_BANNED_PHRASE}:{match.group()}"
+                return self.abort_reason
+            self._tail = window[-self._tail_len :] if self._tail_len else ""
+
+        # the count never goes down (a partial word can only grow), so once it
+        # is past the limit the constraint is lost for good
+        if self.max_words is not None and self.words > self.max_words + self.word_slack:
+            self.abort_reason = f"{ABORT_MAX_WORDS}:{self.max_words + self.word_slack}"
+        return self.abort_reason
+
+
+def replay(monitor: ConstraintMonitor, text: str) -> Tuple[str, Optional[str]]:
+    # Runs a complete text through the monitor word by word, as if it had been
+    # streamed, and cuts it where the stream would have been aborted.
+    for match in _CHUNK_RE.finditer(text):
+        if monitor.feed(match.group()) is not None:
+            return text[: match.end()], monitor.abort_reason
+    return text, None
+
+
+def apply_abort_penalty(heuristics: Dict[str, int | float], abort_reason: str) -> Dict[str, int | float]:
+    # Aborted outputs are scored on the partial text with the violated
+    # constraint's sub-score forced to 0, so they always rank below an output
+    # that merely ran long or slipped once.
+    scores = dict(heuristics)
+    if abort_reason.startswith(ABORT_MAX_WORDS):
+        scores["length_fit"] = 0
+    elif abort_reason.startswith(ABORT_BANNED_PHRASE):
+        scores["brand_voice"] = 0
+    scores["total_heuristics"] = sum(v for k, v in scores.items() if k != "total_heuristics")
+    return scores
@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import json
+import re
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .aggregation import DEFAULT_JUDGE_WEIGHT
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+# Local stand-in for the LLM judge: ridge regression from heuristic
+# sub-scores plus hashed word uni/bigrams to each judge category. It is
+# trained as a k-fold ensemble, so the out-of-fold predictions give an honest
+# held-out error and the spread between fold models gives a per-sample
+# uncertainty. numpy is only needed for training and triage runs.
+HEURISTIC_FEATURES = ("length_fit", "structure", "keyword_coverage", "clarity", "repetition", "brand_voice")
+DEFAULT_DIM = 2048
+DEFAULT_FOLDS = 5
+DEFAULT_ALPHA = 1.0
+DEFAULT_TRIAGE_MARGIN = 1.0
+DEFAULT_TRIAGE_MAX_STD = 1.5
+
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+
+def _numpy() -> Any:
+    try:
+        import numpy
+    except ImportError as exc:  # pragma: no cover - depends on the environment
+        raise RuntimeError("The surrogate judge needs numpy: pip install 'ai-output-quality-lab[surrogate]'") from exc
+    return numpy
+
+
+def _hashed_ngrams(text: str, dim: int) -> Dict[int, float]:
+    tokens = _TOKEN_RE.findall(text.lower())
+    grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    counts: Dict[int, float] = {}
+    for gram in grams:
+        # crc32 is stable across processes, unlike hash(); the top bit picks the sign
+        h = zlib.crc32(gram.encode("utf-8"))
+        sign = -1.0 if h & 0x80000000 else 1.0
+        counts[h % dim] = counts.get(h % dim, 0.0) + sign
+    return counts
+
+
+def featurize(texts: Sequence[str], heuristics: Sequence[Dict[str, Any]], dim: int = DEFAULT_DIM) -> "np.ndarray":
+    np = _numpy()
+    X = np.zeros((len(texts), len(HEURISTIC_FEATURES) + dim), dtype=np.float64)
+    offset = len(HEURISTIC_FEATURES)
+    for i, (text, scores) in enumerate(zip(texts, heuristics)):
+        for j, name in enumerate(HEURISTIC_FEATURES):
+            X[i, j] = float(scores.get(name, 0)) / 5.0
+        counts = _hashed_ngrams(text, dim)
+        if counts:
+            idx = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+            val = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+            val = np.sign(val) * np.log1p(np.abs(val))
+            X[i, offset + idx] = val / (np.linalg.norm(val) or 1.0)
+    return X
+
+
+def _fit_ridge(X: "np.ndarray", Y: "np.ndarray", alpha: float) -> Tuple["np.ndarray", "np.ndarray"]:
+    np = _numpy()
+    x_mean = X.mean(axis=0)
+    y_mean = Y.mean(axis=0)
+    Xc = X - x_mean
+    Yc = Y - y_mean
+    n, d = Xc.shape
+    if n >= d:
+        W = np.linalg.solve(Xc.T @ Xc + alpha * np.eye(d), Xc.T @ Yc)
+    else:
+        # dual form is cheaper when there are fewer samples than features
+        W = Xc.T @ np.linalg.solve(Xc @ Xc.T + alpha * np.eye(n), Yc)
+    return W, y_mean - x_mean @ W
+
+
+@dataclass
+class SurrogateJudge:
+    categories: List[str]
+    weights: "np.ndarray"  # (folds, features, categories)
+    biases: "np.ndarray"  # (folds, categories)
+    dim: int
+    rmse_total: float
+
+    def predict(
+        self, texts: Sequence[str], heuristics: Sequence[Dict[str, Any]]
+    ) -> Tuple["np.ndarray", "np.ndarray"]:
+        # returns per-category means (n, categories) and the fold spread of the total (n,)
+        np = _numpy()
+        X = featurize(texts, heuristics, self.dim)
+        per_fold = np.clip(np.einsum("nd,kdc->knc", X, self.weights) + self.biases[:, None, :], 0.0, 5.0)
+        return per_fold.mean(axis=0), per_fold.sum(axis=2).std(axis=0)
+
+    def judge_scores(self, prediction: Sequence[float]) -> Dict[str, Any]:
+        # shaped like call_judge's result so aggregation and reports treat it the same
+        scores = {c: round(float(v), 2) for c, v in zip(self.categories, prediction)}
+        return {
+            "checks": None,
+            "scores": scores,
+            "rationales": None,
+            "total_judge": round(sum(scores.values()), 2),
+            "judge_error": None,
+            "raw_judge": "",
+            "source": "surrogate",
+        }
+
+    def save(self, path: str | Path) -> Path:
+        np = _numpy()
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("wb") as f:
+            np.savez_compressed(
+                f,
+                weights=self.weights,
+                biases=self.biases,
+                meta=np.array(
+                    json.dumps({"categories": self.categories, "dim": self.dim, "rmse_total": self.rmse_total})
+                ),
+            )
+        return path
+
+    @classmethod
+    def load(cls, path: str | Path) -> "SurrogateJudge":
+        np = _numpy()
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            return cls(
+                categories=meta["categories"],
+                weights=data["weights"],
+                biases=data["biases"],
+                dim=meta["dim"],
+                rmse_total=meta["rmse_total"],
+            )
+
+
+def collect_training_samples(paths: Iterable[str | Path]) -> List[Dict[str, Any]]:
+    from ..logging.sample_index import iter_sample_fields
+
+    fields = ("output_text", "scores.heuristics", "scores.judge.scores", "scores.judge.source")
+    rows = []
+    for row in iter_sample_fields(list(paths), fields):
+        judged = row["scores.judge.scores"]
+        # never learn from our own predictions
+        if isinstance(judged, dict) and judged and row["scores.judge.source"] != "surrogate":
+            rows.append(row)
+    return rows
+
+
+def train_surrogate(
+    samples: Sequence[Dict[str, Any]],
+    folds: int = DEFAULT_FOLDS,
+    dim: int = DEFAULT_DIM,
+    alpha: float = DEFAULT_ALPHA,
+    seed: int = 0,
+) -> Tuple[SurrogateJudge, Dict[str, Any]]:
+    np = _numpy()
+    categories = list(samples[0]["scores.judge.scores"]) if samples else []
+    usable = [s for s in samples if all(c in s["scores.judge.scores"] for c in categories)]
+    if len(usable) < 2 * folds:
+        raise ValueError(f"Need at least {2 * folds} judged samples to train, found {len(usable)}.")
+    X = featurize([s["output_text"] for s in usable], [s["scores.heuristics"] for s in usable], dim)
+    Y = np.array([[float(s["scores.judge.scores"][c]) for c in categories] for s in usable])
+
+    order = np.random.default_rng(seed).permutation(len(usable))
+    oof = np.zeros_like(Y)
+    weights, biases = [], []
+    for fold in np.array_split(order, folds):
+        train = np.setdiff1d(order, fold)
+        W, b = _fit_ridge(X[train], Y[train], alpha)
+        oof[fold] = np.clip(X[fold] @ W + b, 0.0, 5.0)
+        weights.append(W)
+        biases.append(b)
+
+    def errors(pred: "np.ndarray", truth: "np.ndarray") -> Dict[str, float]:
+        return {
+            "rmse": float(np.sqrt(np.mean((pred - truth) ** 2))),
+            "mae": float(np.mean(np.abs(pred - truth))),
+            "baseline_rmse": float(np.sqrt(np.mean((truth - truth.mean()) ** 2))),
+        }
+
+    report = {c: errors(oof[:, i], Y[:, i]) for i, c in enumerate(categories)}
+    report["total_judge"] = errors(oof.sum(axis=1), Y.sum(axis=1))
+    model = SurrogateJudge(
+        categories=categories,
+        weights=np.stack(weights),
+        biases=np.stack(biases),
+        dim=dim,
+        rmse_total=report["total_judge"]["rmse"],
+    )
+    return model, {"samples": len(usable), "folds": folds, "errors": report}
+
+
+def triage(
+    predicted_final: Sequence[float],
+    spread: Sequence[float],
+    sigma: float,
+    top_n: int,
+    margin: float = DEFAULT_TRIAGE_MARGIN,
+    max_std: Optional[float] = DEFAULT_TRIAGE_MAX_STD,
+    judge_weight: float = DEFAULT_JUDGE_WEIGHT,
+) -> List[bool]:
+    # True = send to the real judge. Samples that could make the reported top
+    # N (predicted at or above the N-th best, or within `margin` held-out
+    # errors below it) and samples the fold models disagree on are judged; the
+    # rest keep the surrogate's scores.
+    if len(predicted_final) <= top_n:
+        return [True] * len(predicted_final)
+    boundary = sorted(predicted_final, reverse=True)[top_n - 1]
+    # a judge error of sigma moves the final score by judge_weight * sigma
+    cutoff = boundary - margin * judge_weight * sigma
+    return [
+        final >= cutoff or (max_std is not None and std > max_std)
+        for final, std in zip(predicted_final, spread)
+    ]
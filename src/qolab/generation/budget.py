@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import itertools
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+from ..utils.io import load_json
+
+
+# USD per 1M tokens (input, output). Override with --pricing for other models
+# or updated list prices.
+DEFAULT_PRICING: Dict[str, Dict[str, float]] = {
+    "gpt-4.1": {"input": 2.00, "output": 8.00},
+    "gpt-4.1-mini": {"input": 0.40, "output": 1.60},
+    "gpt-4.1-nano": {"input": 0.10, "output": 0.40},
+    "gpt-4o": {"input": 2.50, "output": 10.00},
+    "gpt-4o-mini": {"input": 0.15, "output": 0.60},
+}
+
+# chat formatting adds a few tokens per message on top of the content
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# English prose averages ~1.35 tokens per word; max_tokens leaves 30% headroom
+# over the case's word budget so a compliant output is never cut off.
+TOKENS_PER_WORD = 1.35
+MAX_TOKENS_HEADROOM = 1.3
+MIN_MAX_TOKENS = 64
+
+
+class BudgetExceeded(RuntimeError):
+    pass
+
+
+@lru_cache(maxsize=8)
+def _encoder(model: str) -> Any:
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def estimate_tokens(text: str, model: str = "gpt-4.1-mini") -> int:
+    encoder = _encoder(model)
+    if encoder is not None:
+        return len(encoder.encode(text))
+    # ~4 characters per token for English text when tiktoken is not installed
+    return max(1, (len(text) + 3) // 4) if text else 0
+
+
+def estimate_chat_tokens(system_prompt: str, user_prompt: str, model: str = "gpt-4.1-mini") -> int:
+    return (
+        estimate_tokens(system_prompt, model)
+        + estimate_tokens(user_prompt, model)
+        + 2 * MESSAGE_OVERHEAD_TOKENS
+    )
+
+
+def max_tokens_for_words(max_words: int | None, default: int) -> int:
+    if not max_words:
+        return default
+    return max(MIN_MAX_TOKENS, int(max_words * TOKENS_PER_WORD * MAX_TOKENS_HEADROOM) + 1)
+
+
+def load_pricing(path: str | None = None) -> Dict[str, Dict[str, float]]:
+    pricing = dict(DEFAULT_PRICING)
+    if path:
+        pricing.update(load_json(path))
+    return pricing
+
+
+def call_cost(
+    pricing: Dict[str, Dict[str, float]],
+    model: str,
+    input_tokens: int,
+    output_tokens: int,
+) -> float:
+    price = pricing.get(model)
+    if price is None:
+        return 0.0
+    return (input_tokens * price["input"] + output_tokens * price["output"]) / 1_000_000
+
+
+@dataclass
+class _Usage:
+    calls: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cost_usd: float = 0.0
+
+
+# Token/cost ceiling shared by every worker of a run. Calls reserve their worst
+# case (prompt + max_tokens) before they start and settle to the reported usage
+# afterwards, so concurrent calls cannot overshoot the ceiling together.
+class BudgetGuard:
+    def __init__(
+        self,
+        max_tokens: Optional[int] = None,
+        max_cost_usd: Optional[float] = None,
+        pricing: Optional[Dict[str, Dict[str, float]]] = None,
+    ):
+        self.max_tokens = max_tokens
+        self.max_cost_usd = max_cost_usd
+        self.pricing = pricing or dict(DEFAULT_PRICING)
+        self.exceeded: Optional[str] = None
+        self._by_model: Dict[str, _Usage] = {}
+        self._reserved: Dict[int, Tuple[str, int, float]] = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+    def _totals(self) -> Tuple[int, float]:
+        tokens = sum(u.input_tokens + u.output_tokens for u in self._by_model.values())
+        cost = sum(u.cost_usd for u in self._by_model.values())
+        for _, tok, c in self._reserved.values():
+            tokens += tok
+            cost += c
+        return tokens, cost
+
+    def reserve(self, model: str, input_tokens: int, max_output_tokens: int) -> int:
+        worst_tokens = input_tokens + max_output_tokens
+        worst_cost = call_cost(self.pricing, model, input_tokens, max_output_tokens)
+        with self._lock:
+            if self.exceeded:
+                raise BudgetExceeded(self.exceeded)
+            tokens, cost = self._totals()
+            if self.max_tokens is not None and tokens + worst_tokens > self.max_tokens:
+                self.exceeded = f"token budget of {self.max_tokens} would be exceeded"
+            elif self.max_cost_usd is not None and cost + worst_cost > self.max_cost_usd:
+                self.exceeded = f"cost budget of ${self.max_cost_usd:.4f} would be exceeded"
+            if self.exceeded:
+                raise BudgetExceeded(self.exceeded)
+            reservation = next(self._ids)
+            self._reserved[reservation] = (model, worst_tokens, worst_cost)
+            return reservation
+
+    def settle(self, reservation: int, input_tokens: int, output_tokens: int) -> None:
+        with self._lock:
+            model, _, _ = self._reserved.pop(reservation)
+            usage = self._by_model.setdefault(model, _Usage())
+            usage.calls += 1
+            usage.input_tokens += input_tokens
+            usage.output_tokens += output_tokens
+            usage.cost_usd += call_cost(self.pricing, model, input_tokens, output_tokens)
+
+    def release(self, reservation: int) -> None:
+        with self._lock:
+            self._reserved.pop(reservation, None)
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            by_model = {
+                model: {
+                    "calls": u.calls,
+                    "input_tokens": u.input_tokens,
+                    "output_tokens": u.output_tokens,
+                    "cost_usd": round(u.cost_usd, 6),
+                }
+                for model, u in self._by_model.items()
+            }
+        return {
+            "by_model": by_model,
+            "total_tokens": sum(m["input_tokens"] + m["output_tokens"] for m in by_model.values()),
+            "total_cost_usd": round(sum(m["cost_usd"] for m in by_model.values()), 6),
+            "max_tokens": self.max_tokens,
+            "max_cost_usd": self.max_cost_usd,
+        }
+
+
+def response_usage(resp: Any, input_estimate: int, output_text: str, model: str) -> Tuple[int, int]:
+    usage = getattr(resp, "usage", None)
+    if usage is not None and getattr(usage, "prompt_tokens", None) is not None:
+        return int(usage.prompt_tokens), int(usage.completion_tokens or 0)
+    return input_estimate, estimate_tokens(output_text, model)
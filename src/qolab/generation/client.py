@@ -1,50 +1,250 @@
 from __future__ import annotations
 
+import copy
 import time
 from dataclasses import dataclass
-from typing import Any, Dict, List
+from typing import TYPE_CHECKING, Any, Dict, List
 
-from openai import OpenAI, APIError
+from .budget import estimate_chat_tokens, estimate_tokens, response_usage
+from .hedging import DEFAULT_TIMEOUT, RequestPolicy
+
+if TYPE_CHECKING:
+    from ..evaluation.streaming import ConstraintMonitor
+    from ..logging.metrics import SweepMetrics
+    from ..utils.cache import ResponseCache
+    from .budget import BudgetGuard
+    from .endpoints import EndpointPool
 
 
 DEFAULT_MODEL = "gpt-4.1-mini"
 DEFAULT_JUDGE_MODEL = "gpt-4.1-mini"
+DEFAULT_MAX_TOKENS = 600
+
+
+@dataclass
+class GenerationResult:
+    text: str
+    abort_reason: str | None = None
 
 
 @dataclass
 class OpenAIClientConfig:
     api_key: str | None
     model: str = DEFAULT_MODEL
-    timeout: float = 30.0
+    # per-call deadline in seconds; hedge fires a duplicate request once a
+    # call is slower than the recent p95 (see RequestPolicy)
+    timeout: float = DEFAULT_TIMEOUT
+    hedge: bool = False
+    # route calls over several endpoints instead (api_key is then unused)
+    endpoints: "EndpointPool | None" = None
 
 
 class LLMClient:
-    def __init__(self, config: OpenAIClientConfig):
-        if not config.api_key:
-            raise ValueError("OPENAI_API_KEY is required for real generation.")
-        self.client = OpenAI(api_key=config.api_key)
+    def __init__(
+        self,
+        config: OpenAIClientConfig,
+        cache: "ResponseCache | None" = None,
+        budget: "BudgetGuard | None" = None,
+    ):
+        if config.endpoints is not None:
+            self.client: Any = config.endpoints
+        else:
+            if not config.api_key:
+                raise ValueError("OPENAI_API_KEY is required for real generation.")
+            # openai is only needed once a real client is built; importing it costs ~1s.
+            from openai import OpenAI
+
+            self.client = OpenAI(api_key=config.api_key)
         self.model = config.model
-        self.timeout = config.timeout
+        self.policy = RequestPolicy(timeout=config.timeout, hedge=config.hedge)
+        self.cache = cache
+        self.budget = budget
 
-    def generate(self, system_prompt: str, user_prompt: str, temperature: float) -> str:
+    def _cache_for(self, temperature: float) -> "ResponseCache | None":
+        # only greedy decoding is repeatable; replaying a sampled output would
+        # turn repeats and temperature comparisons into copies of one draw
+        return self.cache if temperature == 0 else None
+
+    def generate(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float,
+        max_tokens: int = DEFAULT_MAX_TOKENS,
+        budget: "BudgetGuard | None" = None,
+        repeat: int = 0,
+        metrics: "SweepMetrics | None" = None,
+    ) -> str:
+        from openai import APIError
+
+        budget = budget or self.budget
+        # repeats are independent samples, so each gets its own cache entry
+        cache = self._cache_for(temperature)
+        cache_key = (self.model, system_prompt, user_prompt, float(temperature), max_tokens, repeat)
+        if cache is not None:
+            cached = cache.get(cache_key)
+            if metrics is not None:
+                metrics.cache_lookup(cached is not None)
+            if cached is not None:
+                return cached
         messages: List[Dict[str, str]] = [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt},
         ]
+        input_estimate = estimate_chat_tokens(system_prompt, user_prompt, self.model)
+
+        def request(timeout: float) -> str:
+            # one billed request; a hedged call may run two of these at once
+            reservation = None
+            if budget is not None:
+                reservation = budget.reserve(self.model, input_estimate, max_tokens)
+            if metrics is not None:
+                metrics.request_started("generation")
+            failed = True
+            try:
+                resp = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    timeout=timeout,
+                )
+                text = resp.choices[0].message.content or ""
+                if reservation is not None:
+                    budget.settle(reservation, *response_usage(resp, input_estimate, text, self.model))
+                failed = False
+            finally:
+                # any failure gives the reservation back, not only API errors:
+                # timeouts, cancellation, a pool that ran out of endpoints
+                if failed and reservation is not None:
+                    budget.release(reservation)
+                if metrics is not None:
+                    metrics.request_finished("generation", error=failed)
+            return text
+
         attempt = 0
         while True:
             attempt += 1
             try:
-                resp = self.client.chat.completions.create(
+                text = self.policy.call(request)
+            except APIError:
+                if attempt >= 2:
+                    raise
+                if metrics is not None:
+                    metrics.retry("generation")
+                time.sleep(1.0)
+                continue
+            if cache is not None:
+                cache.put(cache_key, text)
+            return text
+
+    def generate_stream(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float,
+        monitor: "ConstraintMonitor",
+        max_tokens: int = DEFAULT_MAX_TOKENS,
+        budget: "BudgetGuard | None" = None,
+        repeat: int = 0,
+        metrics: "SweepMetrics | None" = None,
+    ) -> GenerationResult:
+        # Streams the completion through `monitor` and closes the connection as
+        # soon as it reports a violated hard constraint; the server stops
+        # generating (and billing) once the stream is dropped. Attempts go
+        # through the request policy like generate(): per-call timeout,
+        # hedging, and the latency estimate the hedge delay is taken from.
+        from openai import APIError
+
+        from ..evaluation.streaming import replay
+
+        budget = budget or self.budget
+        cache = self._cache_for(temperature)
+        cache_key = (self.model, system_prompt, user_prompt, float(temperature), max_tokens, repeat)
+        if cache is not None:
+            cached = cache.get(cache_key)
+            if metrics is not None:
+                metrics.cache_lookup(cached is not None)
+            if cached is not None:
+                # cached texts may come from non-streamed calls; check them the same way
+                return GenerationResult(*replay(monitor, cached))
+        messages: List[Dict[str, str]] = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ]
+        input_estimate = estimate_chat_tokens(system_prompt, user_prompt, self.model)
+
+        def request(timeout: float) -> GenerationResult:
+            # one billed stream; hedged attempts run side by side, so each
+            # checks its own copy of the monitor (its state is all immutable
+            # values, so a shallow copy is independent)
+            checks = copy.copy(monitor)
+            reservation = None
+            if budget is not None:
+                reservation = budget.reserve(self.model, input_estimate, max_tokens)
+            parts: List[str] = []
+            usage = None
+            abort_reason = None
+            if metrics is not None:
+                metrics.request_started("generation")
+            try:
+                stream = self.client.chat.completions.create(
                     model=self.model,
                     messages=messages,
                     temperature=temperature,
-                    max_tokens=600,
-                    timeout=self.timeout,
+                    max_tokens=max_tokens,
+                    timeout=timeout,
+                    stream=True,
+                    stream_options={"include_usage": True},
                 )
-                return resp.choices[0].message.content or ""
+                try:
+                    for chunk in stream:
+                        if getattr(chunk, "usage", None) is not None:
+                            usage = chunk.usage
+                        if not chunk.choices:
+                            continue
+                        delta = chunk.choices[0].delta.content
+                        if not delta:
+                            continue
+                        parts.append(delta)
+                        abort_reason = checks.feed(delta)
+                        if abort_reason is not None:
+                            break
+                finally:
+                    close = getattr(stream, "close", None)
+                    if close is not None:
+                        close()
+            except BaseException:
+                # released on any failure, not only API errors
+                if reservation is not None:
+                    budget.release(reservation)
+                if metrics is not None:
+                    metrics.request_finished("generation", error=True)
+                raise
+            if metrics is not None:
+                metrics.request_finished("generation")
+            text = "".join(parts)
+            if reservation is not None:
+                if usage is not None and getattr(usage, "prompt_tokens", None) is not None:
+                    spent = (int(usage.prompt_tokens), int(usage.completion_tokens or 0))
+                else:
+                    # aborted streams never reach the usage chunk
+                    spent = (input_estimate, estimate_tokens(text, self.model))
+                budget.settle(reservation, *spent)
+            return GenerationResult(text, abort_reason)
+
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                result = self.policy.call(request)
             except APIError:
                 if attempt >= 2:
                     raise
+                if metrics is not None:
+                    metrics.retry("generation")
                 time.sleep(1.0)
-
+                continue
+            if cache is not None and result.abort_reason is None:
+                cache.put(cache_key, result.text)
+            return result
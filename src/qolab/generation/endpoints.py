@@ -0,0 +1,325 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Any, Deque, Dict, List, Optional
+
+from ..utils.io import load_json
+
+ROUTING_MODES = ("least_loaded", "weighted")
+
+# A breaker opens once at least BREAKER_MIN_REQUESTS of an endpoint's last
+# BREAKER_WINDOW calls ended and half of them failed; after the cooldown one
+# trial call is let through, which closes it again or restarts the cooldown.
+BREAKER_WINDOW = 20
+BREAKER_MIN_REQUESTS = 5
+BREAKER_ERROR_RATE = 0.5
+BREAKER_COOLDOWN = 30.0
+# Once every endpoint has failed a call, the pool waits and goes round again
+# up to POOL_RETRIES times: until the first breaker half-opens, at least
+# POOL_BACKOFF doubling each round or the server's Retry-After, at most
+# POOL_MAX_BACKOFF. This replaces the SDK's own retries, which would keep
+# hammering one bad endpoint instead of failing over.
+POOL_RETRIES = 2
+POOL_BACKOFF = 0.5
+POOL_MAX_BACKOFF = 60.0
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        window: int = BREAKER_WINDOW,
+        min_requests: int = BREAKER_MIN_REQUESTS,
+        error_rate: float = BREAKER_ERROR_RATE,
+        cooldown: float = BREAKER_COOLDOWN,
+    ):
+        self.min_requests = min_requests
+        self.error_rate = error_rate
+        self.cooldown = cooldown
+        self.opened = 0
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._open_until: Optional[float] = None
+        self._trial = False
+
+    @property
+    def state(self) -> str:
+        if self._open_until is None:
+            return "closed"
+        return "half-open" if time.monotonic() >= self._open_until else "open"
+
+    # callers hold the pool lock; a half-open breaker lets one call through
+    def available(self) -> bool:
+        state = self.state
+        return state == "closed" or (state == "half-open" and not self._trial)
+
+    def begin(self) -> bool:
+        # True for the trial call of a half-open breaker, whose result is passed back to record()
+        if self.state == "half-open" and not self._trial:
+            self._trial = True
+            return True
+        return False
+
+    def retry_at(self) -> float:
+        return self._open_until if self._open_until is not None else 0.0
+
+    def record(self, ok: bool, trial: bool = False) -> None:
+        if trial:
+            self._trial = False
+            if ok:
+                self._open_until = None
+                self._outcomes.clear()
+            else:
+                self._open_until = time.monotonic() + self.cooldown
+                self.opened += 1
+            return
+        if self._open_until is not None:
+            # calls started before the breaker opened (or forced through it)
+            # don't decide it; only the trial call does
+            return
+        self._outcomes.append(ok)
+        failures = self._outcomes.count(False)
+        if len(self._outcomes) >= self.min_requests and failures >= self.error_rate * len(self._outcomes):
+            self._open_until = time.monotonic() + self.cooldown
+            self.opened += 1
+
+
+@dataclass
+class Endpoint:
+    name: str
+    base_url: str | None = None
+    api_key: str | None = None
+    # read the key from this environment variable instead of the file
+    api_key_env: str | None = None
+    # the endpoint's own name for the logical model, e.g. a deployment name
+    model: str | None = None
+    weight: float = 1.0
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Endpoint":
+        endpoint = cls(**data)
+        if endpoint.weight <= 0:
+            raise ValueError(f"Endpoint {endpoint.name!r} needs a positive weight.")
+        return endpoint
+
+    def resolve_api_key(self) -> str | None:
+        if self.api_key_env:
+            return os.getenv(self.api_key_env)
+        return self.api_key
+
+
+class _EndpointState:
+    def __init__(self, endpoint: Endpoint, client: Any, breaker: CircuitBreaker):
+        self.endpoint = endpoint
+        self.client = client
+        self.breaker = breaker
+        self.in_flight = 0
+        self.current_weight = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.failovers = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.busy_seconds = 0.0
+
+
+class EndpointPool:
+    # Several OpenAI-compatible endpoints serving one logical model, behind
+    # the same `chat.completions.create` the OpenAI client has, so LLMClient
+    # and the judge use a pool wherever they would use a client. Each call
+    # goes to the least loaded endpoint (in-flight calls over weight) or, with
+    # "weighted" routing, round-robin in proportion to the weights. Rate
+    # limits, server errors, timeouts and connection errors count against the
+    # endpoint's breaker and the call fails over to the next one; other errors
+    # (a bad request fails the same everywhere) are raised at once. When every
+    # breaker is open the pool still tries the endpoints, soonest-to-retry
+    # first, rather than failing the sweep outright, and once all of them
+    # have failed it backs off and goes round again (see POOL_RETRIES).
+    def __init__(
+        self,
+        model: str,
+        endpoints: List[Endpoint],
+        routing: str = "least_loaded",
+        breaker: Dict[str, Any] | None = None,
+        clients: List[Any] | None = None,
+        retries: int = POOL_RETRIES,
+        backoff: float = POOL_BACKOFF,
+    ):
+        if not endpoints:
+            raise ValueError(f"The endpoint pool for {model!r} is empty.")
+        if routing not in ROUTING_MODES:
+            raise ValueError(f"Unknown routing {routing!r}; expected one of {', '.join(ROUTING_MODES)}")
+        if clients is None:
+            clients = [_openai_client(e) for e in endpoints]
+        self.model = model
+        self.routing = routing
+        self.retries = retries
+        self.backoff = backoff
+        self._states = [_EndpointState(e, c, CircuitBreaker(**(breaker or {}))) for e, c in zip(endpoints, clients)]
+        self._lock = threading.Lock()
+        self._first_call: float | None = None
+        self._last_call = 0.0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def _pick(self, tried: set) -> Optional[_EndpointState]:
+        candidates = [s for s in self._states if id(s) not in tried]
+        if not candidates:
+            return None
+        healthy = [s for s in candidates if s.breaker.available()]
+        if not healthy:
+            return min(candidates, key=lambda s: s.breaker.retry_at())
+        if self.routing == "least_loaded":
+            return min(healthy, key=lambda s: (s.in_flight / s.endpoint.weight, s.requests / s.endpoint.weight))
+        # smooth weighted round-robin
+        total = sum(s.endpoint.weight for s in healthy)
+        for s in healthy:
+            s.current_weight += s.endpoint.weight
+        chosen = max(healthy, key=lambda s: s.current_weight)
+        chosen.current_weight -= total
+        return chosen
+
+    def create(self, **kwargs: Any) -> Any:
+        tried: set = set()
+        last_error: BaseException | None = None
+        rounds = 0
+        while True:
+            with self._lock:
+                state = self._pick(tried)
+                if state is None:
+                    assert last_error is not None
+                    if rounds >= self.retries:
+                        raise last_error
+                    delay = self._backoff(rounds, last_error)
+            if state is None:
+                time.sleep(delay)
+                rounds += 1
+                tried.clear()
+                continue
+            with self._lock:
+                tried.add(id(state))
+                trial = state.breaker.begin()
+                if last_error is not None:
+                    state.failovers += 1
+                state.in_flight += 1
+                state.requests += 1
+                started = time.monotonic()
+                if self._first_call is None:
+                    self._first_call = started
+            try:
+                resp = state.client.chat.completions.create(**{**kwargs, "model": state.endpoint.model or self.model})
+            except Exception as exc:
+                retryable = _is_endpoint_failure(exc)
+                with self._lock:
+                    self._finish(state, started)
+                    state.errors += 1
+                    # an endpoint that answers, even with an error, is up
+                    state.breaker.record(not retryable, trial)
+                if not retryable:
+                    raise
+                last_error = exc
+                continue
+            with self._lock:
+                self._finish(state, started)
+                state.breaker.record(True, trial)
+                usage = getattr(resp, "usage", None)
+                if usage is not None:
+                    state.input_tokens += int(getattr(usage, "prompt_tokens", 0) or 0)
+                    state.output_tokens += int(getattr(usage, "completion_tokens", 0) or 0)
+            return resp
+
+    def _backoff(self, rounds: int, error: BaseException) -> float:
+        reopens = min(s.breaker.retry_at() for s in self._states) - time.monotonic()
+        delay = max(self.backoff * 2**rounds, reopens, _retry_after(error))
+        return min(delay, POOL_MAX_BACKOFF)
+
+    def _finish(self, state: _EndpointState, started: float) -> None:
+        now = time.monotonic()
+        state.in_flight -= 1
+        state.busy_seconds += now - started
+        self._last_call = max(self._last_call, now)
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            elapsed = self._last_call - self._first_call if self._first_call is not None else 0.0
+            endpoints = []
+            for s in self._states:
+                endpoints.append(
+                    {
+                        "name": s.endpoint.name,
+                        "base_url": s.endpoint.base_url,
+                        "model": s.endpoint.model or self.model,
+                        "requests": s.requests,
+                        "errors": s.errors,
+                        "failovers": s.failovers,
+                        "input_tokens": s.input_tokens,
+                        "output_tokens": s.output_tokens,
+                        "busy_seconds": round(s.busy_seconds, 3),
+                        "requests_per_second": round(s.requests / elapsed, 3) if elapsed > 0 else None,
+                        "output_tokens_per_second": round(s.output_tokens / elapsed, 1) if elapsed > 0 else None,
+                        "breaker": s.breaker.state,
+                        "breaker_opened": s.breaker.opened,
+                    }
+                )
+        return {"routing": self.routing, "seconds": round(elapsed, 3), "endpoints": endpoints}
+
+
+def _openai_client(endpoint: Endpoint) -> Any:
+    from openai import OpenAI
+
+    api_key = endpoint.resolve_api_key()
+    if not api_key:
+        raise ValueError(f"Endpoint {endpoint.name!r} has no API key (set api_key or api_key_env).")
+    # the pool retries with backoff instead (see POOL_RETRIES)
+    return OpenAI(api_key=api_key, base_url=endpoint.base_url, max_retries=0)
+
+
+def _retry_after(exc: BaseException) -> float:
+    response = getattr(exc, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(value) if value else 0.0
+    except ValueError:  # the HTTP-date form
+        return 0.0
+
+
+def _is_endpoint_failure(exc: BaseException) -> bool:
+    from openai import APIConnectionError, APIStatusError
+
+    if isinstance(exc, APIConnectionError):  # includes timeouts
+        return True
+    if isinstance(exc, APIStatusError):
+        return exc.status_code == 429 or exc.status_code >= 500
+    return False
+
+
+class EndpointPools:
+    # the pools of an endpoints file, one per logical model:
+    # {"routing": "least_loaded", "breaker": {"cooldown": 30}, "retries": 2, "backoff": 0.5,
+    #  "models": {"gpt-4.1-mini": [{"name": "a", "api_key_env": "OPENAI_API_KEY"},
+    #                              {"name": "b", "base_url": "http://host/v1", "api_key": "x", "weight": 2}]}}
+    def __init__(self, pools: Dict[str, EndpointPool]):
+        self.pools = pools
+
+    @classmethod
+    def load(cls, path: str) -> "EndpointPools":
+        data = load_json(path)
+        routing = data.get("routing", "least_loaded")
+        breaker = data.get("breaker")
+        retries = data.get("retries", POOL_RETRIES)
+        backoff = data.get("backoff", POOL_BACKOFF)
+        pools = {
+            model: EndpointPool(
+                model, [Endpoint.from_dict(e) for e in endpoints], routing, breaker, retries=retries, backoff=backoff
+            )
+            for model, endpoints in (data.get("models") or {}).items()
+        }
+        return cls(pools)
+
+    def get(self, model: str) -> Optional[EndpointPool]:
+        return self.pools.get(model)
+
+    def summary(self) -> Dict[str, Any]:
+        return {model: pool.summary() for model, pool in self.pools.items()}
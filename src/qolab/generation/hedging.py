@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Optional, Tuple, TypeVar
+
+from ..logging.metrics import LatencyTracker
+
+T = TypeVar("T")
+
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_HEDGE_QUANTILE = 0.95
+# hedging starts once the latency estimate rests on this many requests
+HEDGE_MIN_SAMPLES = 20
+# a call made close to a deadline still gets this long to answer
+MIN_TIMEOUT = 1.0
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _hedge_pool() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="qolab-hedge")
+    return _pool
+
+
+class Deadline:
+    # wall-clock limit for a whole run; calls made under it get their
+    # timeouts cut to the time that is left
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self._at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self._at - time.monotonic())
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self._at
+
+    def clamp(self, timeout: float) -> float:
+        return min(timeout, max(self.remaining(), MIN_TIMEOUT))
+
+
+class RequestPolicy:
+    # Per-call timeouts and hedged requests for one upstream. A hedged call
+    # fires a duplicate once the first attempt has taken longer than the
+    # recent p95 and returns whichever answers first. The loser is cancelled
+    # if it has not started; one already in flight cannot be interrupted by
+    # the sync client, so it is abandoned (its timeout bounds it) and its
+    # result dropped. Both attempts are billed, which the budget sees as the
+    # loser settles its own reservation.
+    def __init__(
+        self,
+        timeout: float = DEFAULT_TIMEOUT,
+        hedge: bool = False,
+        hedge_quantile: float = DEFAULT_HEDGE_QUANTILE,
+        min_samples: int = HEDGE_MIN_SAMPLES,
+    ):
+        self.timeout = timeout
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.min_samples = min_samples
+        self.latency = LatencyTracker()
+        self.hedged = 0
+        self.hedge_wins = 0
+        self._lock = threading.Lock()
+
+    def hedge_delay(self) -> Optional[float]:
+        if not self.hedge or self.latency.count < self.min_samples:
+            return None
+        return self.latency.recent_quantile(self.hedge_quantile)
+
+    def call(
+        self,
+        attempt: Callable[[float], T],
+        deadline: Deadline | None = None,
+    ) -> T:
+        # attempt(timeout) makes one request. The delay is estimated from the
+        # latency callers got, not from every attempt: abandoned stragglers
+        # would otherwise drag the estimate up and switch hedging off.
+        timeout = self.timeout if deadline is None else deadline.clamp(self.timeout)
+        started = time.perf_counter()
+        result = self._call(attempt, timeout)
+        self.latency.observe(time.perf_counter() - started)
+        return result
+
+    def _call(self, attempt: Callable[[float], T], timeout: float) -> T:
+        delay = self.hedge_delay()
+        if delay is None:
+            return attempt(timeout)
+
+        pool = _hedge_pool()
+        first = pool.submit(attempt, timeout)
+        done, _ = wait([first], timeout=delay)
+        if done:
+            return first.result()
+        second = pool.submit(attempt, timeout)
+        with self._lock:
+            self.hedged += 1
+        pending = {first, second}
+        error: BaseException | None = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for loser in pending:
+                        loser.cancel()
+                    if future is second:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    return future.result()
+                error = future.exception()
+        assert error is not None
+        raise error
+
+    def counters(self) -> Tuple[int, int]:
+        with self._lock:
+            return self.hedged, self.hedge_wins
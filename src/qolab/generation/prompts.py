@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from typing import Any, Dict, Optional
 
 
 @dataclass
@@ -18,12 +19,16 @@ class PromptVariant:
     user_prompt_template: str
 
 
-def render_user_prompt(template: str, case: CaseConfig) -> str:
-    return template.format(
-        name=case.name,
-        task=case.task,
-        audience=case.audience,
-        tone=case.tone,
-        constraints=case.constraints,
-    )
+def render_user_prompt(template: str, case: CaseConfig, row: Optional[Dict[str, Any]] = None) -> str:
+    fields = {
+        "name": case.name,
+        "task": case.task,
+        "audience": case.audience,
+        "tone": case.tone,
+        "constraints": case.constraints,
+    }
+    # dataset rows add their own fields and take precedence over the case's
+    if row:
+        fields.update(row)
+    return template.format(**fields)
 
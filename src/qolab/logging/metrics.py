@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import os
+import random
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+REQUEST_KINDS = ("generation", "judge")
+LATENCY_QUANTILES = (0.5, 0.95, 0.99)
+
+
+class LatencyTracker:
+    # Request latencies in seconds. Quantiles of the recent window drive hedge
+    # delays, so they follow the upstream as it speeds up or slows down; the
+    # summary comes from a uniform reservoir over everything observed, which
+    # keeps memory fixed however long a run gets.
+    def __init__(self, window: int = 256, reservoir: int = 4096):
+        self.count = 0
+        self.max = 0.0
+        self._recent: deque = deque(maxlen=window)
+        self._reservoir: List[float] = []
+        self._size = reservoir
+        self._rng = random.Random(0)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.max = max(self.max, seconds)
+            self._recent.append(seconds)
+            if len(self._reservoir) < self._size:
+                self._reservoir.append(seconds)
+            else:
+                j = self._rng.randrange(self.count)
+                if j < self._size:
+                    self._reservoir[j] = seconds
+
+    @staticmethod
+    def _quantile(values: List[float], q: float) -> Optional[float]:
+        if not values:
+            return None
+        values = sorted(values)
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+    def recent_quantile(self, q: float) -> Optional[float]:
+        with self._lock:
+            return self._quantile(list(self._recent), q)
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            values = list(self._reservoir)
+            summary: Dict[str, Any] = {"count": self.count}
+            for q in LATENCY_QUANTILES:
+                value = self._quantile(values, q)
+                summary[f"p{round(q * 100)}"] = None if value is None else round(value, 4)
+            summary["max"] = round(self.max, 4) if self.count else None
+            return summary
+
+
+class SweepMetrics:
+    # Counters for one process. Updated from pipeline, client and judge code
+    # (possibly from several threads) and read by the live progress view and
+    # the OpenMetrics exporters.
+    def __init__(self) -> None:
+        self.started_at = time.time()
+        self.last_progress_at = self.started_at
+        self.cells_total = 0
+        self.cells_completed = 0
+        self.cells_aborted = 0
+        self.in_flight = 0
+        self.requests = {k: 0 for k in REQUEST_KINDS}
+        self.errors = {k: 0 for k in REQUEST_KINDS}
+        self.retries = {k: 0 for k in REQUEST_KINDS}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._lock = threading.Lock()
+
+    def add_cells(self, n: int) -> None:
+        with self._lock:
+            self.cells_total += n
+
+    def cell_done(self, aborted: bool = False) -> None:
+        with self._lock:
+            self.cells_completed += 1
+            self.cells_aborted += int(aborted)
+            self.last_progress_at = time.time()
+
+    def request_started(self, kind: str) -> None:
+        with self._lock:
+            self.requests[kind] += 1
+            self.in_flight += 1
+
+    def request_finished(self, kind: str, error: bool = False) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self.errors[kind] += int(error)
+
+    def retry(self, kind: str) -> None:
+        with self._lock:
+            self.retries[kind] += 1
+
+    def cache_lookup(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.cache_hits += 1
+            else:
+                self.cache_misses += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.time()
+            elapsed = max(now - self.started_at, 1e-9)
+            throughput = self.cells_completed / elapsed
+            remaining = max(self.cells_total - self.cells_completed, 0)
+            requests = sum(self.requests.values())
+            lookups = self.cache_hits + self.cache_misses
+            return {
+                "elapsed_seconds": elapsed,
+                "cells_total": self.cells_total,
+                "cells_completed": self.cells_completed,
+                "cells_aborted": self.cells_aborted,
+                "cells_per_second": throughput,
+                "eta_seconds": remaining / throughput if throughput and self.cells_total else None,
+                "in_flight": self.in_flight,
+                "requests": dict(self.requests),
+                "errors": dict(self.errors),
+                "retries": dict(self.retries),
+                "error_rate": sum(self.errors.values()) / requests if requests else 0.0,
+                "retry_rate": sum(self.retries.values()) / requests if requests else 0.0,
+                "cache_hits": self.cache_hits,
+                "cache_misses": self.cache_misses,
+                "cache_hit_rate": self.cache_hits / lookups if lookups else 0.0,
+                "last_progress_timestamp": self.last_progress_at,
+            }
+
+
+def _family(lines: List[str], name: str, kind: str, help_text: str, samples: List[tuple]) -> None:
+    lines.append(f"# TYPE {name} {kind}")
+    lines.append(f"# HELP {name} {help_text}")
+    suffix = "_total" if kind == "counter" else ""
+    for labels, value in samples:
+        label_text = ",".join(f'{k}="{v}"' for k, v in labels.items())
+        lines.append(f"{name}{suffix}{{{label_text}}} {value}" if label_text else f"{name}{suffix} {value}")
+
+
+def render_openmetrics(metrics: SweepMetrics) -> str:
+    snap = metrics.snapshot()
+
+    def per_kind(counts: Dict[str, int]) -> List[tuple]:
+        return [({"kind": k}, v) for k, v in counts.items()]
+
+    families = [
+        ("qolab_cells", "gauge", "Cells (variant x temperature x repeat) scheduled.", [({}, snap["cells_total"])]),
+        ("qolab_cells_completed", "counter", "Cells finished.", [({}, snap["cells_completed"])]),
+        ("qolab_cells_aborted", "counter", "Cells whose stream was aborted.", [({}, snap["cells_aborted"])]),
+        ("qolab_requests", "counter", "API requests started.", per_kind(snap["requests"])),
+        ("qolab_request_errors", "counter", "API requests that failed.", per_kind(snap["errors"])),
+        ("qolab_request_retries", "counter", "API requests retried.", per_kind(snap["retries"])),
+        ("qolab_requests_in_flight", "gauge", "API requests currently running.", [({}, snap["in_flight"])]),
+        ("qolab_cache_hits", "counter", "Response cache hits.", [({}, snap["cache_hits"])]),
+        ("qolab_cache_misses", "counter", "Response cache misses.", [({}, snap["cache_misses"])]),
+        (
+            "qolab_cells_per_second",
+            "gauge",
+            "Mean cell throughput since start.",
+            [({}, round(snap["cells_per_second"], 6))],
+        ),
+        # alert on time() - this to catch stalled sweeps
+        (
+            "qolab_last_progress_timestamp_seconds",
+            "gauge",
+            "Unix time of the last finished cell.",
+            [({}, round(snap["last_progress_timestamp"], 3))],
+        ),
+    ]
+    if snap["eta_seconds"] is not None:
+        families.append(
+            (
+                "qolab_eta_seconds",
+                "gauge",
+                "Estimated seconds until all cells finish.",
+                [({}, round(snap["eta_seconds"], 1))],
+            )
+        )
+    lines: List[str] = []
+    for name, kind, help_text, samples in families:
+        _family(lines, name, kind, help_text, samples)
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+def write_openmetrics(metrics: SweepMetrics, path: str | Path) -> Path:
+    # written atomically so a textfile collector never reads half a file
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(render_openmetrics(metrics), encoding="utf-8")
+    tmp.replace(path)
+    return path
+
+
+class MetricsFileWriter:
+    def __init__(self, metrics: SweepMetrics, path: str | Path, interval: float = 10.0):
+        self.metrics = metrics
+        self.path = Path(path)
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            write_openmetrics(self.metrics, self.path)
+
+    def __enter__(self) -> "MetricsFileWriter":
+        write_openmetrics(self.metrics, self.path)
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        write_openmetrics(self.metrics, self.path)
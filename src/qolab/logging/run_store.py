@@ -1,11 +1,24 @@
 from __future__ import annotations
 
+import gzip
+import hashlib
 from dataclasses import asdict, is_dataclass
 from pathlib import Path
-from typing import Any
+from typing import Any, Dict, Optional
 
-from .schemas import RunResults
-from ..utils.io import dump_json, load_json
+from .schemas import RunMetadata, RunResults, SampleRecord
+from ..utils.io import COMPRESSION_SUFFIXES, _zstd, dump_json, dumps_json, load_json, read_prefix
+
+
+COMPACT_FORMAT = "qolab-compact/1"
+
+# Sample fields moved into the blob table by the compact format. Nested
+# fields are given as a path from the sample dict.
+BLOB_FIELDS = (
+    ("full_prompt",),
+    ("output_text",),
+    ("scores", "judge", "raw_judge"),
+)
 
 
 def _to_dict(obj: Any) -> Any:
@@ -16,16 +29,131 @@ def _to_dict(obj: Any) -> Any:
     return obj
 
 
-def save_run(results: RunResults, base_dir: str | Path) -> Path:
+def blob_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:20]
+
+
+def _parent(sample: Dict[str, Any], field_path: tuple) -> Optional[Dict[str, Any]]:
+    node: Any = sample
+    for key in field_path[:-1]:
+        node = node.get(key) if isinstance(node, dict) else None
+    return node if isinstance(node, dict) else None
+
+
+def to_compact(data: Dict[str, Any]) -> Dict[str, Any]:
+    blobs: Dict[str, str] = {}
+    samples = []
+    for sample in data["samples"]:
+        sample = {**sample, "scores": {**sample["scores"]}}
+        if isinstance(sample["scores"].get("judge"), dict):
+            sample["scores"]["judge"] = {**sample["scores"]["judge"]}
+        for field_path in BLOB_FIELDS:
+            parent = _parent(sample, field_path)
+            name = field_path[-1]
+            if parent is None or not isinstance(parent.get(name), str):
+                continue
+            text = parent.pop(name)
+            digest = blob_hash(text)
+            blobs.setdefault(digest, text)
+            parent[f"{name}_ref"] = digest
+        samples.append(sample)
+    # "format" goes first so readers can sniff it from the first bytes of the file
+    return {"format": COMPACT_FORMAT, "metadata": data["metadata"], "samples": samples, "blobs": blobs}
+
+
+def from_compact(data: Dict[str, Any]) -> Dict[str, Any]:
+    blobs = data["blobs"]
+    for sample in data["samples"]:
+        for field_path in BLOB_FIELDS:
+            parent = _parent(sample, field_path)
+            name = field_path[-1]
+            if parent is not None and f"{name}_ref" in parent:
+                parent[name] = blobs[parent.pop(f"{name}_ref")]
+    return {"metadata": data["metadata"], "samples": data["samples"]}
+
+
+def is_compact_run(path: str | Path) -> bool:
+    return COMPACT_FORMAT.encode("utf-8") in read_prefix(path, 64)
+
+
+def results_filename(compression: Optional[str] = None) -> str:
+    if compression is None:
+        return "results.json"
+    if compression not in COMPRESSION_SUFFIXES:
+        raise ValueError(f"Unknown compression {compression!r}; expected gzip or zstd.")
+    return "results.json" + COMPRESSION_SUFFIXES[compression]
+
+
+def create_run_dir(base_dir: str | Path, metadata: RunMetadata) -> Path:
     base = Path(base_dir)
-    run_dir = base / results.metadata.run_id
-    run_dir.mkdir(parents=True, exist_ok=True)
-    path = run_dir / "results.json"
-    dump_json(path, _to_dict(results))
+    base.mkdir(parents=True, exist_ok=True)
+    run_id = metadata.run_id
+    suffix = 1
+    # run ids have second resolution; concurrent runs of one case get a numeric suffix
+    while True:
+        run_dir = base / run_id
+        try:
+            run_dir.mkdir()
+            break
+        except FileExistsError:
+            suffix += 1
+            run_id = f"{metadata.run_id}_{suffix}"
+    metadata.run_id = run_id
+    return run_dir
+
+
+def save_run(
+    results: RunResults,
+    base_dir: str | Path,
+    compact: bool = False,
+    compression: Optional[str] = None,
+) -> Path:
+    run_dir = create_run_dir(base_dir, results.metadata)
+    return write_run(results, run_dir / results_filename(compression), compact=compact)
+
+
+class RunStreamWriter:
+    # Writes results.json sample by sample for runs too large to hold in
+    # memory. The metadata goes last, once usage and stopped_reason are known;
+    # readers look fields up by name, so the order does not matter to them.
+    def __init__(self, path: str | Path, compression: Optional[str] = None):
+        self.path = Path(path)
+        self.samples = 0
+        raw = self.path.open("wb")
+        if compression == "gzip":
+            self._file: Any = gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6, mtime=0)
+        elif compression == "zstd":
+            self._file = _zstd().ZstdCompressor(level=10).stream_writer(raw, closefd=True)
+        elif compression is None:
+            self._file = raw
+        else:
+            raw.close()
+            raise ValueError(f"Unknown compression {compression!r}; expected gzip or zstd.")
+        self._raw = raw
+        self._file.write(b'{"samples": [')
+
+    def append(self, sample: SampleRecord) -> None:
+        self._file.write((b",\n" if self.samples else b"\n") + dumps_json(sample.model_dump(), compact=True))
+        self.samples += 1
+
+    def close(self, metadata: RunMetadata) -> Path:
+        self._file.write(b'\n], "metadata": ' + dumps_json(metadata.model_dump(), compact=True) + b"}\n")
+        self._file.close()
+        if not self._raw.closed:
+            self._raw.close()
+        return self.path
+
+
+def write_run(results: RunResults, path: str | Path, compact: bool = False) -> Path:
+    # compression follows the file suffix (.gz / .zst)
+    path = Path(path)
+    data = _to_dict(results)
+    dump_json(path, to_compact(data) if compact else data, compact=compact)
     return path
 
 
 def load_run(path: str | Path) -> RunResults:
     data = load_json(path)
+    if data.get("format") == COMPACT_FORMAT:
+        data = from_compact(data)
     return RunResults(**data)
-
@@ -0,0 +1,362 @@
+from __future__ import annotations
+
+import mmap
+import re
+import struct
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from ..utils.io import GZIP_MAGIC, ZSTD_MAGIC, load_json, loads_json
+from .run_store import BLOB_FIELDS, COMPACT_FORMAT, from_compact
+
+
+# Byte-level scanner over results.json. Values that are not requested are
+# skipped with regexes running directly on the memory map, so large strings
+# such as output_text or full_prompt are never decoded into Python objects.
+_WS_RE = re.compile(rb"[ \t\r\n]*")
+_STRING_RE = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"')
+# consumes strings and plain bytes up to the next bracket in a single C-level match;
+# unrolled so that an unterminated value fails in linear time instead of backtracking
+_BRACKET_RE = re.compile(rb'[^"{}\[\]]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^"{}\[\]]*)*([{}\[\]])')
+_SCALAR_RE = re.compile(rb"[^,}\]\s]+")
+
+# Index layout: header, (start, end) byte span of every sample, then one
+# section per projected field holding that field's value span in each sample
+# (0, 0 when absent). Field sections are added the first time a field is read,
+# so repeated scans slice values straight out of the map without scanning.
+INDEX_MAGIC = b"QOLABIX2"
+_HEADER = struct.Struct("<8sQQQ")
+_SECTION = struct.Struct("<I")
+
+DEFAULT_FIELDS = ("variant_name", "temperature", "scores.final_score")
+
+
+def _skip_ws(buf: Any, pos: int) -> int:
+    return _WS_RE.match(buf, pos).end()
+
+
+def _value_end(buf: Any, pos: int) -> int:
+    first = buf[pos : pos + 1]
+    if first == b'"':
+        return _STRING_RE.match(buf, pos).end()
+    if first in (b"{", b"["):
+        depth = 0
+        while True:
+            m = _BRACKET_RE.match(buf, pos)
+            if m is None:
+                raise ValueError("Unterminated JSON value")
+            pos = m.end()
+            if m.group(1) in (b"{", b"["):
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    return pos
+    return _SCALAR_RE.match(buf, pos).end()
+
+
+def _members(buf: Any, start: int) -> Iterator[Tuple[bytes, int, int]]:
+    # yields (raw key, value start, value end) for the object opening at `start`
+    pos = _skip_ws(buf, start + 1)
+    if buf[pos : pos + 1] == b"}":
+        return
+    while True:
+        key_end = _STRING_RE.match(buf, pos).end()
+        key = bytes(buf[pos + 1 : key_end - 1])
+        pos = _skip_ws(buf, key_end)
+        pos = _skip_ws(buf, pos + 1)  # ':'
+        end = _value_end(buf, pos)
+        yield key, pos, end
+        pos = _skip_ws(buf, end)
+        if buf[pos : pos + 1] == b"}":
+            return
+        pos = _skip_ws(buf, pos + 1)  # ','
+
+
+def _elements(buf: Any, start: int) -> Iterator[Tuple[int, int]]:
+    pos = _skip_ws(buf, start + 1)
+    if buf[pos : pos + 1] == b"]":
+        return
+    while True:
+        end = _value_end(buf, pos)
+        yield pos, end
+        pos = _skip_ws(buf, end)
+        if buf[pos : pos + 1] == b"]":
+            return
+        pos = _skip_ws(buf, pos + 1)
+
+
+def _field_tree(fields: Iterable[str]) -> Dict[bytes, Any]:
+    tree: Dict[bytes, Any] = {}
+    for field in fields:
+        node = tree
+        parts = field.split(".")
+        for part in parts[:-1]:
+            child = node.setdefault(part.encode("utf-8"), {})
+            if child is None:
+                break
+            node = child
+        else:
+            node[parts[-1].encode("utf-8")] = None
+    return tree
+
+
+def _field_spans(
+    buf: Any,
+    start: int,
+    tree: Dict[bytes, Any],
+    prefix: str,
+    out: Dict[str, Tuple[int, int]],
+) -> None:
+    if buf[start : start + 1] != b"{":
+        return
+    for key, vstart, vend in _members(buf, start):
+        if key not in tree:
+            continue
+        name = prefix + key.decode("utf-8")
+        sub = tree[key]
+        if sub is None:
+            out[name] = (vstart, vend)
+        else:
+            _field_spans(buf, vstart, sub, name + ".", out)
+
+
+def _lookup(data: Dict[str, Any], field: str) -> Any:
+    node: Any = data
+    for part in field.split("."):
+        if not isinstance(node, dict):
+            return None
+        node = node.get(part)
+    return node
+
+
+def index_path_for(path: str | Path) -> Path:
+    path = Path(path)
+    return path.with_name(path.name + ".idx")
+
+
+class SampleArchive:
+    def __init__(self, path: str | Path, write_index: bool = True):
+        self.path = Path(path)
+        self.write_index = write_index
+        self.compact = False
+        self._file = self.path.open("rb")
+        self._map: Optional[mmap.mmap] = None
+        self._fallback: Optional[Dict[str, Any]] = None
+        self._blob_spans: Optional[Dict[bytes, Tuple[int, int]]] = None
+        self._index_file = None
+        self._index_map: Optional[mmap.mmap] = None
+        self._views: List[memoryview] = []
+        self._spans: Sequence[int] = array("Q")
+        self._fields: Dict[str, Sequence[int]] = {}
+        magic = self._file.read(4)
+        if magic.startswith(GZIP_MAGIC) or magic == ZSTD_MAGIC:
+            # compressed runs cannot be memory-mapped; project from the parsed document
+            data = load_json(self.path)
+            self._fallback = from_compact(data) if data.get("format") == COMPACT_FORMAT else data
+            return
+        if not magic:
+            self._file.close()
+            raise ValueError(f"{self.path} is empty; the run that wrote it did not finish")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.compact = COMPACT_FORMAT.encode("utf-8") in self._map[:64]
+        if not self._load_index():
+            try:
+                self._build_index()
+            except (ValueError, AttributeError, IndexError) as exc:
+                # the scanner's regexes stop matching where a truncated file ends
+                self.close()
+                raise ValueError(f"{self.path} is truncated or not a results file") from exc
+
+    def __enter__(self) -> "SampleArchive":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._release_index()
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __len__(self) -> int:
+        if self._fallback is not None:
+            return len(self._fallback["samples"])
+        return len(self._spans) // 2
+
+    def _stat_key(self) -> Tuple[int, int]:
+        stat = self.path.stat()
+        return stat.st_size, stat.st_mtime_ns
+
+    def _release_index(self) -> None:
+        for view in self._views:
+            view.release()
+        self._views = []
+        if self._index_map is not None:
+            self._index_map.close()
+            self._index_file.close()
+            self._index_map = None
+
+    def _load_index(self) -> bool:
+        idx_path = index_path_for(self.path)
+        if not idx_path.exists():
+            return False
+        index_file = idx_path.open("rb")
+        header = index_file.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            index_file.close()
+            return False
+        magic, size, mtime_ns, count = _HEADER.unpack(header)
+        if magic != INDEX_MAGIC or (size, mtime_ns) != self._stat_key():
+            index_file.close()
+            return False
+        if count == 0:
+            index_file.close()
+            self._spans = array("Q")
+            return True
+        self._index_file = index_file
+        self._index_map = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+        block = 16 * count
+
+        def view(offset: int) -> memoryview:
+            v = memoryview(self._index_map)[offset : offset + block].cast("Q")
+            self._views.append(v)
+            return v
+
+        self._spans = view(_HEADER.size)
+        pos = _HEADER.size + block
+        fields: Dict[str, Sequence[int]] = {}
+        while pos < len(self._index_map):
+            (name_len,) = _SECTION.unpack_from(self._index_map, pos)
+            pos += _SECTION.size
+            name = self._index_map[pos : pos + name_len].decode("utf-8")
+            pos += name_len
+            fields[name] = view(pos)
+            pos += block
+        self._fields = fields
+        return True
+
+    def _build_index(self) -> None:
+        buf = self._map
+        spans = array("Q")
+        for key, vstart, _ in _members(buf, _skip_ws(buf, 0)):
+            if key == b"samples":
+                for s, e in _elements(buf, vstart):
+                    spans.append(s)
+                    spans.append(e)
+                break
+        self._spans = spans
+        self._fields = {}
+        self._save_index()
+
+    def _save_index(self) -> None:
+        if not self.write_index:
+            return
+        size, mtime_ns = self._stat_key()
+        idx_path = index_path_for(self.path)
+        tmp = idx_path.with_name(idx_path.name + ".tmp")
+        try:
+            with tmp.open("wb") as f:
+                f.write(_HEADER.pack(INDEX_MAGIC, size, mtime_ns, len(self._spans) // 2))
+                f.write(bytes(self._spans))
+                for name, field_spans in self._fields.items():
+                    encoded = name.encode("utf-8")
+                    f.write(_SECTION.pack(len(encoded)))
+                    f.write(encoded)
+                    f.write(bytes(field_spans))
+            # field sections were copied above, so the old map can go before the swap
+            fields = {name: array("Q", bytes(v)) for name, v in self._fields.items()}
+            spans = array("Q", bytes(self._spans))
+            self._release_index()
+            self._spans, self._fields = spans, fields
+            tmp.replace(idx_path)
+        except OSError:
+            pass  # read-only archives are still scanned, just not indexed
+
+    def _index_fields(self, fields: Sequence[str]) -> None:
+        missing = [f for f in fields if f not in self._fields]
+        if not missing:
+            return
+        tree = _field_tree(missing)
+        columns = {f: array("Q") for f in missing}
+        buf = self._map
+        spans = self._spans
+        for i in range(0, len(spans), 2):
+            found: Dict[str, Tuple[int, int]] = {}
+            _field_spans(buf, spans[i], tree, "", found)
+            for f, column in columns.items():
+                start, end = found.get(f, (0, 0))
+                column.append(start)
+                column.append(end)
+        self._fields.update(columns)
+        self._save_index()
+
+    def metadata(self) -> Dict[str, Any]:
+        if self._fallback is not None:
+            return self._fallback["metadata"]
+        buf = self._map
+        for key, vstart, vend in _members(buf, _skip_ws(buf, 0)):
+            if key == b"metadata":
+                return loads_json(buf[vstart:vend])
+        raise ValueError(f"{self.path} has no metadata")
+
+    def _blob(self, digest: str) -> str:
+        if self._blob_spans is None:
+            buf = self._map
+            self._blob_spans = {}
+            for key, vstart, _ in _members(buf, _skip_ws(buf, 0)):
+                if key == b"blobs":
+                    for h, bstart, bend in _members(buf, vstart):
+                        self._blob_spans[h] = (bstart, bend)
+        start, end = self._blob_spans[digest.encode("utf-8")]
+        return loads_json(self._map[start:end])
+
+    def project(self, fields: Sequence[str] = DEFAULT_FIELDS) -> Iterator[Dict[str, Any]]:
+        fields = list(fields)
+        if self._fallback is not None:
+            for sample in self._fallback["samples"]:
+                yield {f: _lookup(sample, f) for f in fields}
+            return
+        # blob-backed fields of compact runs are stored as "<name>_ref" digests
+        blob_names = {".".join(p) for p in BLOB_FIELDS} if self.compact else set()
+        stored = [f + "_ref" if f in blob_names else f for f in fields]
+        self._index_fields(stored)
+        buf = self._map
+        columns = [(f, f in blob_names, self._fields[s]) for f, s in zip(fields, stored)]
+        for i in range(0, len(self._spans), 2):
+            row: Dict[str, Any] = {}
+            for field, is_blob, column in columns:
+                start, end = column[i], column[i + 1]
+                if end == 0:
+                    row[field] = None
+                    continue
+                value = loads_json(buf[start:end])
+                row[field] = self._blob(value) if is_blob else value
+            yield row
+
+    def sample(self, i: int) -> Dict[str, Any]:
+        if self._fallback is not None:
+            return self._fallback["samples"][i]
+        data = loads_json(self._map[self._spans[2 * i] : self._spans[2 * i + 1]])
+        if self.compact:
+            for field_path in BLOB_FIELDS:
+                parent = _lookup(data, ".".join(field_path[:-1])) if len(field_path) > 1 else data
+                ref_name = field_path[-1] + "_ref"
+                if isinstance(parent, dict) and ref_name in parent:
+                    parent[field_path[-1]] = self._blob(parent.pop(ref_name))
+        return data
+
+
+def iter_sample_fields(
+    paths: str | Path | Iterable[str | Path],
+    fields: Sequence[str] = DEFAULT_FIELDS,
+    write_index: bool = True,
+) -> Iterator[Dict[str, Any]]:
+    if isinstance(paths, (str, Path)):
+        paths = [paths]
+    for path in paths:
+        with SampleArchive(path, write_index=write_index) as archive:
+            yield from archive.project(fields)
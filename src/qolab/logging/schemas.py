@@ -1,12 +1,31 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
-from pydantic import BaseModel, Field
+from typing import Annotated, Any, Dict, List, Optional
+
+from pydantic import BaseModel, ConfigDict, Field, PlainSerializer, PlainValidator, WithJsonSchema
+
+from .score_map import ScoreMap, plain_scores, score_map_or_none
+
+# Held as compact ScoreMaps, read and written as plain dicts.
+Scores = Annotated[
+    ScoreMap,
+    PlainValidator(ScoreMap.coerce),
+    PlainSerializer(plain_scores),
+    WithJsonSchema({"type": "object"}),
+]
+OptionalScores = Annotated[
+    Optional[ScoreMap],
+    PlainValidator(score_map_or_none),
+    PlainSerializer(plain_scores),
+    WithJsonSchema({"anyOf": [{"type": "object"}, {"type": "null"}]}),
+]
 
 
 class SampleScores(BaseModel):
-    heuristics: Dict[str, Any]
-    judge: Optional[Dict[str, Any]] = None
+    model_config = ConfigDict(validate_assignment=True)
+
+    heuristics: Scores
+    judge: OptionalScores = None
     final_score: float
 
 
@@ -16,6 +35,10 @@ class SampleRecord(BaseModel):
     full_prompt: str
     output_text: str
     scores: SampleScores
+    abort_reason: Optional[str] = None
+    repeat: int = 0
+    # dataset-driven cases: id of the row that filled the templates
+    row_id: Optional[str] = None
 
 
 class RunMetadata(BaseModel):
@@ -28,6 +51,14 @@ class RunMetadata(BaseModel):
     used_judge: bool
     temperatures: List[float]
     variants: List[str]
+    usage: Optional[Dict[str, Any]] = None
+    stopped_reason: Optional[str] = None
+    triage: Optional[Dict[str, Any]] = None
+    dataset: Optional[Dict[str, Any]] = None
+    # per-kind call latency percentiles (seconds), hedging and deadline
+    latency: Optional[Dict[str, Any]] = None
+    # per logical model: routing and each endpoint's calls, errors, throughput and breaker
+    endpoints: Optional[Dict[str, Any]] = None
 
 
 class RunResults(BaseModel):
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import sys
+import threading
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, Tuple
+
+# In-memory form of the score dicts (heuristics, judge and the judge's
+# scores/checks/rationales). Every sample of a run has the same keys, so the
+# keys live once in a shared, interned KeyLayout and each record only holds a
+# tuple of values: a 7-entry heuristics dict shrinks from ~360 to ~130 bytes
+# and a full judge result to about a third. Records are read-only Mappings and
+# convert back to the exact dicts they came from (key order, value types and
+# nesting are kept), so the JSON files do not change.
+
+
+class KeyLayout:
+    __slots__ = ("keys", "index")
+
+    def __init__(self, keys: Tuple[str, ...]):
+        self.keys = keys
+        self.index = {k: i for i, k in enumerate(keys)}
+
+
+_layouts: Dict[Tuple[str, ...], KeyLayout] = {}
+_layouts_lock = threading.Lock()
+
+
+def layout_for(keys: Tuple[str, ...]) -> KeyLayout:
+    layout = _layouts.get(keys)
+    if layout is None:
+        with _layouts_lock:
+            layout = _layouts.setdefault(keys, KeyLayout(tuple(sys.intern(k) for k in keys)))
+    return layout
+
+
+class ScoreMap(Mapping):
+    __slots__ = ("_layout", "_values")
+
+    def __init__(self, layout: KeyLayout, values: Tuple[Any, ...]):
+        self._layout = layout
+        self._values = values
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ScoreMap":
+        # nested dicts become ScoreMaps too; lists and scalars are kept as they are
+        values = tuple(cls.from_dict(v) if isinstance(v, dict) else v for v in data.values())
+        return cls(layout_for(tuple(data)), values)
+
+    @classmethod
+    def coerce(cls, value: Any) -> "ScoreMap":
+        if isinstance(value, cls):
+            return value
+        if isinstance(value, Mapping):
+            return cls.from_dict(dict(value))
+        raise TypeError(f"expected a mapping of scores, got {type(value).__name__}")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            k: v.to_dict() if isinstance(v, ScoreMap) else v for k, v in zip(self._layout.keys, self._values)
+        }
+
+    def __getitem__(self, key: str) -> Any:
+        return self._values[self._layout.index[key]]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        i = self._layout.index.get(key)
+        return default if i is None else self._values[i]
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._layout.index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._layout.keys)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __repr__(self) -> str:
+        return f"ScoreMap({self.to_dict()!r})"
+
+    def __reduce__(self) -> Any:
+        # pickles (process pools, caches) as a plain dict
+        return ScoreMap.from_dict, (self.to_dict(),)
+
+
+def score_map_or_none(value: Any) -> Any:
+    return None if value is None else ScoreMap.coerce(value)
+
+
+def plain_scores(value: Any) -> Any:
+    return value.to_dict() if isinstance(value, ScoreMap) else value
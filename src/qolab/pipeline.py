@@ -1,34 +1,72 @@
 from __future__ import annotations
 
 import datetime as dt
+import json
 import os
+import time
+from collections import deque
 from dataclasses import asdict
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple
 
-from dotenv import load_dotenv
-
-from .evaluation.aggregation import compute_final_score
+from .dataset import DEFAULT_ROWS_IN_FLIGHT, DatasetSpec, dataset_rows
+from .evaluation.aggregation import DEFAULT_PROFILE, WeightProfile, compute_final_score
 from .evaluation.heuristics import evaluate_heuristics
 from .evaluation.judge import call_judge
 from .evaluation.rubric import load_rubric
-from .generation.client import LLMClient, OpenAIClientConfig, DEFAULT_MODEL, DEFAULT_JUDGE_MODEL
+from .evaluation.streaming import ConstraintMonitor, apply_abort_penalty, replay
+from .evaluation.surrogate import DEFAULT_TRIAGE_MARGIN, triage
+from .generation.client import (
+    LLMClient,
+    OpenAIClientConfig,
+    DEFAULT_MAX_TOKENS,
+    DEFAULT_MODEL,
+    DEFAULT_JUDGE_MODEL,
+)
+from .generation.budget import BudgetExceeded, BudgetGuard, max_tokens_for_words
+from .generation.hedging import DEFAULT_TIMEOUT, Deadline, RequestPolicy
 from .generation.dryrun import generate_dryrun
 from .generation.prompts import CaseConfig, PromptVariant, render_user_prompt
-from .logging.run_store import save_run
+from .logging.metrics import REQUEST_KINDS, LatencyTracker
+from .logging.run_store import RunStreamWriter, create_run_dir, results_filename, save_run
 from .logging.schemas import RunMetadata, RunResults, SampleRecord, SampleScores
+from .report import TOP_N, load_stats, stats_from_results, write_stats
 from .utils.io import load_json, load_text
 
+if TYPE_CHECKING:
+    from .evaluation.relevance import RelevanceIdf
+    from .evaluation.surrogate import SurrogateJudge
+    from .generation.client import LLMClient as _LLMClient
+    from .generation.endpoints import EndpointPools
+    from .logging.metrics import SweepMetrics
+    from .utils.cache import FileCache, ResponseCache
+
 
 TEMPERATURES = [0.2, 0.7, 1.0]
 
+JUDGE_DEADLINE_SKIP = "skipped: run deadline reached"
+
+CTA_PHRASES = [
+    "book a demo",
+    "book your demo",
+    "try it",
+    "dm me",
+    "contact us",
+    "start a trial",
+]
+
+
+def load_case(path: str, cache: "FileCache | None" = None) -> Dict[str, Any]:
+    return cache.load_json(path) if cache is not None else load_json(path)
 
-def load_case(path: str) -> Dict[str, Any]:
-    return load_json(path)
 
+def load_suite(path: str, cache: "FileCache | None" = None) -> Dict[str, Any]:
+    return cache.load_json(path) if cache is not None else load_json(path)
 
-def load_suite(path: str) -> Dict[str, Any]:
-    return load_json(path)
+
+def load_keywords(path: str, cache: "FileCache | None" = None) -> List[str]:
+    keywords_text = cache.load_text(path) if cache is not None else load_text(path)
+    return [k.strip() for k in keywords_text.splitlines() if k.strip()]
 
 
 def build_case_config(case_data: Dict[str, Any]) -> CaseConfig:
@@ -64,55 +102,461 @@ def run_experiment(
     model: str | None = None,
     judge_model: str | None = None,
     rubric_path: str | None = None,
+    cache: "FileCache | None" = None,
+    llm_client: "_LLMClient | None" = None,
+    judge_client: Any = None,
+    response_cache: "ResponseCache | None" = None,
+    compact: bool = False,
+    compression: str | None = None,
+    budget: BudgetGuard | None = None,
+    stream: bool = False,
+    repeats: int = 1,
+    metrics: "SweepMetrics | None" = None,
+    surrogate: "SurrogateJudge | None" = None,
+    triage_margin: float = DEFAULT_TRIAGE_MARGIN,
+    rows_in_flight: int = DEFAULT_ROWS_IN_FLIGHT,
+    request_timeout: float = DEFAULT_TIMEOUT,
+    hedge: bool = False,
+    deadline: float | None = None,
+    endpoints: "EndpointPools | None" = None,
 ) -> Path:
+    # deadline: seconds for the whole run; once it passes, the remaining
+    # samples are still generated but no longer judged. endpoints: pools of
+    # endpoints per model; a model without a pool uses OPENAI_API_KEY.
+    from dotenv import load_dotenv
+
     load_dotenv()
+    run_deadline = Deadline(deadline) if deadline is not None else None
 
-    case_data = load_case(case_path)
-    suite_data = load_suite(suite_path)
+    case_data = load_case(case_path, cache)
+    suite_data = load_suite(suite_path, cache)
 
     case = build_case_config(case_data)
     variants = build_variants(suite_data)
+    weights = WeightProfile.from_case(case_data)
 
     keywords = []
     if case.keywords_file:
-        keywords_text = load_text(case.keywords_file)
-        keywords = [k.strip() for k in keywords_text.splitlines() if k.strip()]
-
-    cta_phrases = [
-        "book a demo",
-        "book your demo",
-        "try it",
-        "dm me",
-        "contact us",
-        "start a trial",
-    ]
+        keywords = load_keywords(case.keywords_file, cache)
 
     generator_model = model or DEFAULT_MODEL
     judge_model = judge_model or DEFAULT_JUDGE_MODEL
 
     api_key = os.getenv("OPENAI_API_KEY")
 
-    llm_client = None
-    if not dry_run:
-        llm_client = LLMClient(OpenAIClientConfig(api_key=api_key, model=generator_model))
+    if dry_run:
+        llm_client = None
+    elif llm_client is None:
+        llm_client = LLMClient(
+            OpenAIClientConfig(
+                api_key=api_key,
+                model=generator_model,
+                timeout=request_timeout,
+                hedge=hedge,
+                endpoints=endpoints.get(generator_model) if endpoints is not None else None,
+            )
+        )
+    judge_policy = RequestPolicy(timeout=request_timeout, hedge=hedge)
+    latency = RunLatency(llm_client, judge_policy)
 
-    judge_client = None
     rubric = None
     if use_judge:
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY is required when using --use-judge.")
-        from openai import OpenAI as JudgeClient
-
-        judge_client = JudgeClient(api_key=api_key)
+        if judge_client is None and endpoints is not None:
+            judge_client = endpoints.get(judge_model)
+        if judge_client is None:
+            if not api_key:
+                raise ValueError("OPENAI_API_KEY is required when using --use-judge.")
+            from openai import OpenAI as JudgeClient
+
+            judge_client = JudgeClient(api_key=api_key)
         rubric_path = rubric_path or "configs/rubrics/judge_rubric_v1.json"
-        rubric = load_rubric(rubric_path)
+        rubric = load_rubric(rubric_path, cache)
+    else:
+        judge_client = None
+
+    metadata = build_run_metadata(case_data, suite_data, generator_model, judge_model, use_judge)
+    spec = DatasetSpec.from_case(case_data)
+    if spec is not None:
+        if surrogate is not None:
+            raise ValueError("Surrogate triage ranks a whole run up front; it is not supported for dataset cases.")
+        if compact:
+            raise ValueError("Dataset runs are written incrementally and cannot use the compact format.")
+        return _run_dataset(
+            spec,
+            case,
+            variants,
+            keywords,
+            metadata,
+            runs_dir,
+            dry_run=dry_run,
+            llm_client=llm_client,
+            judge_client=judge_client,
+            judge_model=judge_model,
+            rubric=rubric,
+            response_cache=response_cache,
+            compression=compression,
+            budget=budget,
+            stream=stream,
+            repeats=repeats,
+            metrics=metrics,
+            weights=weights,
+            rows_in_flight=rows_in_flight,
+            judge_policy=judge_policy,
+            deadline=run_deadline,
+            latency=latency,
+            endpoints=endpoints,
+        )
 
-    slug = case.name.lower().replace(" ", "_")
-    timestamp = dt.datetime.utcnow().strftime("%Y-%m-%d_%H%M%S")
-    run_id = f"{timestamp}_{slug}"
+    results = RunResults(metadata=metadata)
+    case_desc = build_case_description(case)
+    max_tokens = max_tokens_for_words(case.constraints.get("max_words"), DEFAULT_MAX_TOKENS)
+    if metrics is not None:
+        metrics.add_cells(len(variants) * len(TEMPERATURES) * repeats)
+    deferred: List[int] = []
+
+    try:
+        for variant in variants:
+            for temp in TEMPERATURES:
+                for repeat in range(repeats):
+                    full_prompt, output, abort_reason = generate_output(
+                        case,
+                        variant,
+                        temp,
+                        dry_run=dry_run,
+                        llm_client=llm_client,
+                        stream=stream,
+                        max_tokens=max_tokens,
+                        budget=budget,
+                        repeat=repeat,
+                        metrics=metrics,
+                        latency=latency.generation,
+                    )
+                    heuristics_scores = score_heuristics(output, case.constraints, keywords, abort_reason)
+
+                    judge_scores: Dict[str, Any] | None = None
+                    if use_judge and judge_client and rubric and surrogate is not None and abort_reason is None:
+                        # judged after the loop, once the whole run can be ranked
+                        deferred.append(len(results.samples))
+                    elif use_judge and judge_client and rubric:
+                        try:
+                            judge_scores = judge_output(
+                                judge_client,
+                                judge_model,
+                                rubric,
+                                case_desc,
+                                case.constraints,
+                                keywords,
+                                output,
+                                abort_reason,
+                                cache=response_cache,
+                                budget=budget,
+                                metrics=metrics,
+                                policy=judge_policy,
+                                deadline=run_deadline,
+                                latency=latency.judge,
+                            )
+                        except BudgetExceeded:
+                            # the generation is already paid for; keep it unjudged and stop
+                            results.samples.append(
+                                build_sample_record(
+                                    variant.name, temp, full_prompt, output, heuristics_scores, None, repeat=repeat
+                                )
+                            )
+                            raise
+
+                    results.samples.append(
+                        build_sample_record(
+                            variant.name,
+                            temp,
+                            full_prompt,
+                            output,
+                            heuristics_scores,
+                            judge_scores,
+                            abort_reason,
+                            repeat,
+                        )
+                    )
+                    if metrics is not None:
+                        metrics.cell_done(aborted=abort_reason is not None)
+
+        # before triage, which ranks on the final scores
+        apply_relevance(results.samples, case)
+        if deferred:
+            judge_triaged(
+                [results.samples[i] for i in deferred],
+                surrogate,
+                lambda text: judge_output(
+                    judge_client,
+                    judge_model,
+                    rubric,
+                    case_desc,
+                    case.constraints,
+                    keywords,
+                    text,
+                    cache=response_cache,
+                    budget=budget,
+                    metrics=metrics,
+                    policy=judge_policy,
+                    latency=latency.judge,
+                ),
+                metadata,
+                triage_margin,
+                weights,
+                run_deadline,
+            )
+    except BudgetExceeded as exc:
+        metadata.stopped_reason = f"budget exceeded: {exc}"
+        apply_relevance(results.samples, case)
 
-    metadata = RunMetadata(
-        run_id=run_id,
+    if budget is not None:
+        metadata.usage = budget.summary()
+    metadata.latency = latency.summary(run_deadline, count_deadline_skips(results.samples))
+    if endpoints is not None:
+        metadata.endpoints = endpoints.summary()
+
+    finalize_scores(results.samples, used_judge=use_judge, weights=weights)
+
+    results_path = save_run(results, runs_dir, compact=compact, compression=compression)
+    write_stats(results_path, stats_from_results(results))
+    return results_path
+
+
+def _run_dataset(
+    spec: DatasetSpec,
+    case: CaseConfig,
+    variants: List[PromptVariant],
+    keywords: List[str],
+    metadata: RunMetadata,
+    runs_dir: str,
+    dry_run: bool,
+    llm_client: "_LLMClient | None",
+    judge_client: Any,
+    judge_model: str,
+    rubric: Any,
+    response_cache: "ResponseCache | None",
+    compression: str | None,
+    budget: BudgetGuard | None,
+    stream: bool,
+    repeats: int,
+    metrics: "SweepMetrics | None",
+    weights: WeightProfile,
+    rows_in_flight: int,
+    judge_policy: RequestPolicy,
+    deadline: Deadline | None,
+    latency: "RunLatency",
+    endpoints: "EndpointPools | None",
+) -> Path:
+    # Rows are read lazily and at most `rows_in_flight` of them are being
+    # generated at once; each row's samples are written out in row order as
+    # soon as it finishes, so memory does not grow with the dataset.
+    from concurrent.futures import ThreadPoolExecutor
+
+    if rows_in_flight < 1:
+        raise ValueError("rows_in_flight must be at least 1.")
+    max_tokens = max_tokens_for_words(case.constraints.get("max_words"), DEFAULT_MAX_TOKENS)
+    cells_per_row = len(variants) * len(TEMPERATURES) * repeats
+    judge = rubric if judge_client is not None else None
+
+    def run_row(row_id: str, row: Dict[str, Any]) -> Tuple[List[SampleRecord], str | None]:
+        # returns the row's samples and, if the budget ran out, why
+        samples: List[SampleRecord] = []
+        stopped = None
+        case_desc = build_case_description(case, row)
+        try:
+            for variant in variants:
+                for temp in TEMPERATURES:
+                    for repeat in range(repeats):
+                        full_prompt, output, abort_reason = generate_output(
+                            case,
+                            variant,
+                            temp,
+                            dry_run=dry_run,
+                            llm_client=llm_client,
+                            stream=stream,
+                            max_tokens=max_tokens,
+                            budget=budget,
+                            repeat=repeat,
+                            metrics=metrics,
+                            row=row,
+                            latency=latency.generation,
+                        )
+                        heuristics_scores = score_heuristics(output, case.constraints, keywords, abort_reason)
+                        judge_scores: Dict[str, Any] | None = None
+                        if judge is not None:
+                            try:
+                                judge_scores = judge_output(
+                                    judge_client,
+                                    judge_model,
+                                    judge,
+                                    case_desc,
+                                    case.constraints,
+                                    keywords,
+                                    output,
+                                    abort_reason,
+                                    cache=response_cache,
+                                    budget=budget,
+                                    metrics=metrics,
+                                    policy=judge_policy,
+                                    deadline=deadline,
+                                    latency=latency.judge,
+                                )
+                            except BudgetExceeded:
+                                samples.append(
+                                    build_sample_record(
+                                        variant.name,
+                                        temp,
+                                        full_prompt,
+                                        output,
+                                        heuristics_scores,
+                                        None,
+                                        repeat=repeat,
+                                        row_id=row_id,
+                                    )
+                                )
+                                raise
+                        samples.append(
+                            build_sample_record(
+                                variant.name,
+                                temp,
+                                full_prompt,
+                                output,
+                                heuristics_scores,
+                                judge_scores,
+                                abort_reason,
+                                repeat,
+                                row_id,
+                            )
+                        )
+                        if metrics is not None:
+                            metrics.cell_done(aborted=abort_reason is not None)
+        except BudgetExceeded as exc:
+            stopped = str(exc)
+        return samples, stopped
+
+    rows, total = dataset_rows(spec)
+    run_dir = create_run_dir(runs_dir, metadata)
+    writer = RunStreamWriter(run_dir / results_filename(compression), compression)
+    done = 0
+    deadline_skips = 0
+    window: deque = deque()
+
+    def drain_one() -> None:
+        nonlocal done, deadline_skips
+        samples, stopped = window.popleft().result()
+        finalize_scores(samples, used_judge=metadata.used_judge, weights=weights)
+        for sample in samples:
+            writer.append(sample)
+        done += 1
+        deadline_skips += count_deadline_skips(samples)
+        if stopped and metadata.stopped_reason is None:
+            metadata.stopped_reason = f"budget exceeded: {stopped}"
+
+    try:
+        with ThreadPoolExecutor(max_workers=rows_in_flight) as pool:
+            for row_id, row in rows:
+                if metadata.stopped_reason is not None:
+                    break
+                if metrics is not None:
+                    metrics.add_cells(cells_per_row)
+                window.append(pool.submit(run_row, row_id, row))
+                if len(window) >= rows_in_flight:
+                    drain_one()
+            while window:
+                drain_one()
+    finally:
+        metadata.dataset = {**asdict(spec), "rows": done, "total_rows": total}
+        if budget is not None:
+            metadata.usage = budget.summary()
+        metadata.latency = latency.summary(deadline, deadline_skips)
+        if endpoints is not None:
+            metadata.endpoints = endpoints.summary()
+        results_path = writer.close(metadata)
+
+    if case.constraints.get("relevance"):
+        # relevance needs the IDF of every output in the run, so it is added
+        # in a second streamed pass once they are all written
+        return _rescore_dataset(results_path, None, None, heuristics=False)
+    load_stats(results_path)
+    return results_path
+
+
+class RunLatency:
+    # Latency of one run's calls as the pipeline saw them (retries and hedges
+    # included), plus how often the request policies hedged during the run.
+    def __init__(self, llm_client: Any, judge_policy: RequestPolicy):
+        self.generation = LatencyTracker()
+        self.judge = LatencyTracker()
+        self._policies = {"generation": getattr(llm_client, "policy", None), "judge": judge_policy}
+        self._start = {kind: p.counters() if p else (0, 0) for kind, p in self._policies.items()}
+
+    def summary(self, deadline: Deadline | None, deadline_skips: int) -> Dict[str, Any]:
+        summary: Dict[str, Any] = {}
+        for kind in REQUEST_KINDS:
+            policy = self._policies[kind]
+            hedged, wins = policy.counters() if policy else (0, 0)
+            summary[kind] = {
+                **getattr(self, kind).summary(),
+                "timeout": policy.timeout if policy else None,
+                "hedged": hedged - self._start[kind][0],
+                "hedge_wins": wins - self._start[kind][1],
+            }
+        if deadline is not None:
+            summary["deadline"] = {
+                "seconds": deadline.seconds,
+                "reached": deadline.expired(),
+                "judge_skipped": deadline_skips,
+            }
+        return summary
+
+
+def judge_triaged(
+    samples: List[SampleRecord],
+    surrogate: "SurrogateJudge",
+    judge: Any,
+    metadata: RunMetadata,
+    margin: float = DEFAULT_TRIAGE_MARGIN,
+    weights: WeightProfile | None = None,
+    deadline: Deadline | None = None,
+) -> None:
+    # Every sample first gets the surrogate's scores, so a budget stop or a
+    # run deadline part way through still leaves the run fully scored; the
+    # samples that could change the reported ranking are then re-scored by
+    # the real judge, best predicted first.
+    predicted, spread = surrogate.predict(
+        [s.output_text for s in samples], [s.scores.heuristics for s in samples]
+    )
+    weights = weights or DEFAULT_PROFILE
+    finals = []
+    for sample, row in zip(samples, predicted):
+        sample.scores.judge = surrogate.judge_scores(row)
+        scores = {"scores": {"heuristics": sample.scores.heuristics, "judge": sample.scores.judge}}
+        finals.append(compute_final_score(scores, used_judge=True, weights=weights))
+    selected = triage(finals, spread.tolist(), surrogate.rmse_total, TOP_N, margin, judge_weight=weights.judge)
+    metadata.triage = {
+        "predicted": len(samples),
+        "sent_to_judge": sum(selected),
+        "judged": 0,
+        "margin": margin,
+        "surrogate_rmse_total": round(surrogate.rmse_total, 3),
+    }
+    for i in sorted((i for i, keep in enumerate(selected) if keep), key=lambda i: -finals[i]):
+        if deadline is not None and deadline.expired():
+            break
+        samples[i].scores.judge = judge(samples[i].output_text)
+        metadata.triage["judged"] += 1
+
+
+def build_run_metadata(
+    case_data: Dict[str, Any],
+    suite_data: Dict[str, Any],
+    generator_model: str,
+    judge_model: str,
+    use_judge: bool,
+) -> RunMetadata:
+    slug = case_data["name"].lower().replace(" ", "_")
+    timestamp = dt.datetime.utcnow().strftime("%Y-%m-%d_%H%M%S")
+    return RunMetadata(
+        run_id=f"{timestamp}_{slug}",
         created_at=dt.datetime.utcnow().isoformat(),
         case=case_data,
         suite=suite_data,
@@ -120,159 +564,326 @@ def run_experiment(
         judge_model=judge_model if use_judge else None,
         used_judge=use_judge,
         temperatures=TEMPERATURES,
-        variants=[v.name for v in variants],
+        variants=[v["name"] for v in suite_data["variants"]],
     )
 
-    results = RunResults(metadata=metadata)
 
-    for variant in variants:
-        for temp in TEMPERATURES:
-            user_prompt = render_user_prompt(variant.user_prompt_template, case)
-            full_prompt = f"SYSTEM:\n{variant.system_prompt}\n\nUSER:\n{user_prompt}"
-            if dry_run:
-                output = generate_dryrun(case.name, variant.name, temp)
-            else:
-                assert llm_client is not None
-                output = llm_client.generate(variant.system_prompt, user_prompt, temp)
-
-            heuristics_scores = evaluate_heuristics(
-                output,
-                case.constraints,
-                keywords,
-                cta_phrases,
-            )
+def ensure_single_case(case_data: Dict[str, Any], mode: str) -> None:
+    if case_data.get("dataset"):
+        raise ValueError(f"Dataset-driven cases are not supported by {mode}; use qolab run.")
 
-            judge_scores: Dict[str, Any] | None = None
-            if use_judge and judge_client and rubric:
-                case_desc = (
-                    f"Task: {case.task}\n"
-                    f"Audience: {case.audience}\n"
-                    f"Tone: {case.tone}\n"
-                    f"Constraints: {case.constraints}"
-                )
-                judge_result = call_judge(
-                    judge_client,
-                    judge_model,
-                    rubric,
-                    case_desc,
-                    case.constraints,
-                    keywords,
-                    output,
-                )
-                judge_scores = judge_result
 
-            scores = {
-                "heuristics": heuristics_scores,
-                "judge": judge_scores,
-            }
-            sample_dict = {
-                "variant_name": variant.name,
-                "temperature": float(temp),
-                "full_prompt": full_prompt,
-                "output_text": output,
-                "scores": scores,
-            }
-            sample_record = SampleRecord(
-                **{
-                    **sample_dict,
-                    "scores": SampleScores(
-                        heuristics=heuristics_scores,
-                        judge=judge_scores,
-                        final_score=0.0,  # placeholder
-                    ),
-                }
-            )
-            results.samples.append(sample_record)
+def build_prompts(
+    case: CaseConfig, variant: PromptVariant, row: Dict[str, Any] | None = None
+) -> Tuple[str, str]:
+    user_prompt = render_user_prompt(variant.user_prompt_template, case, row)
+    return user_prompt, f"SYSTEM:\n{variant.system_prompt}\n\nUSER:\n{user_prompt}"
+
+
+def generate_output(
+    case: CaseConfig,
+    variant: PromptVariant,
+    temperature: float,
+    dry_run: bool,
+    llm_client: "_LLMClient | None" = None,
+    stream: bool = False,
+    max_tokens: int = DEFAULT_MAX_TOKENS,
+    budget: BudgetGuard | None = None,
+    repeat: int = 0,
+    metrics: "SweepMetrics | None" = None,
+    row: Dict[str, Any] | None = None,
+    latency: LatencyTracker | None = None,
+) -> Tuple[str, str, str | None]:
+    # returns (full_prompt, output, abort_reason)
+    user_prompt, full_prompt = build_prompts(case, variant, row)
+    if dry_run:
+        output = generate_dryrun(case.name, variant.name, temperature)
+        if stream:
+            return (full_prompt, *replay(ConstraintMonitor.from_constraints(case.constraints), output))
+        return full_prompt, output, None
+    assert llm_client is not None
+    started = time.perf_counter()
+    if stream:
+        generated = llm_client.generate_stream(
+            variant.system_prompt,
+            user_prompt,
+            temperature,
+            ConstraintMonitor.from_constraints(case.constraints),
+            max_tokens=max_tokens,
+            budget=budget,
+            repeat=repeat,
+            metrics=metrics,
+        )
+        if latency is not None:
+            latency.observe(time.perf_counter() - started)
+        return full_prompt, generated.text, generated.abort_reason
+    output = llm_client.generate(
+        variant.system_prompt,
+        user_prompt,
+        temperature,
+        max_tokens=max_tokens,
+        budget=budget,
+        repeat=repeat,
+        metrics=metrics,
+    )
+    if latency is not None:
+        latency.observe(time.perf_counter() - started)
+    return full_prompt, output, None
+
+
+def score_heuristics(
+    output: str,
+    constraints: Dict[str, Any],
+    keywords: List[str],
+    abort_reason: str | None = None,
+) -> Dict[str, Any]:
+    scores = evaluate_heuristics(output, constraints, keywords, CTA_PHRASES)
+    if abort_reason is not None:
+        scores = apply_abort_penalty(scores, abort_reason)
+    return scores
+
+
+def judge_output(
+    judge_client: Any,
+    judge_model: str,
+    rubric: Dict[str, Any],
+    case_description: str,
+    constraints: Dict[str, Any],
+    keywords: List[str],
+    output: str,
+    abort_reason: str | None = None,
+    cache: "ResponseCache | None" = None,
+    budget: BudgetGuard | None = None,
+    metrics: "SweepMetrics | None" = None,
+    policy: RequestPolicy | None = None,
+    deadline: Deadline | None = None,
+    latency: LatencyTracker | None = None,
+) -> Dict[str, Any]:
+    if abort_reason is not None:
+        # a truncated output is not worth a judge call; score it like any
+        # other unjudged sample
+        return _skipped_judge(f"skipped: generation aborted ({abort_reason})")
+    if deadline is not None and deadline.expired():
+        return _skipped_judge(JUDGE_DEADLINE_SKIP)
+    started = time.perf_counter()
+    try:
+        scores = call_judge(
+            judge_client,
+            judge_model,
+            rubric,
+            case_description,
+            constraints,
+            keywords,
+            output,
+            cache=cache,
+            budget=budget,
+            metrics=metrics,
+            policy=policy,
+            deadline=deadline,
+        )
+    except BudgetExceeded:
+        raise
+    except Exception:
+        # a call cut short by the run deadline degrades like the ones after it
+        if deadline is not None and deadline.expired():
+            return _skipped_judge(JUDGE_DEADLINE_SKIP)
+        raise
+    if latency is not None:
+        latency.observe(time.perf_counter() - started)
+    return scores
+
+
+def relevance_query(case: CaseConfig, row: Dict[str, Any] | None = None) -> str:
+    query = f"{case.task}\n{case.audience}"
+    if row:
+        query += "\n" + " ".join(str(v) for v in row.values())
+    return query
+
+
+def apply_relevance(
+    samples: List[SampleRecord],
+    case: CaseConfig,
+    row: Dict[str, Any] | None = None,
+    idf: "RelevanceIdf | None" = None,
+) -> None:
+    # opt-in with "relevance": true in the case constraints; needs the IDF of
+    # the whole run, so it runs after generation rather than inside
+    # score_heuristics. Without `idf` it is fitted on `samples`.
+    if not samples or not case.constraints.get("relevance"):
+        return
+    from .evaluation.relevance import add_relevance, relevance_scores
+
+    scores = relevance_scores(relevance_query(case, row), [s.output_text for s in samples], idf)
+    for sample, score in zip(samples, scores):
+        sample.scores.heuristics = add_relevance(sample.scores.heuristics, score)
+
+
+def count_deadline_skips(samples: List[SampleRecord]) -> int:
+    return sum(
+        1 for s in samples if s.scores.judge is not None and s.scores.judge.get("judge_error") == JUDGE_DEADLINE_SKIP
+    )
+
+
+def build_case_description(case: CaseConfig, row: Dict[str, Any] | None = None) -> str:
+    description = (
+        f"Task: {case.task}\n"
+        f"Audience: {case.audience}\n"
+        f"Tone: {case.tone}\n"
+        f"Constraints: {case.constraints}"
+    )
+    if row:
+        description += f"\nInput: {json.dumps(row, ensure_ascii=False, default=str)}"
+    return description
+
+
+def build_sample_record(
+    variant_name: str,
+    temperature: float,
+    full_prompt: str,
+    output: str,
+    heuristics_scores: Dict[str, Any],
+    judge_scores: Dict[str, Any] | None,
+    abort_reason: str | None = None,
+    repeat: int = 0,
+    row_id: str | None = None,
+) -> SampleRecord:
+    return SampleRecord(
+        variant_name=variant_name,
+        temperature=float(temperature),
+        full_prompt=full_prompt,
+        output_text=output,
+        scores=SampleScores(
+            heuristics=heuristics_scores,
+            judge=judge_scores,
+            final_score=0.0,  # placeholder
+        ),
+        abort_reason=abort_reason,
+        repeat=repeat,
+        row_id=row_id,
+    )
+
+
+def _skipped_judge(reason: str) -> Dict[str, Any]:
+    return {
+        "checks": None,
+        "scores": None,
+        "rationales": None,
+        "total_judge": None,
+        "judge_error": reason,
+        "raw_judge": "",
+    }
 
-    for s in results.samples:
+
+def finalize_scores(samples: List[SampleRecord], used_judge: bool, weights: WeightProfile | None = None) -> None:
+    for s in samples:
         s.scores.final_score = compute_final_score(
             {"scores": {"heuristics": s.scores.heuristics, "judge": s.scores.judge}},
-            used_judge=use_judge,
+            used_judge=used_judge,
+            weights=weights,
         )
 
-    results_path = save_run(results, runs_dir)
-    return results_path
 
+def rescore_run(
+    results_path: str | Path,
+    case_path: str | None = None,
+    cache: "FileCache | None" = None,
+) -> Path:
+    from .logging.run_store import is_compact_run, load_run, write_run
+    from .logging.sample_index import SampleArchive
 
-def render_summary_markdown(results_path: str | Path, output_path: str | Path | None = None) -> Path:
-    from .logging.run_store import load_run
+    with SampleArchive(results_path) as archive:
+        dataset = archive.metadata().get("dataset")
+    if dataset:
+        return _rescore_dataset(Path(results_path), case_path, cache)
 
+    compact = is_compact_run(results_path)
     run = load_run(results_path)
-    samples = list(run.samples)
-    samples.sort(key=lambda s: s.scores.final_score, reverse=True)
-
-    lines: List[str] = []
-    md_append = lines.append
-
-    md_append(f"# Run Summary: {run.metadata.run_id}")
-    md_append("")
-    md_append("## Metadata")
-    md_append(f"- Case: **{run.metadata.case.get('name', '')}**")
-    md_append(f"- Generator model: `{run.metadata.generator_model}`")
-    if run.metadata.used_judge:
-        md_append(f"- Judge model: `{run.metadata.judge_model}`")
-    md_append(f"- Temperatures: {', '.join(str(t) for t in run.metadata.temperatures)}")
-    md_append(f"- Variants: {', '.join(run.metadata.variants)}")
-    md_append(f"- Judge enabled: {run.metadata.used_judge}")
-    md_append("")
-
-    md_append("## Scores Overview")
-    md_append("")
-    header = "| Variant | Temp | Heuristics | Judge | Final |"
-    md_append(header)
-    md_append("|---|---|---|---|---|")
-    for s in samples:
-        heur_total = s.scores.heuristics.get("total_heuristics", 0)
-        judge_total = None
-        if s.scores.judge:
-            judge_total = s.scores.judge.get("total_judge")
-        md_append(
-            f"| {s.variant_name} | {s.temperature:.1f} | {heur_total:.1f} | "
-            f"{'' if judge_total is None else f'{judge_total:.1f}'} | {s.scores.final_score:.1f} |"
-        )
+    case_data = load_case(case_path, cache) if case_path else run.metadata.case
+    case = build_case_config(case_data)
+    keywords = load_keywords(case.keywords_file, cache) if case.keywords_file else []
 
-    md_append("")
-    md_append("## Top 3 Outputs")
-    md_append("")
+    for s in run.samples:
+        s.scores.heuristics = score_heuristics(s.output_text, case.constraints, keywords, s.abort_reason)
+    apply_relevance(run.samples, case)
+    finalize_scores(run.samples, used_judge=run.metadata.used_judge, weights=WeightProfile.from_case(case_data))
+    run.metadata.case = case_data
 
-    for idx, s in enumerate(samples[:3], start=1):
-        md_append(f"### #{idx}: {s.variant_name} @ temp={s.temperature}")
-        md_append("")
-        md_append(f"- Final score: {s.scores.final_score:.1f}")
-        md_append(
-            f"- Heuristics total: {s.scores.heuristics.get('total_heuristics', 0):.1f}"
-        )
-        if s.scores.judge:
-            jt = s.scores.judge.get("total_judge")
-            md_append(f"- Judge total: {'' if jt is None else f'{jt:.1f}'}")
-            checks = s.scores.judge.get("checks") or {}
-            failed = [
-                name
-                for name, value in checks.items()
-                if isinstance(value, bool) and value is True and name.endswith("_present")
-                or (isinstance(value, bool) and value is False and name.endswith("_ok"))
-            ]
-            if failed:
-                md_append(f"- Failed checks: {', '.join(sorted(failed))}")
-        md_append("")
-        md_append("#### Output")
-        md_append("")
-        md_append(s.output_text.strip())
-        md_append("")
-        md_append("#### Heuristics breakdown")
-        md_append("")
-        for key, value in s.scores.heuristics.items():
-            if key == "total_heuristics":
-                continue
-            md_append(f"- **{key}**: {value}")
-        md_append("")
-
-    results_path = Path(results_path)
-    summary_path = (
-        Path(output_path)
-        if output_path is not None
-        else results_path.with_name("summary.md")
-    )
-    summary_path.parent.mkdir(parents=True, exist_ok=True)
-    summary_path.write_text("\n".join(lines), encoding="utf-8")
-    return summary_path
+    results_path = write_run(run, results_path, compact=compact)
+    write_stats(results_path, stats_from_results(run))
+    return results_path
+
+
+def _rescore_dataset(
+    results_path: Path,
+    case_path: str | None,
+    cache: "FileCache | None",
+    heuristics: bool = True,
+) -> Path:
+    # Streams the run back through a RunStreamWriter one row at a time, so a
+    # dataset run is never held in memory, and rebuilds relevance per row
+    # with that row's query and an IDF fitted over every output of the run
+    # in a first pass. The rows come from the dataset the run recorded, in
+    # the order the run wrote them. _run_dataset finishes with this, leaving
+    # the heuristics it just scored alone.
+    from .evaluation.relevance import fit_relevance_idf
+    from .logging.sample_index import SampleArchive
+    from .utils.io import COMPRESSION_SUFFIXES
+
+    with SampleArchive(results_path) as archive:
+        metadata = RunMetadata(**archive.metadata())
+        case_data = load_case(case_path, cache) if case_path else metadata.case
+        case = build_case_config(case_data)
+        keywords = load_keywords(case.keywords_file, cache) if case.keywords_file else []
+        weights = WeightProfile.from_case(case_data)
+        recorded = {k: v for k, v in (metadata.dataset or {}).items() if k not in ("rows", "total_rows")}
+        spec = DatasetSpec(**recorded)
+        rows = idf = None
+        if case.constraints.get("relevance"):
+            rows = dataset_rows(spec)[0]
+            idf = fit_relevance_idf(r["output_text"] for r in archive.project(("output_text",)))
+
+        def flush(samples: List[SampleRecord]) -> None:
+            row = None
+            if rows is not None:
+                row = next((r for row_id, r in rows if row_id == samples[0].row_id), None)
+                if row is None:
+                    raise ValueError(
+                        f"Row {samples[0].row_id!r} of this run is no longer in {spec.path}; "
+                        "its relevance cannot be recomputed."
+                    )
+            if heuristics:
+                for s in samples:
+                    s.scores.heuristics = score_heuristics(s.output_text, case.constraints, keywords, s.abort_reason)
+            apply_relevance(samples, case, row, idf)
+            finalize_scores(samples, used_judge=metadata.used_judge, weights=weights)
+            for s in samples:
+                writer.append(s)
+
+        suffixes = {suffix: name for name, suffix in COMPRESSION_SUFFIXES.items()}
+        tmp_path = results_path.with_name(results_path.name + ".tmp")
+        writer = RunStreamWriter(tmp_path, suffixes.get(results_path.suffix))
+        try:
+            group: List[SampleRecord] = []
+            for i in range(len(archive)):
+                sample = SampleRecord(**archive.sample(i))
+                if group and sample.row_id != group[0].row_id:
+                    flush(group)
+                    group = []
+                group.append(sample)
+            if group:
+                flush(group)
+            metadata.case = case_data
+        except BaseException:
+            writer.close(metadata)
+            tmp_path.unlink()
+            raise
+        writer.close(metadata)
+    os.replace(tmp_path, results_path)
+    load_stats(results_path)
+    return results_path
+
+
+def render_summary_markdown(results_path: str | Path, output_path: str | Path | None = None) -> Path:
+    from .report import render_summary
+
+    return render_summary(results_path, output_path)
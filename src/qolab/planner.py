@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+from .evaluation.judge import JUDGE_MAX_TOKENS, JUDGE_SYSTEM_PROMPT, build_judge_prompt
+from .evaluation.rubric import load_rubric
+from .generation.budget import (
+    DEFAULT_PRICING,
+    TOKENS_PER_WORD,
+    call_cost,
+    estimate_chat_tokens,
+    max_tokens_for_words,
+)
+from .generation.client import DEFAULT_JUDGE_MODEL, DEFAULT_MAX_TOKENS, DEFAULT_MODEL
+from .generation.prompts import render_user_prompt
+from .pipeline import (
+    TEMPERATURES,
+    build_case_config,
+    build_case_description,
+    build_variants,
+    ensure_single_case,
+    load_case,
+    load_keywords,
+    load_suite,
+)
+
+
+# The judge returns checks, six scores and six one-sentence rationales.
+JUDGE_EXPECTED_OUTPUT_TOKENS = 300
+
+
+@dataclass
+class PlannedCall:
+    kind: str
+    variant_name: str
+    temperature: float
+    model: str
+    input_tokens: int
+    expected_output_tokens: int
+    max_output_tokens: int
+
+
+@dataclass
+class RunPlan:
+    calls: List[PlannedCall] = field(default_factory=list)
+    pricing: Dict[str, Dict[str, float]] = field(default_factory=lambda: dict(DEFAULT_PRICING))
+
+    def by_model(self) -> Dict[str, Dict[str, Any]]:
+        totals: Dict[str, Dict[str, Any]] = {}
+        for call in self.calls:
+            row = totals.setdefault(
+                call.model,
+                {
+                    "calls": 0,
+                    "input_tokens": 0,
+                    "expected_output_tokens": 0,
+                    "max_output_tokens": 0,
+                    "expected_cost_usd": 0.0,
+                    "max_cost_usd": 0.0,
+                },
+            )
+            row["calls"] += 1
+            row["input_tokens"] += call.input_tokens
+            row["expected_output_tokens"] += call.expected_output_tokens
+            row["max_output_tokens"] += call.max_output_tokens
+            row["expected_cost_usd"] += call_cost(
+                self.pricing, call.model, call.input_tokens, call.expected_output_tokens
+            )
+            row["max_cost_usd"] += call_cost(
+                self.pricing, call.model, call.input_tokens, call.max_output_tokens
+            )
+        return totals
+
+    def totals(self) -> Dict[str, Any]:
+        rows = self.by_model().values()
+        return {
+            key: sum(r[key] for r in rows)
+            for key in (
+                "calls",
+                "input_tokens",
+                "expected_output_tokens",
+                "max_output_tokens",
+                "expected_cost_usd",
+                "max_cost_usd",
+            )
+        }
+
+    def unpriced_models(self) -> List[str]:
+        return sorted({c.model for c in self.calls if c.model not in self.pricing})
+
+
+def expected_output_tokens(constraints: Dict[str, Any], max_tokens: int) -> int:
+    max_words = constraints.get("max_words")
+    if not max_words:
+        return max_tokens
+    return min(max_tokens, int(max_words * TOKENS_PER_WORD))
+
+
+def plan_experiment(
+    case_path: str,
+    suite_path: str,
+    use_judge: bool,
+    model: str | None = None,
+    judge_model: str | None = None,
+    rubric_path: str | None = None,
+    pricing: Dict[str, Dict[str, float]] | None = None,
+    repeats: int = 1,
+) -> RunPlan:
+    case_data = load_case(case_path)
+    ensure_single_case(case_data, "--plan")
+    case = build_case_config(case_data)
+    variants = build_variants(load_suite(suite_path))
+    keywords = load_keywords(case.keywords_file) if case.keywords_file else []
+    generator_model = model or DEFAULT_MODEL
+    judge_model = judge_model or DEFAULT_JUDGE_MODEL
+    plan = RunPlan(pricing=pricing or dict(DEFAULT_PRICING))
+
+    gen_max = max_tokens_for_words(case.constraints.get("max_words"), DEFAULT_MAX_TOKENS)
+    gen_expected = expected_output_tokens(case.constraints, gen_max)
+
+    judge_input = 0
+    if use_judge:
+        rubric = load_rubric(rubric_path or "configs/rubrics/judge_rubric_v1.json")
+        # the candidate output is unknown up front; assume the expected generation length
+        judge_prompt = build_judge_prompt(
+            rubric, build_case_description(case), case.constraints, keywords, ""
+        )
+        judge_input = estimate_chat_tokens(JUDGE_SYSTEM_PROMPT, judge_prompt, judge_model) + gen_expected
+
+    for variant in variants:
+        user_prompt = render_user_prompt(variant.user_prompt_template, case)
+        input_tokens = estimate_chat_tokens(variant.system_prompt, user_prompt, generator_model)
+        for temp in [t for t in TEMPERATURES for _ in range(repeats)]:
+            plan.calls.append(
+                PlannedCall("generation", variant.name, temp, generator_model, input_tokens, gen_expected, gen_max)
+            )
+            if use_judge:
+                plan.calls.append(
+                    PlannedCall(
+                        "judge",
+                        variant.name,
+                        temp,
+                        judge_model,
+                        judge_input,
+                        min(JUDGE_EXPECTED_OUTPUT_TOKENS, JUDGE_MAX_TOKENS),
+                        JUDGE_MAX_TOKENS,
+                    )
+                )
+    return plan
+
+
+def render_plan(plan: RunPlan, console: Any) -> None:
+    from rich.table import Table
+
+    calls = Table(title="Planned calls")
+    for column in ("Kind", "Variant", "Temp", "Model", "Input tok", "Expected out", "Max out"):
+        calls.add_column(column)
+    for c in plan.calls:
+        calls.add_row(
+            c.kind,
+            c.variant_name,
+            f"{c.temperature:.1f}",
+            c.model,
+            str(c.input_tokens),
+            str(c.expected_output_tokens),
+            str(c.max_output_tokens),
+        )
+    console.print(calls)
+
+    models = Table(title="Estimated usage per model")
+    for column in ("Model", "Calls", "Input tok", "Expected out", "Max out", "Expected $", "Max $"):
+        models.add_column(column)
+    for name, row in plan.by_model().items():
+        models.add_row(
+            name,
+            str(row["calls"]),
+            str(row["input_tokens"]),
+            str(row["expected_output_tokens"]),
+            str(row["max_output_tokens"]),
+            f"{row['expected_cost_usd']:.4f}",
+            f"{row['max_cost_usd']:.4f}",
+        )
+    totals = plan.totals()
+    models.add_row(
+        "[bold]total[/bold]",
+        str(totals["calls"]),
+        str(totals["input_tokens"]),
+        str(totals["expected_output_tokens"]),
+        str(totals["max_output_tokens"]),
+        f"{totals['expected_cost_usd']:.4f}",
+        f"{totals['max_cost_usd']:.4f}",
+    )
+    console.print(models)
+    for name in plan.unpriced_models():
+        console.print(f"[yellow]No pricing for model {name}; cost counted as 0 (see --pricing).[/yellow]")
@@ -0,0 +1,294 @@
+from __future__ import annotations
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+PROFILE_MODES = ("cprofile", "sampling")
+# at 200 Hz the sampler's cost is lost in the noise of a CPU-bound run (a
+# few percent at most) and is nothing next to network waits, so the
+# sampling mode can stay on for production sweeps
+DEFAULT_SAMPLE_INTERVAL = 0.005
+TOP_FUNCTIONS = 15
+OTHER_STAGE = "other"
+
+# Time is attributed to the innermost frame of the stack that one of these
+# rules claims: judge parsing runs inside judge_output but is its own stage.
+# A rule names a module (matched on the end of its path) and the functions
+# it covers, or () for the whole module.
+STAGE_RULES: Tuple[Tuple[str, str, Tuple[str, ...]], ...] = (
+    ("prompt rendering", "qolab/generation/prompts.py", ()),
+    ("prompt rendering", "qolab/pipeline.py", ("build_prompts", "build_case_description")),
+    ("prompt rendering", "qolab/evaluation/judge.py", ("build_judge_prompt",)),
+    ("generation wait", "qolab/generation/client.py", ("generate", "generate_stream", "request")),
+    ("generation wait", "qolab/generation/dryrun.py", ()),
+    ("judge wait", "qolab/evaluation/judge.py", ("call_judge", "request")),
+    ("judge parsing", "qolab/evaluation/judge.py", ("parse_judge_response",)),
+    ("heuristics", "qolab/evaluation/heuristics.py", ()),
+    ("heuristics", "qolab/evaluation/streaming.py", ()),
+    ("heuristics", "qolab/evaluation/relevance.py", ()),
+    ("heuristics", "qolab/pipeline.py", ("score_heuristics", "apply_relevance")),
+    ("serialisation", "qolab/logging/run_store.py", ()),
+    ("serialisation", "qolab/logging/sample_index.py", ()),
+    ("serialisation", "qolab/logging/score_map.py", ()),
+    ("serialisation", "qolab/report.py", ("load_stats", "write_stats")),
+    ("reporting", "qolab/report.py", ()),
+    # the CLI imports its heavy modules lazily, inside the commands
+    ("imports", "<frozen importlib._bootstrap>", ()),
+    ("imports", "<frozen importlib._bootstrap_external>", ()),
+)
+
+_PACKAGE_DIR = str(Path(__file__).resolve().parent).replace(os.sep, "/") + "/"
+
+
+@lru_cache(maxsize=None)
+def stage_for(filename: str, name: str) -> Optional[str]:
+    path = filename.replace(os.sep, "/")
+    for stage, module, names in STAGE_RULES:
+        if path.endswith(module) and (not names or name in names):
+            return stage
+    return None
+
+
+@lru_cache(maxsize=None)
+def _is_ours(filename: str) -> bool:
+    return filename.replace(os.sep, "/").startswith(_PACKAGE_DIR)
+
+
+@lru_cache(maxsize=None)
+def _short_path(filename: str) -> str:
+    path = filename.replace(os.sep, "/")
+    for prefix in _path_prefixes():
+        if path.startswith(prefix):
+            return path[len(prefix):]
+    return path
+
+
+@lru_cache(maxsize=1)
+def _path_prefixes() -> List[str]:
+    prefixes = {p.replace(os.sep, "/").rstrip("/") + "/" for p in sys.path if p}
+    return sorted(prefixes, key=len, reverse=True)
+
+
+def function_label(filename: str, lineno: int, name: str) -> str:
+    if filename == "~":  # builtins, as cProfile reports them
+        return name
+    return f"{_short_path(filename)}:{lineno}({name})"
+
+
+@dataclass
+class ProfileReport:
+    mode: str
+    wall_seconds: float
+    # seconds per stage, summed over the threads that were profiled
+    stages: Dict[str, float]
+    # (function, self seconds, stage), hottest first
+    top: List[Tuple[str, float, str]]
+    files: List[str] = field(default_factory=list)
+
+
+class CProfileProfiler:
+    # Deterministic profile of the command, including the threads it starts
+    # (dataset rows, hedged requests). Written as profile.prof, which pstats,
+    # snakeviz and friends read. Stages are attributed through the caller
+    # graph, so time in a helper called from several stages is split by how
+    # much each of them called it.
+    mode = "cprofile"
+
+    def __init__(self) -> None:
+        import cProfile
+
+        self._main = cProfile.Profile()
+        self._threads: List[Any] = []
+        self._lock = threading.Lock()
+        self._started = 0.0
+        self._wall = 0.0
+
+    def _thread_hook(self, *_: Any) -> None:
+        import cProfile
+
+        sys.setprofile(None)
+        profile = cProfile.Profile()
+        with self._lock:
+            self._threads.append(profile)
+        profile.enable()
+
+    def start(self) -> None:
+        self._started = time.perf_counter()
+        threading.setprofile(self._thread_hook)
+        self._main.enable()
+
+    def stop(self) -> None:
+        self._main.disable()
+        threading.setprofile(None)
+        self._wall = time.perf_counter() - self._started
+
+    def save(self, directory: str | Path) -> ProfileReport:
+        import pstats
+
+        stats = pstats.Stats(self._main)
+        with self._lock:
+            for profile in self._threads:
+                stats.add(profile)
+        path = Path(directory) / "profile.prof"
+        stats.dump_stats(str(path))
+
+        shares: Dict[Tuple[str, int, str], Dict[str, float]] = {}
+        stages: Counter = Counter()
+        per_function = []
+        for key, (_, _, tottime, _, _) in stats.stats.items():
+            share = _stage_shares(key, stats.stats, shares, set())
+            for stage, fraction in share.items():
+                stages[stage] += tottime * fraction
+            per_function.append((tottime, key, max(share, key=share.__getitem__)))
+        per_function.sort(reverse=True)
+        top = [(function_label(*key), tottime, stage) for tottime, key, stage in per_function[:TOP_FUNCTIONS]]
+        return _finish(ProfileReport(self.mode, self._wall, dict(stages), top, [str(path)]), directory)
+
+
+def _stage_shares(
+    key: Tuple[str, int, str],
+    stats: Dict[Any, Any],
+    shares: Dict[Tuple[str, int, str], Dict[str, float]],
+    visiting: set,
+) -> Dict[str, float]:
+    # fraction of the time spent in `key` that belongs to each stage: its own
+    # stage if a rule claims it, otherwise its callers' shares weighted by how
+    # much time each caller spent in it
+    if key in shares:
+        return shares[key]
+    stage = stage_for(key[0], key[2])
+    if stage is not None:
+        shares[key] = {stage: 1.0}
+        return shares[key]
+    if key in visiting:  # recursion: the outer call settles it
+        return {OTHER_STAGE: 1.0}
+    visiting.add(key)
+    callers = stats[key][4]
+    total = sum(edge[3] for edge in callers.values())
+    share: Counter = Counter()
+    if total > 0:
+        for caller, edge in callers.items():
+            for name, fraction in _stage_shares(caller, stats, shares, visiting).items():
+                share[name] += fraction * edge[3] / total
+    visiting.discard(key)
+    shares[key] = dict(share) or {OTHER_STAGE: 1.0}
+    return shares[key]
+
+
+class SamplingProfiler:
+    # Wall-clock sampler: a daemon thread looks at every thread's stack every
+    # `interval` seconds and charges the time since its last look to each
+    # thread running qolab code (idle pool workers are skipped). Waiting on
+    # the network therefore shows up as time in the stage that waits. Written
+    # as profile.folded, one collapsed stack per line with its sample count,
+    # which flamegraph.pl and speedscope read.
+    mode = "sampling"
+
+    def __init__(self, interval: float = DEFAULT_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.samples = 0
+        self._stacks: Counter = Counter()
+        self._leaves: Counter = Counter()
+        self._stages: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started = 0.0
+        self._wall = 0.0
+
+    def start(self) -> None:
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._loop, name="qolab-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._wall = time.perf_counter() - self._started
+
+    def _loop(self) -> None:
+        own = threading.get_ident()
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            # the sampler needs the GIL too, so ticks can come late; weighting
+            # by the real gap keeps the seconds honest
+            now = time.perf_counter()
+            elapsed, last = now - last, now
+            for ident, frame in sys._current_frames().items():
+                if ident != own:
+                    self._sample(frame, elapsed)
+
+    def _sample(self, frame: Any, elapsed: float) -> None:
+        codes = []
+        stage = None
+        ours = False
+        while frame is not None:
+            code = frame.f_code
+            codes.append(code)
+            if stage is None:
+                stage = stage_for(code.co_filename, code.co_name)
+            ours = ours or _is_ours(code.co_filename)
+            frame = frame.f_back
+        if not ours:
+            return
+        stage = stage or OTHER_STAGE
+        self.samples += 1
+        self._stacks[tuple(reversed(codes))] += 1
+        self._leaves[codes[0], stage] += elapsed
+        self._stages[stage] += elapsed
+
+    def save(self, directory: str | Path) -> ProfileReport:
+        path = Path(directory) / "profile.folded"
+        with path.open("w", encoding="utf-8") as f:
+            for codes, count in self._stacks.most_common():
+                frames = ";".join(f"{c.co_name} ({_short_path(c.co_filename)})" for c in codes)
+                f.write(f"{frames} {count}\n")
+
+        top = [
+            (function_label(code.co_filename, code.co_firstlineno, code.co_name), seconds, stage)
+            for (code, stage), seconds in self._leaves.most_common(TOP_FUNCTIONS)
+        ]
+        return _finish(ProfileReport(self.mode, self._wall, dict(self._stages), top, [str(path)]), directory)
+
+
+def _finish(report: ProfileReport, directory: str | Path) -> ProfileReport:
+    path = Path(directory) / "profile.json"
+    report.files.append(str(path))
+    report.stages = dict(sorted(report.stages.items(), key=lambda item: -item[1]))
+    path.write_text(json.dumps(asdict(report), indent=2), encoding="utf-8")
+    return report
+
+
+def make_profiler(mode: str, interval: float = DEFAULT_SAMPLE_INTERVAL) -> "CProfileProfiler | SamplingProfiler":
+    if mode == "cprofile":
+        return CProfileProfiler()
+    if mode == "sampling":
+        return SamplingProfiler(interval)
+    raise ValueError(f"Unknown profile mode {mode!r}; expected one of {', '.join(PROFILE_MODES)}")
+
+
+def render_profile(report: ProfileReport, console: Any) -> None:
+    from rich.table import Table
+
+    total = sum(report.stages.values()) or 1.0
+    stages = Table(title=f"Profile by stage ({report.mode}, {report.wall_seconds:.2f}s wall)")
+    for column in ("Stage", "Seconds", "Share"):
+        stages.add_column(column)
+    for stage, seconds in report.stages.items():
+        stages.add_row(stage, f"{seconds:.3f}", f"{seconds / total:.0%}")
+    console.print(stages)
+
+    top = Table(title="Hottest functions (self time)")
+    for column in ("Function", "Seconds", "Stage"):
+        top.add_column(column)
+    for name, seconds, stage in report.top:
+        top.add_row(name, f"{seconds:.3f}", stage)
+    console.print(top)
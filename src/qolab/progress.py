@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Optional
+
+from .logging.metrics import SweepMetrics
+
+if TYPE_CHECKING:
+    from rich.console import Console
+
+
+def _duration(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "--:--"
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes:02d}:{secs:02d}"
+
+
+def render_progress(metrics: SweepMetrics) -> Any:
+    from rich.console import Group
+    from rich.progress_bar import ProgressBar
+    from rich.table import Table
+
+    snap = metrics.snapshot()
+    total = snap["cells_total"] or None
+    header = Table.grid(padding=(0, 2))
+    header.add_row(
+        ProgressBar(total=total, completed=snap["cells_completed"], width=40),
+        f"{snap['cells_completed']}/{snap['cells_total']} cells",
+        f"{snap['cells_per_second'] * 60:.1f} cells/min",
+        f"elapsed {_duration(snap['elapsed_seconds'])}",
+        f"ETA {_duration(snap['eta_seconds'])}",
+    )
+    details = Table.grid(padding=(0, 2))
+    details.add_row(
+        f"in flight: {snap['in_flight']}",
+        f"requests: {sum(snap['requests'].values())}",
+        f"errors: {snap['error_rate']:.1%}",
+        f"retries: {snap['retry_rate']:.1%}",
+        f"cache hits: {snap['cache_hit_rate']:.1%}",
+        f"aborted: {snap['cells_aborted']}",
+    )
+    return Group(header, details)
+
+
+class LiveProgress:
+    def __init__(self, metrics: SweepMetrics, console: "Console", refresh_per_second: float = 2.0):
+        from rich.live import Live
+
+        self.metrics = metrics
+        self._live = Live(
+            get_renderable=lambda: render_progress(metrics),
+            console=console,
+            refresh_per_second=refresh_per_second,
+            transient=False,
+        )
+
+    def __enter__(self) -> "LiveProgress":
+        self._live.__enter__()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._live.__exit__(*exc)
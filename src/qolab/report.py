@@ -0,0 +1,422 @@
+from __future__ import annotations
+
+import hashlib
+import heapq
+import json
+import statistics
+from array import array
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from .utils.io import dump_json, load_json
+
+if TYPE_CHECKING:
+    from .logging.schemas import RunResults
+
+
+STATS_VERSION = 3
+TOP_N = 3
+# the overview table lists the best samples only; dataset runs can have millions
+OVERVIEW_ROWS = 100
+
+STATS_FIELDS = (
+    "variant_name",
+    "temperature",
+    "scores.final_score",
+    "scores.heuristics.total_heuristics",
+    "scores.judge.total_judge",
+    "scores.judge.checks",
+)
+
+
+def failed_checks(checks: Dict[str, Any] | None) -> List[str]:
+    return sorted(
+        name
+        for name, value in (checks or {}).items()
+        if isinstance(value, bool) and value is True and name.endswith("_present")
+        or (isinstance(value, bool) and value is False and name.endswith("_ok"))
+    )
+
+
+def stats_path_for(results_path: str | Path) -> Path:
+    return Path(results_path).with_name("stats.json")
+
+
+def _file_key(path: Path) -> List[int]:
+    stat = path.stat()
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _metadata_summary(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "run_id": metadata["run_id"],
+        "case_name": (metadata.get("case") or {}).get("name", ""),
+        "generator_model": metadata["generator_model"],
+        "judge_model": metadata.get("judge_model"),
+        "used_judge": metadata["used_judge"],
+        "temperatures": metadata["temperatures"],
+        "variants": metadata["variants"],
+        "stopped_reason": metadata.get("stopped_reason"),
+    }
+
+
+def _top_entry(index: int, sample: Dict[str, Any]) -> Dict[str, Any]:
+    judge = sample["scores"].get("judge")
+    return {
+        "index": index,
+        "variant_name": sample["variant_name"],
+        "temperature": sample["temperature"],
+        "final_score": sample["scores"]["final_score"],
+        "heuristics": sample["scores"]["heuristics"],
+        "judge_total": judge.get("total_judge") if judge else None,
+        "judged": bool(judge),
+        "failed_checks": failed_checks(judge.get("checks")) if judge else [],
+        "output_text": sample["output_text"],
+    }
+
+
+def build_stats(
+    metadata: Dict[str, Any],
+    rows: Iterable[Dict[str, Any]],
+    fetch_sample: Callable[[int], Dict[str, Any]],
+) -> Dict[str, Any]:
+    overview: List[tuple] = []
+    cells: Dict[str, Dict[str, Any]] = {}
+    index = -1
+    for index, row in enumerate(rows):
+        variant, temp = row["variant_name"], float(row["temperature"])
+        final = float(row["scores.final_score"])
+        heur = row["scores.heuristics.total_heuristics"] or 0
+        judge = row["scores.judge.total_judge"]
+        checks = row["scores.judge.checks"]
+        # min-heap of the best rows; ties keep the earlier sample
+        entry = (final, -index, [index, variant, temp, heur, judge, final])
+        if len(overview) < OVERVIEW_ROWS:
+            heapq.heappush(overview, entry)
+        elif entry[:2] > overview[0][:2]:
+            heapq.heapreplace(overview, entry)
+
+        cell = cells.setdefault(
+            f"{variant}\x1f{temp}",
+            {"variant_name": variant, "temperature": temp, "finals": array("d"), "judged": 0, "failures": {}},
+        )
+        cell["finals"].append(final)
+        if checks is not None:
+            cell["judged"] += 1
+            for name in failed_checks(checks):
+                cell["failures"][name] = cell["failures"].get(name, 0) + 1
+
+    best = [entry[2] for entry in sorted(overview, key=lambda e: e[:2], reverse=True)]
+    for cell in cells.values():
+        finals = sorted(cell.pop("finals"))
+        cell.update(
+            n=len(finals),
+            mean=sum(finals) / len(finals),
+            min=min(finals),
+            median=statistics.median(finals),
+            max=max(finals),
+        )
+    stats = {
+        "version": STATS_VERSION,
+        "metadata": _metadata_summary(metadata),
+        "samples": index + 1,
+        "overview": [r[1:] for r in best],
+        "top": [_top_entry(r[0], fetch_sample(r[0])) for r in best[:TOP_N]],
+        "cells": list(cells.values()),
+    }
+    stats["digests"] = section_digests(stats)
+    return stats
+
+
+def _digest(inputs: Any) -> str:
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+
+def section_digests(stats: Dict[str, Any]) -> Dict[str, str]:
+    # Digests of each report section's inputs, computed once when the stats
+    # are built and stored with them, so rendering compares short strings
+    # instead of hashing the inputs again.
+    samples, overview = stats["samples"], stats["overview"]
+    # the sample count only shows (and so only keys the section) when the table is cut
+    overview_key = overview if samples <= len(overview) else [overview, samples]
+    return {
+        "metadata": _digest(stats["metadata"]),
+        "overview": _digest(overview_key),
+        "top": _digest(stats["top"]),
+        "cells": _digest(stats["cells"]),
+    }
+
+
+def stats_from_results(results: "RunResults") -> Dict[str, Any]:
+    samples = [s.model_dump() for s in results.samples]
+    rows = (
+        {
+            "variant_name": s["variant_name"],
+            "temperature": s["temperature"],
+            "scores.final_score": s["scores"]["final_score"],
+            "scores.heuristics.total_heuristics": s["scores"]["heuristics"].get("total_heuristics"),
+            "scores.judge.total_judge": (s["scores"]["judge"] or {}).get("total_judge"),
+            "scores.judge.checks": (s["scores"]["judge"] or {}).get("checks"),
+        }
+        for s in samples
+    )
+    return build_stats(results.metadata.model_dump(), rows, samples.__getitem__)
+
+
+def write_stats(results_path: str | Path, stats: Dict[str, Any]) -> Path:
+    results_path = Path(results_path)
+    path = stats_path_for(results_path)
+    dump_json(path, {**stats, "source": _file_key(results_path)})
+    return path
+
+
+def load_stats(results_path: str | Path) -> Dict[str, Any]:
+    results_path = Path(results_path)
+    if results_path.is_dir():
+        results_path = find_results(results_path)
+    path = stats_path_for(results_path)
+    if path.exists():
+        stats = load_json(path)
+        if stats.get("version") == STATS_VERSION and stats.get("source") == _file_key(results_path):
+            return stats
+
+    from .logging.sample_index import SampleArchive
+
+    # no usable stats.json: project only the score fields, never the full payloads
+    with SampleArchive(results_path) as archive:
+        stats = build_stats(archive.metadata(), archive.project(STATS_FIELDS), archive.sample)
+    try:
+        write_stats(results_path, stats)
+    except OSError:
+        pass
+    return {**stats, "source": _file_key(results_path)}
+
+
+def find_results(run_dir: Path) -> Path:
+    for name in ("results.json", "results.json.gz", "results.json.zst"):
+        if (run_dir / name).exists():
+            return run_dir / name
+    raise FileNotFoundError(f"No results.json found in {run_dir}")
+
+
+# Rendered markdown sections keyed by the digests of their inputs, so a
+# report only re-renders the sections whose statistics changed since the
+# last render.
+class SectionCache:
+    def __init__(self, path: Path):
+        self.path = path
+        self.rendered = 0
+        self.reused = 0
+        try:
+            self._entries: Dict[str, Dict[str, str]] = load_json(path)
+        except (OSError, ValueError):
+            self._entries = {}
+        self._used: Dict[str, Dict[str, str]] = {}
+
+    def section(self, name: str, key: str, render: Callable[[], List[str]]) -> List[str]:
+        entry = self._entries.get(name)
+        if entry is not None and entry["key"] == key:
+            self.reused += 1
+            text = entry["text"]
+        else:
+            self.rendered += 1
+            text = "\n".join(render())
+        self._used[name] = {"key": key, "text": text}
+        return text.split("\n")
+
+    def save(self) -> None:
+        dump_json(self.path, self._used, compact=True)
+
+
+def _fmt(value: Optional[float]) -> str:
+    return "" if value is None else f"{value:.1f}"
+
+
+def _metadata_lines(meta: Dict[str, Any]) -> List[str]:
+    lines = [
+        f"# Run Summary: {meta['run_id']}",
+        "",
+        "## Metadata",
+        f"- Case: **{meta['case_name']}**",
+        f"- Generator model: `{meta['generator_model']}`",
+    ]
+    if meta["used_judge"]:
+        lines.append(f"- Judge model: `{meta['judge_model']}`")
+    lines += [
+        f"- Temperatures: {', '.join(str(t) for t in meta['temperatures'])}",
+        f"- Variants: {', '.join(meta['variants'])}",
+        f"- Judge enabled: {meta['used_judge']}",
+    ]
+    if meta.get("stopped_reason"):
+        lines.append(f"- Stopped early: {meta['stopped_reason']}")
+    lines.append("")
+    return lines
+
+
+def _overview_lines(overview: List[List[Any]], samples: int) -> List[str]:
+    lines = ["## Scores Overview", ""]
+    if samples > len(overview):
+        lines += [f"Best {len(overview)} of {samples} samples.", ""]
+    lines += [
+        "| Variant | Temp | Heuristics | Judge | Final |",
+        "|---|---|---|---|---|",
+    ]
+    for variant, temp, heur, judge, final in overview:
+        lines.append(f"| {variant} | {temp:.1f} | {heur:.1f} | {_fmt(judge)} | {final:.1f} |")
+    lines.append("")
+    return lines
+
+
+def _top_lines(top: List[Dict[str, Any]]) -> List[str]:
+    lines = [f"## Top {TOP_N} Outputs", ""]
+    for idx, s in enumerate(top, start=1):
+        lines += [
+            f"### #{idx}: {s['variant_name']} @ temp={s['temperature']}",
+            "",
+            f"- Final score: {s['final_score']:.1f}",
+            f"- Heuristics total: {s['heuristics'].get('total_heuristics', 0):.1f}",
+        ]
+        if s["judged"]:
+            lines.append(f"- Judge total: {_fmt(s['judge_total'])}")
+            if s["failed_checks"]:
+                lines.append(f"- Failed checks: {', '.join(s['failed_checks'])}")
+        lines += ["", "#### Output", "", s["output_text"].strip(), "", "#### Heuristics breakdown", ""]
+        for key, value in s["heuristics"].items():
+            if key == "total_heuristics":
+                continue
+            lines.append(f"- **{key}**: {value}")
+        lines.append("")
+    return lines
+
+
+def render_summary(
+    results_path: str | Path,
+    output_path: str | Path | None = None,
+    stats: Dict[str, Any] | None = None,
+) -> Path:
+    results_path = Path(results_path)
+    stats = stats or load_stats(results_path)
+    summary_path = Path(output_path) if output_path is not None else results_path.with_name("summary.md")
+    summary_path.parent.mkdir(parents=True, exist_ok=True)
+    cache = SectionCache(summary_path.with_name(f".{summary_path.name}.sections.json"))
+    digests = stats.get("digests") or section_digests(stats)
+
+    lines: List[str] = []
+    lines += cache.section("metadata", digests["metadata"], lambda: _metadata_lines(stats["metadata"]))
+    samples = stats["samples"]
+    lines += cache.section("overview", digests["overview"], lambda: _overview_lines(stats["overview"], samples))
+    lines += cache.section("top", digests["top"], lambda: _top_lines(stats["top"]))
+
+    text = "\n".join(lines)
+    if not summary_path.exists() or summary_path.read_text(encoding="utf-8") != text:
+        summary_path.write_text(text, encoding="utf-8")
+    cache.save()
+    return summary_path
+
+
+def _cell_key(cell: Dict[str, Any]) -> tuple:
+    return cell["variant_name"], float(cell["temperature"])
+
+
+def _comparison_matrix(runs: Sequence[Dict[str, Any]]) -> List[str]:
+    keys: List[tuple] = []
+    for stats in runs:
+        for cell in stats["cells"]:
+            if _cell_key(cell) not in keys:
+                keys.append(_cell_key(cell))
+    lookups = [{_cell_key(c): c for c in stats["cells"]} for stats in runs]
+    header = "| Variant | Temp | " + " | ".join(f"R{i}" for i in range(len(runs))) + " |"
+    lines = [
+        "## Mean final score by variant × temperature",
+        "",
+        "Δ is the difference to R0 (baseline).",
+        "",
+        header,
+        "|---|---|" + "---|" * len(runs),
+    ]
+    for key in keys:
+        base = lookups[0].get(key)
+        cols = []
+        for i, lookup in enumerate(lookups):
+            cell = lookup.get(key)
+            if cell is None:
+                cols.append("–")
+            elif i == 0 or base is None:
+                cols.append(f"{cell['mean']:.2f}")
+            else:
+                cols.append(f"{cell['mean']:.2f} ({cell['mean'] - base['mean']:+.2f})")
+        lines.append(f"| {key[0]} | {key[1]:.1f} | " + " | ".join(cols) + " |")
+    lines.append("")
+    return lines
+
+
+def _distribution_lines(i: int, stats: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    base = {_cell_key(c): c for c in baseline["cells"]}
+    lines = []
+    for cell in stats["cells"]:
+        ref = base.get(_cell_key(cell))
+        delta = "" if ref is None or i == 0 else f"{cell['mean'] - ref['mean']:+.2f}"
+        lines.append(
+            f"| R{i} | {cell['variant_name']} | {cell['temperature']:.1f} | {cell['n']} | "
+            f"{cell['mean']:.2f} | {delta} | {cell['min']:.1f} | {cell['median']:.1f} | {cell['max']:.1f} |"
+        )
+    return lines
+
+
+def _check_failure_lines(runs: Sequence[Dict[str, Any]]) -> List[str]:
+    names = sorted({name for stats in runs for cell in stats["cells"] for name in cell["failures"]})
+    lines = ["## Judge check failure rates", ""]
+    if not names:
+        lines += ["No judged samples with failed checks.", ""]
+        return lines
+    lines += [
+        "| Check | " + " | ".join(f"R{i}" for i in range(len(runs))) + " |",
+        "|---|" + "---|" * len(runs),
+    ]
+    for name in names:
+        cols = []
+        for stats in runs:
+            judged = sum(c["judged"] for c in stats["cells"])
+            failed = sum(c["failures"].get(name, 0) for c in stats["cells"])
+            cols.append("–" if judged == 0 else f"{100.0 * failed / judged:.0f}%")
+        lines.append(f"| {name} | " + " | ".join(cols) + " |")
+    lines.append("")
+    return lines
+
+
+def render_comparison(run_paths: Sequence[str | Path], output_path: str | Path) -> Path:
+    if len(run_paths) < 2:
+        raise ValueError("--compare needs at least two runs.")
+    runs = [load_stats(p) for p in run_paths]
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    cache = SectionCache(output_path.with_name(f".{output_path.name}.sections.json"))
+    cells = [(s.get("digests") or section_digests(s))["cells"] for s in runs]
+
+    lines = ["# Run Comparison", "", "## Runs", "", "| # | Run | Case | Generator | Judge |", "|---|---|---|---|---|"]
+    for i, stats in enumerate(runs):
+        meta = stats["metadata"]
+        lines.append(
+            f"| R{i} | {meta['run_id']} | {meta['case_name']} | `{meta['generator_model']}` | "
+            f"{'`' + meta['judge_model'] + '`' if meta['used_judge'] else ''} |"
+        )
+    lines.append("")
+    lines += cache.section("matrix", ",".join(cells), lambda: _comparison_matrix(runs))
+    lines += [
+        "## Score distributions",
+        "",
+        "| Run | Variant | Temp | n | Mean | Δ mean | Min | Median | Max |",
+        "|---|---|---|---|---|---|---|---|---|",
+    ]
+    for i, stats in enumerate(runs):
+        lines += cache.section(
+            f"distribution:R{i}",
+            f"{cells[i]},{cells[0]}",
+            lambda i=i, stats=stats: _distribution_lines(i, stats, runs[0]),
+        )
+    lines.append("")
+    lines += cache.section("checks", ",".join(cells), lambda: _check_failure_lines(runs))
+
+    output_path.write_text("\n".join(lines), encoding="utf-8")
+    cache.save()
+    return output_path
@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import itertools
+import json
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from .evaluation.aggregation import DEFAULT_PROFILE, WeightProfile, compute_final_score
+from .evaluation.heuristics import evaluate_heuristics
+from .evaluation.relevance import RelevanceIdf, add_relevance, fit_relevance_idf, relevance_scores
+from .pipeline import CTA_PHRASES
+
+# Scores outputs produced elsewhere (one JSON object per line) without
+# generating anything. Lines are scored in chunks on a process pool; at most
+# `workers * 2` chunks are in flight, so memory stays bounded however long
+# the input is. Every output line carries the input's 1-based line number
+# and its id, if it had one.
+DEFAULT_CHUNK_SIZE = 512
+DEFAULT_JUDGE_CONCURRENCY = 8
+
+# set per worker process by _init_worker
+_context: Dict[str, Any] = {}
+
+
+def _init_worker(
+    constraints: Dict[str, Any],
+    keywords: List[str],
+    weights: WeightProfile,
+    text_field: str,
+    id_field: str,
+    relevance_query: Optional[str] = None,
+    relevance_idf: Optional[RelevanceIdf] = None,
+) -> None:
+    _context.update(
+        constraints=constraints,
+        keywords=keywords,
+        weights=weights,
+        text_field=text_field,
+        id_field=id_field,
+        relevance_query=relevance_query if constraints.get("relevance") else None,
+        relevance_idf=relevance_idf,
+    )
+
+
+def _score_line(line: str, lineno: int) -> Dict[str, Any]:
+    try:
+        record = json.loads(line)
+        text = record[_context["text_field"]]
+        if not isinstance(text, str):
+            raise TypeError(f"{_context['text_field']!r} is not a string")
+    except (ValueError, KeyError, TypeError) as exc:
+        return {"line": lineno, "error": f"{type(exc).__name__}: {exc}"}
+    out: Dict[str, Any] = {"line": lineno}
+    if _context["id_field"] in record:
+        out["id"] = record[_context["id_field"]]
+    heuristics = evaluate_heuristics(text, _context["constraints"], _context["keywords"], CTA_PHRASES)
+    final = _context["weights"].heuristics_total(heuristics)
+    out["scores"] = {"heuristics": heuristics, "judge": None, "final_score": final}
+    # kept for the judge; dropped before writing
+    out["_text"] = text
+    return out
+
+
+def _score_chunk(lines: List[str], first_lineno: int) -> List[Dict[str, Any]]:
+    # blank lines are skipped but still counted, so line numbers match the input
+    records = [_score_line(line, first_lineno + i) for i, line in enumerate(lines) if line.strip()]
+    if _context["relevance_query"] is not None:
+        scored = [r for r in records if "scores" in r]
+        scores = relevance_scores(_context["relevance_query"], [r["_text"] for r in scored], _context["relevance_idf"])
+        for record, score in zip(scored, scores):
+            heuristics = add_relevance(record["scores"]["heuristics"], score)
+            record["scores"]["heuristics"] = heuristics
+            record["scores"]["final_score"] = _context["weights"].heuristics_total(heuristics)
+    return records
+
+
+def _serialize_chunk(records: List[Dict[str, Any]]) -> Tuple[str, int, int]:
+    parts = []
+    errors = 0
+    for record in records:
+        record.pop("_text", None)
+        errors += "error" in record
+        parts.append(json.dumps(record, ensure_ascii=False))
+        parts.append("\n")
+    return "".join(parts), len(records), errors
+
+
+def _score_and_serialize(lines: List[str], first_lineno: int) -> Tuple[str, int, int]:
+    # heuristics-only path: serialising in the worker leaves the parent with
+    # nothing to do but read and write
+    return _serialize_chunk(_score_chunk(lines, first_lineno))
+
+
+def _chunks(lines: Iterable[str], size: int) -> Iterator[Tuple[int, List[str]]]:
+    it = iter(lines)
+    lineno = 1
+    while True:
+        chunk = list(itertools.islice(it, size))
+        if not chunk:
+            return
+        yield lineno, chunk
+        lineno += len(chunk)
+
+
+class _InlineExecutor:
+    # same submit() interface, no pool; used for a single worker
+    def submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        future: Future = Future()
+        future.set_result(fn(*args))
+        return future
+
+    def __enter__(self) -> "_InlineExecutor":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        pass
+
+
+def score_stream(
+    lines: Iterable[str],
+    out: TextIO,
+    constraints: Dict[str, Any],
+    keywords: List[str],
+    weights: Optional[WeightProfile] = None,
+    text_field: str = "output_text",
+    id_field: str = "id",
+    workers: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ordered: bool = True,
+    judge: Optional[Callable[[str], Dict[str, Any]]] = None,
+    judge_concurrency: int = DEFAULT_JUDGE_CONCURRENCY,
+    relevance_query: Optional[str] = None,
+    relevance_idf: Optional[RelevanceIdf] = None,
+) -> Dict[str, int]:
+    # `judge(text)` returns a call_judge-shaped dict; judge calls are I/O
+    # bound, so they run on threads in this process while the pool keeps
+    # scoring the chunks after the current one. Relevance needs an IDF fitted
+    # over the whole input (fit_input_idf) so that chunking cannot change it.
+    if relevance_query is not None and constraints.get("relevance") and relevance_idf is None:
+        raise ValueError("Scoring relevance needs relevance_idf, fitted over the whole input.")
+    workers = workers or os.cpu_count() or 1
+    window = max(workers * 2, 2)
+    counts = {"records": 0, "errors": 0}
+    weights = weights or DEFAULT_PROFILE
+    init_args = (constraints, keywords, weights, text_field, id_field, relevance_query, relevance_idf)
+    if workers > 1:
+        pool: Any = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=init_args)
+    else:
+        _init_worker(*init_args)
+        pool = _InlineExecutor()
+    task = _score_chunk if judge is not None else _score_and_serialize
+    judge_pool = ThreadPoolExecutor(judge_concurrency) if judge is not None else None
+
+    def finish(result: Any) -> None:
+        if judge_pool is not None:
+            result = _serialize_chunk(_judge_chunk(result, judge, judge_pool, weights))
+        text, n_records, n_errors = result
+        counts["records"] += n_records
+        counts["errors"] += n_errors
+        out.write(text)
+
+    pending: deque = deque()
+    try:
+        with pool:
+            for first_lineno, chunk in _chunks(lines, chunk_size):
+                pending.append(pool.submit(task, chunk, first_lineno))
+                while len(pending) >= window:
+                    _drain(pending, ordered, finish)
+            while pending:
+                _drain(pending, ordered, finish)
+    finally:
+        if judge_pool is not None:
+            judge_pool.shutdown()
+    out.flush()
+    return counts
+
+
+def fit_input_idf(lines: Iterable[str], text_field: str = "output_text") -> RelevanceIdf:
+    # the first of two passes over a file input; lines score_stream would
+    # report as errors are left out here too
+    def texts() -> Iterator[str]:
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                text = json.loads(line)[text_field]
+            except (ValueError, KeyError, TypeError):
+                continue
+            if isinstance(text, str):
+                yield text
+
+    return fit_relevance_idf(texts())
+
+
+def _drain(pending: deque, ordered: bool, finish: Callable[[Any], None]) -> None:
+    if ordered:
+        finish(pending.popleft().result())
+        return
+    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+    for future in done:
+        pending.remove(future)
+        finish(future.result())
+
+
+def _judge_chunk(
+    records: List[Dict[str, Any]],
+    judge: Callable[[str], Dict[str, Any]],
+    judge_pool: ThreadPoolExecutor,
+    weights: WeightProfile,
+) -> List[Dict[str, Any]]:
+    scored = [r for r in records if "error" not in r]
+    for record, result in zip(scored, judge_pool.map(lambda r: judge(r["_text"]), scored)):
+        record["scores"]["judge"] = result
+        record["scores"]["final_score"] = compute_final_score(record, used_judge=True, weights=weights)
+    return records
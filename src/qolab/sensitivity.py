@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Sequence, Tuple
+
+from .evaluation.aggregation import HEURISTIC_SCORES, WeightProfile
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+# How much do the variant and temperature rankings depend on the weighting?
+# Every run is re-aggregated under `draws` weight vectors scattered around its
+# case's profile: heuristic weights are multiplied by lognormal factors and
+# the judge weight is shifted on the logit scale, both with scale `spread`.
+# Draw 0 is the profile itself and is the reference ranking.
+#
+# A group's mean final score is linear in the per-sample sub-scores once the
+# weights are fixed, so samples are first summed per (group, profile) and the
+# draws are applied to those sums; the cost does not grow with the number of
+# samples beyond loading them.
+DEFAULT_DRAWS = 2000
+DEFAULT_SPREAD = 0.5
+DIMENSIONS = ("variant_name", "temperature")
+FIELDS = ("variant_name", "temperature", "scores.heuristics", "scores.judge.total_judge")
+
+
+def _numpy() -> Any:
+    try:
+        import numpy
+    except ImportError as exc:  # pragma: no cover - depends on the environment
+        raise RuntimeError("Sensitivity analysis needs numpy: pip install 'ai-output-quality-lab[sensitivity]'") from exc
+    return numpy
+
+
+def load_score_matrix(run_paths: Sequence[str | Path]) -> Dict[str, Any]:
+    # samples × (heuristic sub-scores..., judge total) plus what each row needs
+    # to be aggregated: its groups, whether it was judged and its run's profile
+    from .logging.sample_index import SampleArchive
+    from .report import find_results
+
+    np = _numpy()
+    rows: List[List[float]] = []
+    judged: List[bool] = []
+    keys: Dict[str, List[Any]] = {d: [] for d in DIMENSIONS}
+    profile_ids: List[int] = []
+    profiles: List[WeightProfile] = []
+    for path in run_paths:
+        path = Path(path)
+        if path.is_dir():
+            path = find_results(path)
+        with SampleArchive(path) as archive:
+            metadata = archive.metadata()
+            profile = WeightProfile.from_case(metadata.get("case") or {})
+            if profile not in profiles:
+                profiles.append(profile)
+            pid = profiles.index(profile)
+            for sample in archive.project(FIELDS):
+                heuristics = sample["scores.heuristics"] or {}
+                judge = sample["scores.judge.total_judge"]
+                is_judged = bool(metadata.get("used_judge")) and judge is not None
+                rows.append([float(heuristics.get(name, 0)) for name in HEURISTIC_SCORES] + [float(judge or 0)])
+                judged.append(is_judged)
+                keys["variant_name"].append(sample["variant_name"])
+                keys["temperature"].append(float(sample["temperature"]))
+                profile_ids.append(pid)
+    return {
+        "runs": len(run_paths),
+        "scores": np.array(rows, dtype=np.float64).reshape(len(rows), len(HEURISTIC_SCORES) + 1),
+        "judged": np.array(judged, dtype=bool),
+        "keys": keys,
+        "profile_ids": np.array(profile_ids, dtype=np.int64),
+        "profiles": profiles,
+    }
+
+
+def draw_weights(
+    profiles: Sequence[WeightProfile], draws: int, spread: float, seed: int
+) -> Tuple["np.ndarray", "np.ndarray"]:
+    # heuristic weights (profiles, draws, sub-scores) and judge weights (profiles, draws)
+    np = _numpy()
+    rng = np.random.default_rng(seed)
+    factors = np.exp(spread * rng.standard_normal((draws, len(HEURISTIC_SCORES))))
+    shifts = spread * rng.standard_normal(draws)
+    factors[0] = 1.0
+    shifts[0] = 0.0
+    base = np.array([list(p.heuristics_weights().values()) for p in profiles])
+    judge = np.clip(np.array([p.judge for p in profiles]), 1e-9, 1 - 1e-9)
+    logits = np.log(judge / (1 - judge))
+    judge_weights = 1 / (1 + np.exp(-(logits[:, None] + shifts[None, :])))
+    # keep a profile's exact 0 or 1 judge weight fixed
+    judge_weights[judge <= 1e-9] = 0.0
+    judge_weights[judge >= 1 - 1e-9] = 1.0
+    return base[:, None, :] * factors[None, :, :], judge_weights
+
+
+def group_scores(
+    matrix: Dict[str, Any], dimension: str, heuristic_weights: "np.ndarray", judge_weights: "np.ndarray"
+) -> Tuple[List[Any], "np.ndarray"]:
+    # mean final score of every group under every draw: (groups, draws)
+    np = _numpy()
+    labels, group_ids = np.unique(np.array(matrix["keys"][dimension], dtype=object), return_inverse=True)
+    n_groups, n_profiles = len(labels), len(matrix["profiles"])
+    scores, judged, pids = matrix["scores"], matrix["judged"], matrix["profile_ids"]
+    sub = scores[:, : len(HEURISTIC_SCORES)]
+    cell = group_ids * n_profiles + pids
+    size = n_groups * n_profiles
+
+    def sums(values: "np.ndarray", mask: "np.ndarray") -> "np.ndarray":
+        out = np.zeros((size,) + values.shape[1:])
+        np.add.at(out, cell[mask], values[mask])
+        return out.reshape((n_groups, n_profiles) + values.shape[1:])
+
+    judge_sum = sums(scores[:, -1], judged)  # (g, p)
+    judged_sub = sums(sub, judged)  # (g, p, s)
+    plain_sub = sums(sub, ~judged)  # (g, p, s)
+    counts = np.bincount(group_ids, minlength=n_groups).astype(np.float64)
+
+    # judged: w_j * J + (1 - w_j) * h·w_h; unjudged: h·w_h
+    judged_h = np.einsum("gps,pks->gpk", judged_sub, heuristic_weights)
+    plain_h = np.einsum("gps,pks->gpk", plain_sub, heuristic_weights)
+    w = judge_weights[None, :, :]
+    total = (w * judge_sum[:, :, None] + (1 - w) * judged_h + plain_h).sum(axis=1)
+    return [_plain(label) for label in labels], total / counts[:, None]
+
+
+def _plain(value: Any) -> Any:
+    return value.item() if hasattr(value, "item") else value
+
+
+def rank_stability(group_means: "np.ndarray") -> Dict[str, Any]:
+    np = _numpy()
+    n_groups, draws = group_means.shape
+    # rank 1 = best; ties broken by group order, as in a sorted report
+    order = np.argsort(-group_means, axis=0, kind="stable")
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(1, n_groups + 1)[:, None], axis=0)
+    top1 = np.bincount(order[0], minlength=n_groups) / draws
+
+    if n_groups > 1:
+        i, j = np.triu_indices(n_groups, k=1)
+        signs = np.sign(group_means[i] - group_means[j])
+        agree = (signs * signs[:, :1]).sum(axis=0)
+        # tau-b: ties count in neither direction
+        norm = np.sqrt(np.count_nonzero(signs, axis=0) * np.count_nonzero(signs[:, 0]))
+        tau = np.divide(agree, norm, out=np.ones(draws), where=norm > 0)
+    else:
+        tau = np.ones(draws)
+    return {"ranks": ranks, "top1": top1, "tau": tau}
+
+
+def analyze(
+    run_paths: Sequence[str | Path],
+    draws: int = DEFAULT_DRAWS,
+    spread: float = DEFAULT_SPREAD,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    np = _numpy()
+    if draws < 1:
+        raise ValueError("--draws must be at least 1.")
+    matrix = load_score_matrix(run_paths)
+    if not len(matrix["scores"]):
+        raise ValueError("The given runs contain no samples.")
+    heuristic_weights, judge_weights = draw_weights(matrix["profiles"], draws, spread, seed)
+    dimensions = {}
+    for dimension in DIMENSIONS:
+        labels, means = group_scores(matrix, dimension, heuristic_weights, judge_weights)
+        stability = rank_stability(means)
+        ranks, tau = stability["ranks"], stability["tau"]
+        groups = [
+            {
+                "group": label,
+                "score": float(means[g, 0]),
+                "rank": int(ranks[g, 0]),
+                "top1": float(stability["top1"][g]),
+                "mean_rank": float(ranks[g].mean()),
+                "rank_p5": float(np.percentile(ranks[g], 5)),
+                "rank_p95": float(np.percentile(ranks[g], 95)),
+            }
+            for g, label in enumerate(labels)
+        ]
+        groups.sort(key=lambda row: row["rank"])
+        dimensions[dimension] = {
+            "groups": groups,
+            "tau_mean": float(tau.mean()),
+            "tau_p5": float(np.percentile(tau, 5)),
+            "unchanged": float(np.mean(tau >= 1.0 - 1e-12)),
+        }
+    return {
+        "runs": matrix["runs"],
+        "samples": int(len(matrix["scores"])),
+        "judged": int(matrix["judged"].sum()),
+        "draws": draws,
+        "spread": spread,
+        "seed": seed,
+        "dimensions": dimensions,
+    }
+
+
+def render_sensitivity(report: Dict[str, Any]) -> str:
+    lines = [
+        "# Weight Sensitivity",
+        "",
+        f"- Runs: {report['runs']} ({report['samples']} samples, {report['judged']} judged)",
+        f"- Weight draws: {report['draws']} (spread {report['spread']}, seed {report['seed']})",
+        "- Kendall τ compares each draw's ranking with the ranking under the cases' own weights.",
+        "",
+    ]
+    titles = {"variant_name": "Variants", "temperature": "Temperatures"}
+    for dimension, result in report["dimensions"].items():
+        lines += [
+            f"## {titles[dimension]}",
+            "",
+            f"- Kendall τ: mean {result['tau_mean']:.3f}, 5th percentile {result['tau_p5']:.3f}",
+            f"- Ranking unchanged in {100 * result['unchanged']:.1f}% of draws",
+            "",
+            "| Rank | Group | Score | Top-1 | Mean rank | Rank 5–95% |",
+            "|---|---|---|---|---|---|",
+        ]
+        for row in result["groups"]:
+            lines.append(
+                f"| {row['rank']} | {row['group']} | {row['score']:.2f} | {100 * row['top1']:.1f}% | "
+                f"{row['mean_rank']:.2f} | {row['rank_p5']:.0f}–{row['rank_p95']:.0f} |"
+            )
+        lines.append("")
+    return "\n".join(lines)
@@ -0,0 +1,359 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .dataset import DEFAULT_ROWS_IN_FLIGHT
+from .evaluation.surrogate import DEFAULT_TRIAGE_MARGIN
+from .generation.budget import BudgetGuard
+from .generation.client import DEFAULT_MODEL, LLMClient, OpenAIClientConfig
+from .generation.hedging import DEFAULT_TIMEOUT
+from .logging.metrics import SweepMetrics, render_openmetrics
+from .pipeline import render_summary_markdown, rescore_run, run_experiment
+from .report import render_comparison
+from .utils.cache import FileCache, ResponseCache
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# finished jobs stay visible on GET /jobs/<id> for this long, and at most
+# this many of them are kept, so a long-lived server does not grow forever
+DEFAULT_JOB_TTL = 3600.0
+DEFAULT_MAX_FINISHED_JOBS = 1000
+
+RUN_PARAMS = {
+    "case",
+    "suite",
+    "runs_dir",
+    "dry_run",
+    "use_judge",
+    "model",
+    "judge_model",
+    "rubric",
+    "compact",
+    "compress",
+    "max_tokens_budget",
+    "max_cost",
+    "stream",
+    "repeats",
+    "surrogate",
+    "triage_margin",
+    "rows_in_flight",
+    "deadline",
+    "request_timeout",
+    "hedge",
+}
+RESCORE_PARAMS = {"run", "case"}
+REPORT_PARAMS = {"run", "compare", "output"}
+
+
+@dataclass
+class Job:
+    id: str
+    type: str
+    params: Dict[str, Any]
+    status: str = "queued"
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    future: Optional[Future] = field(default=None, repr=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "type": self.type,
+            "params": self.params,
+            "status": self.status,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class EvaluationService:
+    def __init__(
+        self,
+        concurrency: int = 4,
+        response_cache_size: int = 10_000,
+        job_ttl: float = DEFAULT_JOB_TTL,
+        max_finished_jobs: int = DEFAULT_MAX_FINISHED_JOBS,
+    ):
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        self.concurrency = concurrency
+        self.job_ttl = job_ttl
+        self.max_finished_jobs = max_finished_jobs
+        self.files = FileCache()
+        self.responses = ResponseCache(response_cache_size)
+        # shared by all run jobs; exported on GET /metrics
+        self.metrics = SweepMetrics()
+        self._llm_clients: Dict[Tuple[str, str, float, bool], LLMClient] = {}
+        self._judge_clients: Dict[str, Any] = {}
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="qolab-job")
+        self._handlers: Dict[str, Tuple[set, Callable[[Dict[str, Any]], Dict[str, Any]]]] = {
+            "run": (RUN_PARAMS, self._run),
+            "rescore": (RESCORE_PARAMS, self._rescore),
+            "report": (REPORT_PARAMS, self._report),
+        }
+
+    def submit(self, job_type: str, params: Dict[str, Any]) -> Job:
+        if job_type not in self._handlers:
+            raise ValueError(f"Unknown job type {job_type!r}")
+        allowed, _ = self._handlers[job_type]
+        unknown = set(params) - allowed
+        if unknown:
+            raise ValueError(f"Unknown parameters for {job_type} job: {sorted(unknown)}")
+        job = Job(id=uuid.uuid4().hex[:12], type=job_type, params=params)
+        with self._lock:
+            self._prune_jobs()
+            self._jobs[job.id] = job
+        job.future = self._executor.submit(self._execute, job)
+        return job
+
+    def _prune_jobs(self) -> None:
+        # called with the lock held; queued and running jobs are never dropped
+        finished = sorted(
+            (j for j in self._jobs.values() if j.finished_at is not None),
+            key=lambda j: j.finished_at or 0.0,
+        )
+        expired = time.time() - self.job_ttl
+        over = len(finished) - self.max_finished_jobs
+        for i, job in enumerate(finished):
+            if i < over or (job.finished_at or 0.0) < expired:
+                del self._jobs[job.id]
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def wait(self, job: Job, timeout: float | None = None) -> Job:
+        if job.future is not None:
+            try:
+                job.future.result(timeout=timeout)
+            except Exception:  # noqa: BLE001 - failures are recorded on the job
+                pass
+        return job
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            statuses = [j.status for j in self._jobs.values()]
+        return {
+            "concurrency": self.concurrency,
+            "jobs": {s: statuses.count(s) for s in ("queued", "running", "done", "failed")},
+            "config_cache_entries": len(self.files),
+            "response_cache": self.responses.stats(),
+            "llm_clients": len(self._llm_clients),
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+    def _execute(self, job: Job) -> None:
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            _, handler = self._handlers[job.type]
+            job.result = handler(job.params)
+            job.status = "done"
+        except Exception as exc:  # noqa: BLE001
+            job.error = f"{type(exc).__name__}: {exc}"
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+
+    def _llm_client(self, model: str, timeout: float, hedge: bool) -> LLMClient:
+        # one client per request policy, so jobs asking for different
+        # timeouts or hedging don't share latency estimates
+        api_key = os.getenv("OPENAI_API_KEY") or ""
+        key = (api_key, model, timeout, hedge)
+        with self._lock:
+            client = self._llm_clients.get(key)
+            if client is None:
+                client = LLMClient(
+                    OpenAIClientConfig(api_key=api_key, model=model, timeout=timeout, hedge=hedge),
+                    cache=self.responses,
+                )
+                self._llm_clients[key] = client
+        return client
+
+    def _judge_client(self) -> Any:
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise ValueError("OPENAI_API_KEY is required when using --use-judge.")
+        with self._lock:
+            client = self._judge_clients.get(api_key)
+            if client is None:
+                from openai import OpenAI
+
+                client = OpenAI(api_key=api_key)
+                self._judge_clients[api_key] = client
+        return client
+
+    def _surrogate(self, path: str | None) -> Any:
+        if not path:
+            return None
+        from .evaluation.surrogate import SurrogateJudge
+
+        return SurrogateJudge.load(path)
+
+    def _run(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        dry_run = bool(params.get("dry_run", False))
+        use_judge = bool(params.get("use_judge", False))
+        request_timeout = float(params.get("request_timeout", DEFAULT_TIMEOUT))
+        hedge = bool(params.get("hedge", False))
+        llm_client = None if dry_run else self._llm_client(params.get("model") or DEFAULT_MODEL, request_timeout, hedge)
+        budget = None
+        if params.get("max_tokens_budget") is not None or params.get("max_cost") is not None:
+            budget = BudgetGuard(params.get("max_tokens_budget"), params.get("max_cost"))
+        results_path = run_experiment(
+            case_path=params["case"],
+            suite_path=params["suite"],
+            runs_dir=params.get("runs_dir", "runs"),
+            dry_run=dry_run,
+            use_judge=use_judge,
+            model=params.get("model"),
+            judge_model=params.get("judge_model"),
+            rubric_path=params.get("rubric"),
+            cache=self.files,
+            llm_client=llm_client,
+            judge_client=self._judge_client() if use_judge else None,
+            response_cache=self.responses,
+            compact=bool(params.get("compact", False)),
+            compression=params.get("compress"),
+            budget=budget,
+            stream=bool(params.get("stream", False)),
+            repeats=int(params.get("repeats", 1)),
+            metrics=self.metrics,
+            surrogate=self._surrogate(params.get("surrogate")) if use_judge else None,
+            triage_margin=float(params.get("triage_margin", DEFAULT_TRIAGE_MARGIN)),
+            rows_in_flight=int(params.get("rows_in_flight", DEFAULT_ROWS_IN_FLIGHT)),
+            deadline=float(params["deadline"]) if params.get("deadline") is not None else None,
+            request_timeout=request_timeout,
+            hedge=hedge,
+        )
+        summary_path = render_summary_markdown(results_path)
+        return {"results": str(results_path), "summary": str(summary_path)}
+
+    def _rescore(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        results_path = rescore_run(params["run"], case_path=params.get("case"), cache=self.files)
+        summary_path = render_summary_markdown(results_path)
+        return {"results": str(results_path), "summary": str(summary_path)}
+
+    def _report(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        if params.get("compare"):
+            report_path = render_comparison(params["compare"], params.get("output") or "comparison.md")
+            return {"comparison": str(report_path)}
+        summary_path = render_summary_markdown(params["run"], params.get("output"))
+        return {"summary": str(summary_path)}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "QolabHTTPServer"
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send(self, status: int, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:  # noqa: N802
+        service = self.server.service
+        if self.path == "/health":
+            self._send(200, {"status": "ok", **service.stats()})
+            return
+        if self.path == "/metrics":
+            body = render_openmetrics(service.metrics).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/openmetrics-text; version=1.0.0; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if self.path.startswith("/jobs/"):
+            job = service.get(self.path[len("/jobs/") :])
+            if job is None:
+                self._send(404, {"error": "unknown job"})
+            else:
+                self._send(200, job.to_dict())
+            return
+        self._send(404, {"error": f"unknown path {self.path}"})
+
+    def do_POST(self) -> None:  # noqa: N802
+        if self.path != "/jobs":
+            self._send(404, {"error": f"unknown path {self.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(payload, dict):
+                raise ValueError("Request body must be a JSON object")
+            params = payload.get("params") or {}
+            if not isinstance(params, dict):
+                raise ValueError("'params' must be a JSON object")
+            job = self.server.service.submit(payload.get("type", ""), params)
+        except (ValueError, json.JSONDecodeError) as exc:
+            self._send(400, {"error": str(exc)})
+            return
+        if payload.get("wait"):
+            self.server.service.wait(job, timeout=payload.get("timeout"))
+            self._send(200, job.to_dict())
+        else:
+            self._send(202, job.to_dict())
+
+
+class QolabHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], service: EvaluationService, verbose: bool = False):
+        super().__init__(address, _Handler)
+        self.service = service
+        self.verbose = verbose
+
+
+def make_server(
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    concurrency: int = 4,
+    verbose: bool = False,
+) -> QolabHTTPServer:
+    return QolabHTTPServer((host, port), EvaluationService(concurrency=concurrency), verbose=verbose)
+
+
+def submit_job(
+    url: str,
+    job_type: str,
+    params: Dict[str, Any],
+    wait: bool = True,
+    timeout: float | None = None,
+) -> Dict[str, Any]:
+    from urllib.request import Request, urlopen
+
+    body = json.dumps({"type": job_type, "params": params, "wait": wait, "timeout": timeout})
+    req = Request(
+        url.rstrip("/") + "/jobs",
+        data=body.encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    with urlopen(req) as resp:
+        return json.loads(resp.read())
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import copy
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from .io import load_json, load_text
+
+
+# Parsed config files, invalidated when their mtime or size changes.
+class FileCache:
+    def __init__(self) -> None:
+        self._entries: Dict[Tuple[str, str], Tuple[int, int, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, kind: str, path: str | Path, loader: Callable[[Path], Any]) -> Any:
+        resolved = Path(path).resolve()
+        stat = resolved.stat()
+        key = (kind, str(resolved))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+                return entry[2]
+        value = loader(resolved)
+        with self._lock:
+            self._entries[key] = (stat.st_mtime_ns, stat.st_size, value)
+        return value
+
+    def load_json(self, path: str | Path) -> Dict[str, Any]:
+        # callers get their own copy so a job cannot mutate another job's config
+        return copy.deepcopy(self._get("json", path, load_json))
+
+    def load_text(self, path: str | Path) -> str:
+        return self._get("text", path, load_text)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = 10_000) -> None:
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
@@ -1,21 +1,129 @@
+from __future__ import annotations
+
+import gzip
 import json
+import math
 from pathlib import Path
-from typing import Any, Dict
+from typing import IO, Any, Dict, Optional
+
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+COMPRESSION_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+
+_orjson_module: Any = False  # not looked up yet
+
+
+def _orjson() -> Any:
+    # optional fast path (see the "fast" extra), imported on first use
+    global _orjson_module
+    if _orjson_module is False:
+        try:
+            import orjson
+        except ImportError:
+            orjson = None
+        _orjson_module = orjson
+    return _orjson_module
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError as exc:
+        raise RuntimeError(
+            "zstd compression requires the 'zstandard' package "
+            "(pip install 'ai-output-quality-lab[fast]')."
+        ) from exc
+    return zstandard
+
+
+def compression_for_path(path: str | Path) -> Optional[str]:
+    suffix = Path(path).suffix
+    for name, ext in COMPRESSION_SUFFIXES.items():
+        if suffix == ext:
+            return name
+    return None
+
+
+def open_binary(path: str | Path) -> IO[bytes]:
+    # transparently decompresses gzip and zstd files, sniffed by magic bytes
+    raw = Path(path).open("rb")
+    magic = raw.read(4)
+    raw.seek(0)
+    if magic.startswith(GZIP_MAGIC):
+        return gzip.GzipFile(fileobj=raw, mode="rb")
+    if magic == ZSTD_MAGIC:
+        return _zstd().ZstdDecompressor().stream_reader(raw, closefd=True)
+    return raw
+
+
+def _finite(data: Any) -> Any:
+    if isinstance(data, float):
+        return data if math.isfinite(data) else None
+    if isinstance(data, dict):
+        return {k: _finite(v) for k, v in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [_finite(v) for v in data]
+    return data
+
+
+def dumps_json(data: Any, compact: bool = False) -> bytes:
+    # NaN and infinities are written as null either way: orjson always does,
+    # and the stdlib's NaN literal is not JSON
+    orjson = _orjson()
+    if orjson is not None:
+        return orjson.dumps(data, option=0 if compact else orjson.OPT_INDENT_2)
+    options: Dict[str, Any] = {"separators": (",", ":")} if compact else {"indent": 2}
+    try:
+        text = json.dumps(data, ensure_ascii=False, allow_nan=False, **options)
+    except ValueError:
+        text = json.dumps(_finite(data), ensure_ascii=False, **options)
+    return text.encode("utf-8")
+
+
+def loads_json(raw: bytes | str) -> Any:
+    orjson = _orjson()
+    if orjson is not None:
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            # files written by the stdlib before non-finite floats were
+            # normalised can hold NaN literals, which orjson rejects
+            pass
+    return json.loads(raw)
 
 
 def load_json(path: str | Path) -> Dict[str, Any]:
-    with Path(path).open("r", encoding="utf-8") as f:
-        return json.load(f)
+    with open_binary(path) as f:
+        return loads_json(f.read())
 
 
-def dump_json(path: str | Path, data: Dict[str, Any]) -> None:
+def dump_json(
+    path: str | Path,
+    data: Dict[str, Any],
+    compact: bool = False,
+    compression: Optional[str] = None,
+) -> None:
     path = Path(path)
     path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    payload = dumps_json(data, compact=compact)
+    compression = compression or compression_for_path(path)
+    if compression == "gzip":
+        payload = gzip.compress(payload, compresslevel=6, mtime=0)
+    elif compression == "zstd":
+        payload = _zstd().ZstdCompressor(level=10).compress(payload)
+    elif compression is not None:
+        raise ValueError(f"Unknown compression {compression!r}; expected gzip or zstd.")
+    with path.open("wb") as f:
+        f.write(payload)
+
+
+def read_prefix(path: str | Path, size: int = 256) -> bytes:
+    with open_binary(path) as f:
+        return f.read(size)
 
 
 def load_text(path: str | Path) -> str:
     with Path(path).open("r", encoding="utf-8") as f:
         return f.read()
-
@@ -1,5 +1,6 @@
 import re
-from typing import Iterable, List
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple
 
 WORD_RE = re.compile(r"\b\w+\b")
 SENTENCE_SPLIT_RE = re.compile(r"[.!?]+")
@@ -29,9 +30,18 @@ def count_emojis(text: str) -> int:
     return len(EMOJI_RE.findall(text))
 
 
+@lru_cache(maxsize=256)
+def compile_phrases(phrases: Tuple[str, ...]) -> Optional["re.Pattern[str]"]:
+    if not phrases:
+        return None
+    return re.compile("|".join(re.escape(p.lower()) for p in phrases))
+
+
 def contains_any(text: str, phrases: Iterable[str]) -> bool:
-    lower = text.lower()
-    return any(p.lower() in lower for p in phrases)
+    pattern = compile_phrases(tuple(phrases))
+    if pattern is None:
+        return False
+    return pattern.search(text.lower()) is not None
 
 
 def count_keyword_hits(text: str, keywords: Iterable[str]) -> int:
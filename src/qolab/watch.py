@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import datetime as dt
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .evaluation.aggregation import WeightProfile
+from .evaluation.judge import JUDGE_SYSTEM_PROMPT, build_judge_prompt
+from .evaluation.rubric import load_rubric
+from .generation.budget import max_tokens_for_words
+from .generation.client import DEFAULT_JUDGE_MODEL, DEFAULT_MAX_TOKENS, DEFAULT_MODEL
+from .logging.run_store import write_run
+from .logging.schemas import RunResults
+from .pipeline import (
+    TEMPERATURES,
+    apply_relevance,
+    build_case_config,
+    build_case_description,
+    build_prompts,
+    build_run_metadata,
+    build_sample_record,
+    build_variants,
+    ensure_single_case,
+    finalize_scores,
+    generate_output,
+    judge_output,
+    load_keywords,
+    render_summary_markdown,
+    score_heuristics,
+)
+from .report import stats_from_results, write_stats
+from .utils.io import dump_json, load_json
+
+# Incremental re-evaluation while configs are being edited. Every cell is
+# keyed by fingerprints of exactly what its API calls would send: the
+# generation key covers the model, the rendered system and user prompts, the
+# temperature and repeat; the judge key covers the judge model and the full
+# judge prompt (rubric, case context, constraints, keywords and the output).
+# Editing one variant's template therefore only regenerates that variant's
+# cells, a rubric edit only re-judges, and a keyword or constraint edit
+# re-judges but keeps every generation. Heuristics cost microseconds and are
+# always recomputed. Results live in a fixed run directory, rewritten in place
+# along with stats.json and summary.md after each refresh; the fingerprinted
+# outputs are kept in watch_state.json so a restarted watch starts warm.
+STATE_VERSION = 1
+DEFAULT_RUBRIC = "configs/rubrics/judge_rubric_v1.json"
+
+
+def _fingerprint(*parts: Any) -> str:
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:24]
+
+
+def _file_key(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class Watcher:
+    def __init__(
+        self,
+        case_path: str,
+        suite_path: str,
+        runs_dir: str = "runs",
+        dry_run: bool = False,
+        use_judge: bool = False,
+        model: str | None = None,
+        judge_model: str | None = None,
+        rubric_path: str | None = None,
+        repeats: int = 1,
+        stream: bool = False,
+        llm_client: Any = None,
+        judge_client: Any = None,
+    ):
+        self.case_path = Path(case_path)
+        self.suite_path = Path(suite_path)
+        self.dry_run = dry_run
+        self.use_judge = use_judge
+        self.model = model or DEFAULT_MODEL
+        self.judge_model = judge_model or DEFAULT_JUDGE_MODEL
+        self.rubric_path = Path(rubric_path or DEFAULT_RUBRIC)
+        self.repeats = repeats
+        self.stream = stream
+        self._llm_client = llm_client
+        self._judge_client = judge_client
+        self.run_dir = Path(runs_dir) / f"watch_{self.case_path.stem}_{self.suite_path.stem}"
+        self.state_path = self.run_dir / "watch_state.json"
+        self.results_path = self.run_dir / "results.json"
+        self._state = self._load_state()
+        self._keywords_path: Optional[Path] = None
+        self._seen: Dict[Path, Optional[Tuple[int, int]]] = {}
+
+    def _load_state(self) -> Dict[str, Any]:
+        try:
+            state = load_json(self.state_path)
+        except (OSError, ValueError):
+            return {"version": STATE_VERSION, "generations": {}, "judgements": {}}
+        if state.get("version") != STATE_VERSION:
+            return {"version": STATE_VERSION, "generations": {}, "judgements": {}}
+        return state
+
+    def watched_paths(self) -> List[Path]:
+        paths = [self.case_path, self.suite_path]
+        if self._keywords_path is not None:
+            paths.append(self._keywords_path)
+        if self.use_judge:
+            paths.append(self.rubric_path)
+        return paths
+
+    def changed(self) -> bool:
+        current = {p: _file_key(p) for p in self.watched_paths()}
+        return current != self._seen
+
+    def _clients(self) -> Tuple[Any, Any]:
+        if self._llm_client is None and not self.dry_run:
+            from .generation.client import LLMClient, OpenAIClientConfig
+
+            self._llm_client = LLMClient(
+                OpenAIClientConfig(api_key=os.getenv("OPENAI_API_KEY"), model=self.model)
+            )
+        if self._judge_client is None and self.use_judge:
+            api_key = os.getenv("OPENAI_API_KEY")
+            if not api_key:
+                raise ValueError("OPENAI_API_KEY is required when using --use-judge.")
+            from openai import OpenAI
+
+            self._judge_client = OpenAI(api_key=api_key)
+        return self._llm_client, self._judge_client
+
+    def refresh(self) -> Dict[str, Any]:
+        # one incremental evaluation of the current configs; the files count
+        # as seen even if they fail to load, so a broken edit is retried only
+        # once it is saved again
+        started = time.perf_counter()
+        self._seen = {p: _file_key(p) for p in self.watched_paths()}
+        case_data = load_json(self.case_path)
+        ensure_single_case(case_data, "qolab watch")
+        suite_data = load_json(self.suite_path)
+        case = build_case_config(case_data)
+        variants = build_variants(suite_data)
+        self._keywords_path = Path(case.keywords_file) if case.keywords_file else None
+        keywords = load_keywords(case.keywords_file) if case.keywords_file else []
+        rubric = load_rubric(str(self.rubric_path)) if self.use_judge else None
+        self._seen = {p: _file_key(p) for p in self.watched_paths()}
+        llm_client, judge_client = self._clients()
+
+        max_tokens = max_tokens_for_words(case.constraints.get("max_words"), DEFAULT_MAX_TOKENS)
+        case_desc = build_case_description(case)
+        old_generations, old_judgements = self._state["generations"], self._state["judgements"]
+        generations: Dict[str, Any] = {}
+        judgements: Dict[str, Any] = {}
+        counts = {"cells": 0, "generated": 0, "judged": 0, "reused": 0}
+        metadata = build_run_metadata(case_data, suite_data, self.model, self.judge_model, self.use_judge)
+        metadata.run_id = self.run_dir.name
+        results = RunResults(metadata=metadata)
+        complete = False
+        try:
+            for variant in variants:
+                user_prompt, full_prompt = build_prompts(case, variant)
+                for temp in TEMPERATURES:
+                    for repeat in range(self.repeats):
+                        counts["cells"] += 1
+                        gen_key = _fingerprint(
+                            self.model,
+                            variant.system_prompt,
+                            user_prompt,
+                            temp,
+                            repeat,
+                            max_tokens,
+                            # dry-run outputs are looked up by name; streaming aborts on constraints
+                            [case.name, variant.name] if self.dry_run else None,
+                            case.constraints if self.stream else None,
+                        )
+                        generation = generations.get(gen_key) or old_generations.get(gen_key)
+                        fresh = generation is None
+                        if fresh:
+                            _, output, abort_reason = generate_output(
+                                case,
+                                variant,
+                                temp,
+                                dry_run=self.dry_run,
+                                llm_client=llm_client,
+                                stream=self.stream,
+                                max_tokens=max_tokens,
+                                repeat=repeat,
+                            )
+                            generation = {"output": output, "abort_reason": abort_reason}
+                            counts["generated"] += 1
+                        generations[gen_key] = generation
+                        output, abort_reason = generation["output"], generation["abort_reason"]
+                        heuristics = score_heuristics(output, case.constraints, keywords, abort_reason)
+
+                        judge_scores = None
+                        if rubric is not None:
+                            judge_prompt = build_judge_prompt(rubric, case_desc, case.constraints, keywords, output)
+                            judge_key = _fingerprint(self.judge_model, JUDGE_SYSTEM_PROMPT, judge_prompt, abort_reason)
+                            judge_scores = judgements.get(judge_key) or old_judgements.get(judge_key)
+                            if judge_scores is None:
+                                judge_scores = judge_output(
+                                    judge_client,
+                                    self.judge_model,
+                                    rubric,
+                                    case_desc,
+                                    case.constraints,
+                                    keywords,
+                                    output,
+                                    abort_reason,
+                                )
+                                counts["judged"] += 1
+                                fresh = True
+                            judgements[judge_key] = judge_scores
+                        counts["reused"] += not fresh
+                        results.samples.append(
+                            build_sample_record(
+                                variant.name, temp, full_prompt, output, heuristics, judge_scores, abort_reason, repeat
+                            )
+                        )
+            complete = True
+        finally:
+            # a complete refresh drops entries of cells that no longer exist;
+            # a failed one keeps everything, including what it already paid for
+            if not complete:
+                generations = {**old_generations, **generations}
+                judgements = {**old_judgements, **judgements}
+            self._state = {"version": STATE_VERSION, "generations": generations, "judgements": judgements}
+            dump_json(self.state_path, self._state, compact=True)
+
+        apply_relevance(results.samples, case)
+        finalize_scores(results.samples, used_judge=self.use_judge, weights=WeightProfile.from_case(case_data))
+        write_run(results, self.results_path)
+        write_stats(self.results_path, stats_from_results(results))
+        counts["summary"] = str(render_summary_markdown(self.results_path))
+        counts["seconds"] = time.perf_counter() - started
+        return counts
+
+    def run(
+        self,
+        interval: float = 1.0,
+        on_refresh: Callable[[Dict[str, Any]], None] | None = None,
+        on_error: Callable[[Exception], None] | None = None,
+        should_stop: Callable[[], bool] = lambda: False,
+    ) -> None:
+        while not should_stop():
+            if self.changed():
+                try:
+                    counts = self.refresh()
+                except Exception as exc:
+                    # a config caught half-saved or a failed API call; finished
+                    # cells are kept and the next edit tries again
+                    if on_error is None:
+                        raise
+                    on_error(exc)
+                else:
+                    counts["at"] = dt.datetime.now().strftime("%H:%M:%S")
+                    if on_refresh is not None:
+                        on_refresh(counts)
+            time.sleep(interval)
@@ -0,0 +1,519 @@
+from __future__ import annotations
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing, contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+from .evaluation.aggregation import WeightProfile
+from .evaluation.rubric import JudgeRubric, load_rubric
+from .generation.budget import max_tokens_for_words
+from .generation.client import DEFAULT_JUDGE_MODEL, DEFAULT_MAX_TOKENS, DEFAULT_MODEL, LLMClient, OpenAIClientConfig
+from .logging.metrics import SweepMetrics
+from .logging.run_store import create_run_dir, results_filename, write_run
+from .logging.schemas import RunResults, SampleRecord
+from .pipeline import (
+    TEMPERATURES,
+    apply_relevance,
+    build_case_config,
+    build_case_description,
+    build_sample_record,
+    build_run_metadata,
+    build_variants,
+    ensure_single_case,
+    finalize_scores,
+    generate_output,
+    judge_output,
+    load_case,
+    load_keywords,
+    load_suite,
+    render_summary_markdown,
+    score_heuristics,
+)
+from .report import stats_from_results, write_stats
+
+
+DEFAULT_LEASE_SECONDS = 120.0
+DEFAULT_MAX_ATTEMPTS = 3
+
+# One row per sweep and one per (variant, temperature, repeat) cell. Every
+# state change runs in a BEGIN IMMEDIATE transaction on a short-lived
+# connection, so the database can sit on a shared filesystem and be used by
+# workers on several nodes. The default rollback journal is kept on purpose:
+# WAL needs shared memory and does not work over network filesystems.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sweeps (
+    id TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'open',
+    lease_owner TEXT,
+    lease_expires REAL,
+    results_path TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS cells (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    sweep_id TEXT NOT NULL REFERENCES sweeps(id),
+    variant_index INTEGER NOT NULL,
+    temperature REAL NOT NULL,
+    repeat INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    lease_owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    sample TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS cells_by_status ON cells(status, lease_expires);
+CREATE INDEX IF NOT EXISTS cells_by_sweep ON cells(sweep_id, status);
+"""
+
+
+@dataclass
+class Cell:
+    id: int
+    sweep_id: str
+    variant_index: int
+    temperature: float
+    repeat: int
+    attempts: int
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class WorkQueue:
+    def __init__(self, path: str | Path, max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        self.path = Path(path)
+        self.max_attempts = max_attempts
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.executescript(_SCHEMA)
+            # queues created before collections were retried lack these columns
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(sweeps)")}
+            if "attempts" not in columns:
+                conn.execute("ALTER TABLE sweeps ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+            if "error" not in columns:
+                conn.execute("ALTER TABLE sweeps ADD COLUMN error TEXT")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=60.0, isolation_level=None)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    def enqueue(
+        self,
+        case_path: str,
+        suite_path: str,
+        runs_dir: str = "runs",
+        dry_run: bool = False,
+        use_judge: bool = False,
+        model: str | None = None,
+        judge_model: str | None = None,
+        rubric_path: str | None = None,
+        repeats: int = 1,
+        stream: bool = False,
+        compact: bool = False,
+        compression: str | None = None,
+    ) -> str:
+        # configs are stored by value so workers on other nodes do not need
+        # the same checkout or working directory
+        case_data = load_case(case_path)
+        ensure_single_case(case_data, "queued runs")
+        suite_data = load_suite(suite_path)
+        case = build_case_config(case_data)
+        params = {
+            "case": case_data,
+            "suite": suite_data,
+            "keywords": load_keywords(case.keywords_file) if case.keywords_file else [],
+            "rubric": asdict(load_rubric(rubric_path or "configs/rubrics/judge_rubric_v1.json")) if use_judge else None,
+            "runs_dir": str(Path(runs_dir).resolve()),
+            "dry_run": dry_run,
+            "use_judge": use_judge,
+            "model": model or DEFAULT_MODEL,
+            "judge_model": judge_model or DEFAULT_JUDGE_MODEL,
+            "repeats": repeats,
+            "stream": stream,
+            "compact": compact,
+            "compression": compression,
+        }
+        metadata = build_run_metadata(case_data, suite_data, params["model"], params["judge_model"], use_judge)
+        sweep_id = uuid.uuid4().hex[:12]
+        cells = [
+            (sweep_id, i, temp, repeat)
+            for i in range(len(suite_data["variants"]))
+            for temp in TEMPERATURES
+            for repeat in range(repeats)
+        ]
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO sweeps (id, created_at, params) VALUES (?, ?, ?)",
+                (sweep_id, metadata.created_at, json.dumps(params)),
+            )
+            conn.executemany(
+                "INSERT INTO cells (sweep_id, variant_index, temperature, repeat) VALUES (?, ?, ?, ?)",
+                cells,
+            )
+        return sweep_id
+
+    def _expire(self, conn: sqlite3.Connection, now: float) -> None:
+        # cells whose worker died on the last allowed attempt are given up
+        conn.execute(
+            "UPDATE cells SET status = 'failed', error = COALESCE(error, 'lease expired') "
+            "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+            (now, self.max_attempts),
+        )
+        conn.execute(
+            "UPDATE sweeps SET status = 'failed', error = COALESCE(error, 'collection lease expired') "
+            "WHERE status = 'collecting' AND lease_expires < ? AND attempts >= ?",
+            (now, self.max_attempts),
+        )
+
+    def lease(self, worker_id: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> Optional[Cell]:
+        now = time.time()
+        with self._transaction() as conn:
+            self._expire(conn, now)
+            row = conn.execute(
+                "SELECT id, sweep_id, variant_index, temperature, repeat, attempts FROM cells "
+                "WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?) "
+                "ORDER BY id LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE cells SET status = 'leased', lease_owner = ?, lease_expires = ?, "
+                "attempts = attempts + 1 WHERE id = ?",
+                (worker_id, now + lease_seconds, row[0]),
+            )
+        return Cell(*row[:5], attempts=row[5] + 1)
+
+    def renew(self, cell: Cell, worker_id: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> bool:
+        with self._transaction() as conn:
+            cur = conn.execute(
+                "UPDATE cells SET lease_expires = ? WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (time.time() + lease_seconds, cell.id, worker_id),
+            )
+        return cur.rowcount == 1
+
+    def complete(self, cell: Cell, worker_id: str, sample: Dict[str, Any]) -> bool:
+        # a worker whose lease expired and was taken over must not overwrite
+        # the new owner's result
+        with self._transaction() as conn:
+            cur = conn.execute(
+                "UPDATE cells SET status = 'done', sample = ?, lease_owner = NULL, lease_expires = NULL "
+                "WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (json.dumps(sample), cell.id, worker_id),
+            )
+        return cur.rowcount == 1
+
+    def fail(self, cell: Cell, worker_id: str, error: str) -> None:
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE cells SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "error = ?, lease_owner = NULL, lease_expires = NULL "
+                "WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (self.max_attempts, error, cell.id, worker_id),
+            )
+
+    def claim_collection(self, worker_id: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> Optional[str]:
+        # The first worker to find a sweep with no open cells assembles its
+        # run. The run directory is reserved with the first claim and kept,
+        # so a collector that dies after writing the run leaves the next one
+        # the same path to overwrite instead of a second run directory.
+        # Like cells, a sweep whose collection keeps failing is given up after
+        # max_attempts claims.
+        now = time.time()
+        with self._transaction() as conn:
+            self._expire(conn, now)
+            row = conn.execute(
+                "SELECT id, params, results_path FROM sweeps s "
+                "WHERE (status = 'open' OR (status = 'collecting' AND lease_expires < ?)) "
+                "AND NOT EXISTS (SELECT 1 FROM cells c WHERE c.sweep_id = s.id "
+                "AND c.status IN ('pending', 'leased')) LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is None:
+                return None
+            sweep_id, params, results_path = row
+            conn.execute(
+                "UPDATE sweeps SET status = 'collecting', lease_owner = ?, lease_expires = ?, "
+                "attempts = attempts + 1 WHERE id = ?",
+                (worker_id, now + lease_seconds, sweep_id),
+            )
+            if results_path is None:
+                try:
+                    params = json.loads(params)
+                    metadata = build_run_metadata(
+                        params["case"], params["suite"], params["model"], params["judge_model"], params["use_judge"]
+                    )
+                    run_dir = create_run_dir(params["runs_dir"], metadata)
+                except Exception as exc:  # noqa: BLE001 - recorded on the sweep and retried
+                    self._fail_collection(conn, sweep_id, worker_id, f"{type(exc).__name__}: {exc}")
+                    return None
+                results_path = str(run_dir / results_filename(params["compression"]))
+                conn.execute("UPDATE sweeps SET results_path = ? WHERE id = ?", (results_path, sweep_id))
+        return sweep_id
+
+    def renew_collection(self, sweep_id: str, worker_id: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> bool:
+        with self._transaction() as conn:
+            cur = conn.execute(
+                "UPDATE sweeps SET lease_expires = ? WHERE id = ? AND status = 'collecting' AND lease_owner = ?",
+                (time.time() + lease_seconds, sweep_id, worker_id),
+            )
+        return cur.rowcount == 1
+
+    def fail_collection(self, sweep_id: str, worker_id: str, error: str) -> None:
+        with self._transaction() as conn:
+            self._fail_collection(conn, sweep_id, worker_id, error)
+
+    def _fail_collection(self, conn: sqlite3.Connection, sweep_id: str, worker_id: str, error: str) -> None:
+        conn.execute(
+            "UPDATE sweeps SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'open' END, "
+            "error = ?, lease_owner = NULL, lease_expires = NULL "
+            "WHERE id = ? AND status = 'collecting' AND lease_owner = ?",
+            (self.max_attempts, error, sweep_id, worker_id),
+        )
+
+    def params(self, sweep_id: str) -> Dict[str, Any]:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT params FROM sweeps WHERE id = ?", (sweep_id,)).fetchone()
+        if row is None:
+            raise KeyError(f"Unknown sweep {sweep_id!r}")
+        return json.loads(row[0])
+
+    def collect(self, sweep_id: str, worker_id: str) -> Path:
+        params = self.params(sweep_id)
+        with closing(self._connect()) as conn:
+            created_at, results_path = conn.execute(
+                "SELECT created_at, results_path FROM sweeps WHERE id = ?", (sweep_id,)
+            ).fetchone()
+            rows = conn.execute(
+                "SELECT status, sample FROM cells WHERE sweep_id = ? ORDER BY variant_index, temperature, repeat",
+                (sweep_id,),
+            ).fetchall()
+        metadata = build_run_metadata(
+            params["case"], params["suite"], params["model"], params["judge_model"], params["use_judge"]
+        )
+        metadata.created_at = created_at
+        metadata.run_id = Path(results_path).parent.name
+        results = RunResults(metadata=metadata)
+        results.samples = [SampleRecord(**json.loads(sample)) for status, sample in rows if status == "done"]
+        failed = sum(1 for status, _ in rows if status == "failed")
+        if failed:
+            metadata.stopped_reason = f"{failed} of {len(rows)} cells failed after {self.max_attempts} attempts"
+        apply_relevance(results.samples, build_case_config(params["case"]))
+        finalize_scores(
+            results.samples, used_judge=params["use_judge"], weights=WeightProfile.from_case(params["case"])
+        )
+        results_path = write_run(results, results_path, compact=params["compact"])
+        write_stats(results_path, stats_from_results(results))
+        render_summary_markdown(results_path)
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE sweeps SET status = 'done', lease_owner = NULL, lease_expires = NULL "
+                "WHERE id = ? AND lease_owner = ?",
+                (sweep_id, worker_id),
+            )
+        return results_path
+
+    def status(self, sweep_id: str) -> Dict[str, Any]:
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT status, results_path, error FROM sweeps WHERE id = ?", (sweep_id,)
+            ).fetchone()
+            if row is None:
+                raise KeyError(f"Unknown sweep {sweep_id!r}")
+            counts = dict(
+                conn.execute(
+                    "SELECT status, COUNT(*) FROM cells WHERE sweep_id = ? GROUP BY status", (sweep_id,)
+                ).fetchall()
+            )
+        return {
+            "sweep": sweep_id,
+            "status": row[0],
+            # reserved while collecting, written once done
+            "results": row[1] if row[0] == "done" else None,
+            "error": row[2],
+            "cells": {s: counts.get(s, 0) for s in ("pending", "leased", "done", "failed")},
+        }
+
+    def wait(self, sweep_id: str, poll_interval: float = 1.0, timeout: float | None = None) -> Dict[str, Any]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            status = self.status(sweep_id)
+            if status["status"] in ("done", "failed"):
+                return status
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError(f"Sweep {sweep_id} not finished after {timeout}s")
+            time.sleep(poll_interval)
+
+
+class _Heartbeat:
+    # renews a lease in the background while a slow call or collection runs
+    def __init__(self, renew: Any, interval: float):
+        self._renew = renew
+        self._interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self._interval):
+            if not self._renew():
+                return
+
+    def __enter__(self) -> "_Heartbeat":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+class Worker:
+    def __init__(
+        self,
+        queue: WorkQueue,
+        worker_id: str | None = None,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        poll_interval: float = 1.0,
+    ):
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        self.queue = queue
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.metrics = SweepMetrics()
+        self._params: Dict[str, Dict[str, Any]] = {}
+        self._llm_clients: Dict[str, LLMClient] = {}
+        self._judge_client: Any = None
+
+    def _sweep(self, sweep_id: str) -> Dict[str, Any]:
+        if sweep_id not in self._params:
+            self._params[sweep_id] = self.queue.params(sweep_id)
+        return self._params[sweep_id]
+
+    def _llm_client(self, model: str) -> LLMClient:
+        if model not in self._llm_clients:
+            api_key = os.getenv("OPENAI_API_KEY")
+            self._llm_clients[model] = LLMClient(OpenAIClientConfig(api_key=api_key, model=model))
+        return self._llm_clients[model]
+
+    def _judge(self) -> Any:
+        if self._judge_client is None:
+            api_key = os.getenv("OPENAI_API_KEY")
+            if not api_key:
+                raise ValueError("OPENAI_API_KEY is required when using --use-judge.")
+            from openai import OpenAI
+
+            self._judge_client = OpenAI(api_key=api_key)
+        return self._judge_client
+
+    def execute(self, cell: Cell) -> SampleRecord:
+        params = self._sweep(cell.sweep_id)
+        case = build_case_config(params["case"])
+        variant = build_variants(params["suite"])[cell.variant_index]
+        keywords = params["keywords"]
+        dry_run = params["dry_run"]
+        full_prompt, output, abort_reason = generate_output(
+            case,
+            variant,
+            cell.temperature,
+            dry_run=dry_run,
+            llm_client=None if dry_run else self._llm_client(params["model"]),
+            stream=params["stream"],
+            max_tokens=max_tokens_for_words(case.constraints.get("max_words"), DEFAULT_MAX_TOKENS),
+            repeat=cell.repeat,
+            metrics=self.metrics,
+        )
+        heuristics_scores = score_heuristics(output, case.constraints, keywords, abort_reason)
+        judge_scores = None
+        if params["use_judge"]:
+            judge_scores = judge_output(
+                self._judge(),
+                params["judge_model"],
+                JudgeRubric(**params["rubric"]),
+                build_case_description(case),
+                case.constraints,
+                keywords,
+                output,
+                abort_reason,
+                metrics=self.metrics,
+            )
+        return build_sample_record(
+            variant.name,
+            cell.temperature,
+            full_prompt,
+            output,
+            heuristics_scores,
+            judge_scores,
+            abort_reason,
+            cell.repeat,
+        )
+
+    def run_once(self) -> bool:
+        # returns False when there was nothing to do
+        cell = self.queue.lease(self.worker_id, self.lease_seconds)
+        if cell is not None:
+            self.metrics.add_cells(1)
+            renew = lambda: self.queue.renew(cell, self.worker_id, self.lease_seconds)  # noqa: E731
+            try:
+                with _Heartbeat(renew, self.lease_seconds / 3):
+                    sample = self.execute(cell)
+            except Exception as exc:  # noqa: BLE001 - recorded on the cell and retried
+                self.queue.fail(cell, self.worker_id, f"{type(exc).__name__}: {exc}")
+            else:
+                # a worker that lost its lease did not complete the cell
+                if self.queue.complete(cell, self.worker_id, sample.model_dump()):
+                    self.metrics.cell_done(aborted=sample.abort_reason is not None)
+            return True
+        sweep_id = self.queue.claim_collection(self.worker_id, self.lease_seconds)
+        if sweep_id is not None:
+            renew = lambda: self.queue.renew_collection(sweep_id, self.worker_id, self.lease_seconds)  # noqa: E731
+            try:
+                with _Heartbeat(renew, self.lease_seconds / 3):
+                    self.queue.collect(sweep_id, self.worker_id)
+            except Exception as exc:  # noqa: BLE001 - recorded on the sweep and retried
+                self.queue.fail_collection(sweep_id, self.worker_id, f"{type(exc).__name__}: {exc}")
+            return True
+        return False
+
+    def run(self, idle_exit: float | None = None) -> int:
+        # processes cells until interrupted, or until the queue has been empty
+        # for `idle_exit` seconds; returns the number of tasks handled
+        handled = 0
+        idle_since = time.monotonic()
+        while True:
+            if self.run_once():
+                handled += 1
+                idle_since = time.monotonic()
+                continue
+            if idle_exit is not None and time.monotonic() - idle_since >= idle_exit:
+                return handled
+            time.sleep(self.poll_interval)
+
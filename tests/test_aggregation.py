@@ -1,4 +1,4 @@
-from qolab.evaluation.aggregation import compute_final_score
+from qolab.evaluation.aggregation import WeightProfile, compute_final_score
 
 
 def test_final_score_without_judge():
@@ -16,3 +16,21 @@ def test_final_score_with_judge():
     final = compute_final_score(sample, used_judge=True)
     assert final == 0.6 * 25 + 0.4 * 20
 
+
+def test_weight_profile_from_case():
+    heuristics = {
+        "length_fit": 5,
+        "structure": 3,
+        "keyword_coverage": 1,
+        "clarity": 4,
+        "repetition": 5,
+        "brand_voice": 2,
+        "total_heuristics": 20,
+    }
+    sample = {"scores": {"heuristics": heuristics, "judge": {"total_judge": 25}}}
+    assert compute_final_score(sample, True, WeightProfile.from_case({})) == compute_final_score(sample, True)
+
+    profile = WeightProfile.from_case({"weights": {"judge": 0.5, "heuristics": {"length_fit": 2, "brand_voice": 0}}})
+    assert profile.heuristics_total(heuristics) == 20 + 5 - 2
+    assert compute_final_score(sample, True, profile) == 0.5 * 25 + 0.5 * 23
+    assert compute_final_score(sample, False, profile) == 23
@@ -0,0 +1,152 @@
+import io
+import json
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+import qolab.batch
+from qolab.batch import advance, create_batch_run, resume
+from qolab.utils.io import load_json
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+CASE = str(REPO_ROOT / "configs/cases/linkedin_b2b_saas.json")
+SUITE = str(REPO_ROOT / "configs/prompt_suites/linkedin_v1.json")
+
+
+class LocalBatchEndpoint:
+    # Stand-in for the provider's files + batches API. A batch completes on
+    # its second poll; requests whose custom_id is in `fail` come back in the
+    # error file.
+    def __init__(self, fail=()):
+        self.files = SimpleNamespace(create=self._create_file, content=self._content)
+        self.batches = SimpleNamespace(create=self._create_batch, retrieve=self._retrieve, list=self._list)
+        self.fail = set(fail)
+        self._files = {}
+        self._batches = {}
+
+    def _create_file(self, file, purpose):
+        file_id = f"file-{len(self._files)}"
+        self._files[file_id] = file.read()
+        return SimpleNamespace(id=file_id)
+
+    def _content(self, file_id):
+        return io.BytesIO(self._files[file_id])
+
+    def _create_batch(self, input_file_id, endpoint, completion_window, metadata):
+        batch_id = f"batch-{len(self._batches)}"
+        self._batches[batch_id] = {"input": input_file_id, "polls": 0}
+        return SimpleNamespace(id=batch_id, status="validating")
+
+    def _list(self, limit):
+        # newest first, like the provider
+        data = [
+            SimpleNamespace(id=batch_id, input_file_id=batch["input"], status="validating")
+            for batch_id, batch in reversed(list(self._batches.items()))
+        ]
+        return SimpleNamespace(data=data[:limit])
+
+    def _reply(self, request):
+        body = request["body"]
+        if body["messages"][0]["content"].startswith("You are an impartial"):
+            content = json.dumps({"scores": {"clarity_structure": 4, "tone_voice": 3}, "checks": {}, "rationales": {}})
+        else:
+            content = f"I learned something at temperature {body['temperature']}. What did you learn?"
+        return {
+            "choices": [{"message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": 100, "completion_tokens": 20},
+        }
+
+    def _retrieve(self, batch_id):
+        batch = self._batches[batch_id]
+        batch["polls"] += 1
+        if batch["polls"] < 2:
+            return SimpleNamespace(status="in_progress", output_file_id=None, error_file_id=None)
+        if "output" not in batch:
+            output, errors = [], []
+            for line in self._files[batch["input"]].splitlines():
+                request = json.loads(line)
+                if request["custom_id"] in self.fail:
+                    errors.append({"custom_id": request["custom_id"], "response": None, "error": {"message": "boom"}})
+                else:
+                    response = {"status_code": 200, "body": self._reply(request)}
+                    output.append({"custom_id": request["custom_id"], "response": response, "error": None})
+            batch["output"] = self._store(output)
+            batch["errors"] = self._store(errors) if errors else None
+        return SimpleNamespace(status="completed", output_file_id=batch["output"], error_file_id=batch["errors"])
+
+    def _store(self, rows):
+        file_id = f"file-{len(self._files)}"
+        self._files[file_id] = "".join(json.dumps(r) + "\n" for r in rows).encode("utf-8")
+        return file_id
+
+
+def test_batch_run_resumes_across_processes(tmp_path, monkeypatch):
+    monkeypatch.chdir(REPO_ROOT)
+    endpoint = LocalBatchEndpoint(fail={"gen-4"})
+    state_path = create_batch_run(
+        CASE, SUITE, tmp_path / "batches", runs_dir=str(tmp_path / "runs"), use_judge=True
+    )
+    lines = (state_path.parent / "generation.jsonl").read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 9
+    assert json.loads(lines[0])["url"] == "/v1/chat/completions"
+
+    # submit, then a poll that finds the batch still running: the process may exit here
+    assert advance(state_path, endpoint)["batches"]["generation"]["status"] == "validating"
+    assert resume(state_path, endpoint)["phase"] == "generation"
+
+    # a later process picks up the saved state and finishes both phases
+    state = resume(state_path, endpoint, wait=True, poll_interval=0)
+    assert state["phase"] == "done"
+    assert list(state["failed"]) == ["gen-4"]
+    assert (state_path.parent / "judge.jsonl").exists()
+
+    data = load_json(state["results"])
+    assert len(data["samples"]) == 8
+    assert all(s["scores"]["judge"]["total_judge"] == 7 for s in data["samples"])
+    assert data["metadata"]["stopped_reason"].startswith("1 of 9 generation requests failed")
+    assert data["metadata"]["usage"]["total_tokens"] == 16 * 120
+
+
+def _crash(*args, **kwargs):
+    raise KeyboardInterrupt
+
+
+def test_batch_resume_does_not_repeat_interrupted_side_effects(tmp_path, monkeypatch):
+    monkeypatch.chdir(REPO_ROOT)
+    endpoint = LocalBatchEndpoint()
+    state_path = create_batch_run(CASE, SUITE, tmp_path / "batches", runs_dir=str(tmp_path / "runs"))
+
+    # the process dies right after the provider accepted the batch, before its id was saved
+    create_batch = endpoint.batches.create
+    endpoint.batches.create = lambda **kwargs: _crash(create_batch(**kwargs))
+    with pytest.raises(KeyboardInterrupt):
+        advance(state_path, endpoint)
+    endpoint.batches.create = create_batch
+    assert advance(state_path, endpoint)["batches"]["generation"]["id"] == "batch-0"
+
+    # and again after the run was written but before the state recorded it
+    with monkeypatch.context() as patch:
+        patch.setattr(qolab.batch, "render_summary_markdown", _crash)
+        with pytest.raises(KeyboardInterrupt):
+            resume(state_path, endpoint, wait=True, poll_interval=0)
+    state = resume(state_path, endpoint)
+
+    assert state["phase"] == "done"
+    assert list(endpoint._batches) == ["batch-0"]
+    assert [p.name for p in (tmp_path / "runs").iterdir()] == [Path(state["results"]).parent.name]
+
+
+def test_batch_usage_uses_the_given_pricing(tmp_path, monkeypatch):
+    monkeypatch.chdir(REPO_ROOT)
+    endpoint = LocalBatchEndpoint()
+    pricing = {"gpt-4.1-mini": {"input": 2.0, "output": 10.0}}
+    state_path = create_batch_run(
+        CASE, SUITE, tmp_path / "batches", runs_dir=str(tmp_path / "runs"), pricing=pricing
+    )
+    state = resume(state_path, endpoint, wait=True, poll_interval=0)
+
+    usage = load_json(state["results"])["metadata"]["usage"]
+    # 9 requests of 100 + 20 tokens at half the list price
+    assert usage["total_cost_usd"] == pytest.approx(9 * (100 * 2.0 + 20 * 10.0) * 0.5 / 1_000_000)
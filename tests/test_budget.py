@@ -0,0 +1,99 @@
+import json
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from qolab.evaluation.streaming import ConstraintMonitor
+from qolab.generation.budget import BudgetExceeded, BudgetGuard, max_tokens_for_words
+from qolab.generation.client import LLMClient, OpenAIClientConfig
+from qolab.pipeline import run_experiment
+from qolab.planner import plan_experiment
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+CASE = str(REPO_ROOT / "configs/cases/linkedin_b2b_saas.json")
+SUITE = str(REPO_ROOT / "configs/prompt_suites/linkedin_v1.json")
+
+
+class _StubCompletions:
+    def __init__(self):
+        self.calls = 0
+
+    def create(self, **kwargs):
+        self.calls += 1
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="I learned a lot. How do you plan?"))],
+            usage=SimpleNamespace(prompt_tokens=300, completion_tokens=100),
+        )
+
+
+def _stub_client():
+    client = LLMClient(OpenAIClientConfig(api_key="test-key"))
+    completions = _StubCompletions()
+    client.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return client, completions
+
+
+def test_guard_reserves_worst_case_and_settles_actual_usage():
+    guard = BudgetGuard(max_tokens=1000)
+    first = guard.reserve("gpt-4.1-mini", 300, 600)
+    with pytest.raises(BudgetExceeded):
+        guard.reserve("gpt-4.1-mini", 300, 600)
+    guard.settle(first, 300, 100)
+    assert guard.summary()["total_tokens"] == 400
+    # once tripped the guard stays closed so every worker stops
+    with pytest.raises(BudgetExceeded):
+        guard.reserve("gpt-4.1-mini", 10, 10)
+
+
+def test_plan_counts_every_generation_and_judge_call(monkeypatch):
+    monkeypatch.chdir(REPO_ROOT)
+    plan = plan_experiment(CASE, SUITE, use_judge=True)
+    kinds = [c.kind for c in plan.calls]
+    assert kinds.count("generation") == 9
+    assert kinds.count("judge") == 9
+    totals = plan.totals()
+    assert 0 < totals["expected_cost_usd"] <= totals["max_cost_usd"]
+    # generation max_tokens follows the case's 150-word budget instead of the flat 600
+    assert totals["max_output_tokens"] == 9 * max_tokens_for_words(150, 600) + 9 * 400
+
+
+def test_run_stops_cleanly_and_keeps_partial_results(tmp_path, monkeypatch):
+    monkeypatch.chdir(REPO_ROOT)
+    client, completions = _stub_client()
+    # each call reserves ~prompt + max_tokens and settles at 400
+    budget = BudgetGuard(max_tokens=2000)
+    path = run_experiment(
+        CASE,
+        SUITE,
+        str(tmp_path),
+        dry_run=False,
+        use_judge=False,
+        llm_client=client,
+        budget=budget,
+    )
+    data = json.loads(path.read_text(encoding="utf-8"))
+    assert 0 < len(data["samples"]) < 9
+    assert len(data["samples"]) == completions.calls
+    assert data["metadata"]["stopped_reason"].startswith("budget exceeded")
+    assert data["metadata"]["usage"]["total_tokens"] <= 2000
+
+
+class _BrokenCompletions:
+    def create(self, **kwargs):
+        raise TimeoutError("hedged call abandoned")
+
+
+def test_reservation_is_released_when_a_call_fails_with_a_non_api_error():
+    client = LLMClient(OpenAIClientConfig(api_key="test-key"))
+    client.client = SimpleNamespace(chat=SimpleNamespace(completions=_BrokenCompletions()))
+    # room for one reservation at a time, so a leaked one blocks the next call
+    budget = BudgetGuard(max_tokens=1000)
+    for _ in range(3):
+        with pytest.raises(TimeoutError):
+            client.generate("sys", "user", 0.7, max_tokens=600, budget=budget)
+        with pytest.raises(TimeoutError):
+            client.generate_stream("sys", "user", 0.7, ConstraintMonitor(), max_tokens=600, budget=budget)
+    assert budget.exceeded is None
+    assert budget.summary()["total_tokens"] == 0
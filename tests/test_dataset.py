@@ -0,0 +1,140 @@
+import csv
+import json
+import threading
+from collections import Counter
+
+import pytest
+
+from qolab.dataset import DatasetSpec, dataset_rows, iter_rows, stratified_sample
+from qolab.logging.run_store import load_run
+from qolab.pipeline import run_experiment
+from qolab.report import load_stats
+
+
+class RowClient:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+
+    def generate(self, system, user, temperature, max_tokens=None, budget=None, repeat=0, metrics=None):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            ticket = user.split("Ticket: ", 1)[1].split("\n", 1)[0]
+            return f"I read ticket {ticket} at {temperature}. Here is what happens next."
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+def _configs(tmp_path, dataset, **constraints):
+    case = {
+        "name": "ticket_replies",
+        "task": "Reply to a support ticket.",
+        "audience": "Customers",
+        "tone": "calm",
+        "constraints": {"min_words": 5, "max_words": 60, **constraints},
+        "keywords_file": "",
+        "dataset": dataset,
+    }
+    suite = {
+        "name": "tickets",
+        "variants": [
+            {"name": "Plain", "system_prompt": "Be brief.", "user_prompt_template": "{task}\nTicket: {ticket}\n"},
+            {"name": "Warm", "system_prompt": "Be kind.", "user_prompt_template": "{task} ({tone})\nTicket: {ticket}\n"},
+        ],
+    }
+    case_path, suite_path = tmp_path / "case.json", tmp_path / "suite.json"
+    case_path.write_text(json.dumps(case), encoding="utf-8")
+    suite_path.write_text(json.dumps(suite), encoding="utf-8")
+    return str(case_path), str(suite_path)
+
+
+def test_rows_stream_from_jsonl_and_csv(tmp_path):
+    jsonl = tmp_path / "rows.jsonl"
+    jsonl.write_text('{"ticket": "a"}\n\n{"ticket": "b"}\n', encoding="utf-8")
+    with (tmp_path / "rows.csv").open("w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "ticket"])
+        writer.writerows([["x1", "a"], ["x2", "b"]])
+    assert [r["ticket"] for r in iter_rows(jsonl)] == ["a", "b"]
+    rows, total = dataset_rows(DatasetSpec(path=str(tmp_path / "rows.csv"), id_field="id"))
+    assert [(i, r["ticket"]) for i, r in rows] == [("x1", "a"), ("x2", "b")]
+    assert total is None
+    with pytest.raises(ValueError):
+        list(iter_rows(tmp_path / "rows.txt"))
+
+
+def test_stratified_sample_keeps_proportions_and_file_order():
+    rows = ((i, {"group": "big" if i % 4 else "small"}) for i in range(1000))
+    chosen, total = stratified_sample(rows, 100, stratify="group", seed=3)
+    assert total == 1000
+    assert Counter(r["group"] for _, r in chosen) == {"big": 75, "small": 25}
+    assert [i for i, _ in chosen] == sorted(i for i, _ in chosen)
+    again, _ = stratified_sample(((i, {"group": "big" if i % 4 else "small"}) for i in range(1000)), 100, "group", 3)
+    assert again == chosen
+
+
+def test_dataset_run_is_streamed_per_row(tmp_path):
+    dataset = tmp_path / "tickets.jsonl"
+    dataset.write_text("".join(json.dumps({"id": f"t{i}", "ticket": f"#{i}"}) + "\n" for i in range(10)), encoding="utf-8")
+    case, suite = _configs(tmp_path, {"path": str(dataset), "id_field": "id"})
+    client = RowClient()
+    results_path = run_experiment(
+        case,
+        suite,
+        runs_dir=str(tmp_path / "runs"),
+        dry_run=False,
+        use_judge=False,
+        llm_client=client,
+        rows_in_flight=3,
+    )
+
+    run = load_run(results_path)
+    assert len(run.samples) == 10 * 2 * 3
+    assert [s.row_id for s in run.samples[::6]] == [f"t{i}" for i in range(10)]
+    assert "Ticket: #4" in run.samples[24].full_prompt
+    assert "#4" in run.samples[24].output_text
+    assert run.metadata.dataset["rows"] == 10
+    assert client.peak <= 3
+
+    stats = load_stats(results_path)
+    assert stats["samples"] == 60
+    assert {(c["variant_name"], c["temperature"]): c["n"] for c in stats["cells"]} == {
+        (v, t): 10 for v in ("Plain", "Warm") for t in (0.2, 0.7, 1.0)
+    }
+
+
+def test_rescore_leaves_a_dataset_run_unchanged(tmp_path):
+    pytest.importorskip("numpy")
+    from qolab.pipeline import rescore_run
+
+    dataset = tmp_path / "tickets.jsonl"
+    topics = ["refund for a broken blender", "password reset email never arrives", "invoice shows the wrong plan"]
+    dataset.write_text(
+        "".join(json.dumps({"id": f"t{i}", "ticket": topic}) + "\n" for i, topic in enumerate(topics)),
+        encoding="utf-8",
+    )
+    case, suite = _configs(tmp_path, {"path": str(dataset), "id_field": "id"}, relevance=True)
+    results_path = run_experiment(
+        case, suite, runs_dir=str(tmp_path / "runs"), dry_run=False, use_judge=False, llm_client=RowClient()
+    )
+
+    def scores(path):
+        return [(s.row_id, dict(s.scores.heuristics), s.scores.final_score) for s in load_run(path).samples]
+
+    before = scores(results_path)
+    assert all("relevance" in h for _, h, _ in before)
+    assert rescore_run(results_path) == results_path
+    assert scores(results_path) == before
+    assert load_stats(results_path)["samples"] == 18
+
+
+def test_dataset_cases_are_rejected_where_unsupported(tmp_path):
+    from qolab.planner import plan_experiment
+
+    case, suite = _configs(tmp_path, {"path": "rows.jsonl"})
+    with pytest.raises(ValueError, match="Dataset-driven"):
+        plan_experiment(case, suite, use_judge=False)
@@ -0,0 +1,200 @@
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from openai import APIConnectionError, RateLimitError
+
+from qolab.generation.endpoints import CircuitBreaker, Endpoint, EndpointPool, EndpointPools
+from qolab.logging.run_store import load_run
+from qolab.pipeline import run_experiment
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+CASE = str(REPO_ROOT / "configs/cases/linkedin_b2b_saas.json")
+SUITE = str(REPO_ROOT / "configs/prompt_suites/linkedin_v1.json")
+
+
+def _stub_server(status):
+    # a minimal OpenAI-compatible chat completions endpoint
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            self.server.models.append(request["model"])
+            if status == 200:
+                body = {
+                    "id": "stub",
+                    "object": "chat.completion",
+                    "created": 0,
+                    "model": request["model"],
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {"role": "assistant", "content": "I learned a lot. How do you plan?"},
+                            "finish_reason": "stop",
+                        }
+                    ],
+                    "usage": {"prompt_tokens": 300, "completion_tokens": 100, "total_tokens": 400},
+                }
+            else:
+                body = {"error": {"message": "unavailable", "type": "server_error"}}
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.models = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@pytest.fixture
+def stubs():
+    servers = {"broken": _stub_server(500), "a": _stub_server(200), "b": _stub_server(200)}
+    yield servers
+    for server in servers.values():
+        server.shutdown()
+        server.server_close()
+
+
+def test_run_fails_over_from_a_broken_endpoint(tmp_path, stubs):
+    config = {
+        "routing": "least_loaded",
+        "breaker": {"min_requests": 2, "cooldown": 60},
+        "models": {
+            "gpt-4.1-mini": [
+                {"name": name, "base_url": f"http://127.0.0.1:{server.server_port}/v1", "api_key": "stub"}
+                for name, server in stubs.items()
+            ]
+        },
+    }
+    config["models"]["gpt-4.1-mini"][2]["model"] = "local-deployment"
+    endpoints_path = tmp_path / "endpoints.json"
+    endpoints_path.write_text(json.dumps(config), encoding="utf-8")
+
+    results_path = run_experiment(
+        CASE,
+        SUITE,
+        runs_dir=str(tmp_path),
+        dry_run=False,
+        use_judge=False,
+        endpoints=EndpointPools.load(str(endpoints_path)),
+    )
+    run = load_run(results_path)
+    assert all(s.output_text == "I learned a lot. How do you plan?" for s in run.samples)
+
+    pool = run.metadata.endpoints["gpt-4.1-mini"]
+    by_name = {e["name"]: e for e in pool["endpoints"]}
+    assert by_name["broken"]["errors"] == by_name["broken"]["requests"] == 2
+    assert by_name["broken"]["breaker"] == "open" and by_name["broken"]["breaker_opened"] == 1
+    assert by_name["a"]["requests"] + by_name["b"]["requests"] == 9
+    assert by_name["a"]["failovers"] + by_name["b"]["failovers"] == 2
+    assert by_name["a"]["output_tokens"] == 100 * by_name["a"]["requests"]
+    assert set(stubs["b"].models) == {"local-deployment"}
+
+
+class FlakyCompletions:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = 0
+
+    def create(self, **kwargs):
+        self.calls += 1
+        if self.fail:
+            raise APIConnectionError(request=None)
+        return SimpleNamespace(usage=None, model=kwargs["model"])
+
+
+def _pool(completions, routing="least_loaded", weights=None, breaker=None, retries=0, backoff=0.01):
+    weights = weights or [1.0] * len(completions)
+    endpoints = [Endpoint(name=f"e{i}", weight=w) for i, w in enumerate(weights)]
+    clients = [SimpleNamespace(chat=SimpleNamespace(completions=c)) for c in completions]
+    return EndpointPool(
+        "gpt-4.1-mini", endpoints, routing=routing, breaker=breaker, clients=clients, retries=retries, backoff=backoff
+    )
+
+
+def test_weighted_routing_follows_the_weights():
+    completions = [FlakyCompletions(), FlakyCompletions()]
+    pool = _pool(completions, routing="weighted", weights=[3, 1])
+    for _ in range(40):
+        pool.chat.completions.create(model="gpt-4.1-mini", messages=[])
+    assert [c.calls for c in completions] == [30, 10]
+
+
+def test_breaker_half_opens_after_the_cooldown():
+    flaky, steady = FlakyCompletions(fail=True), FlakyCompletions()
+    pool = _pool([flaky, steady], breaker={"min_requests": 2, "cooldown": 0.05})
+    for _ in range(6):
+        pool.create(model="gpt-4.1-mini", messages=[])
+    assert flaky.calls == 2
+    assert Counter(e["breaker"] for e in pool.summary()["endpoints"]) == {"open": 1, "closed": 1}
+
+    flaky.fail = False
+    time.sleep(0.06)
+    pool.create(model="gpt-4.1-mini", messages=[])
+    assert flaky.calls == 3
+    assert all(e["breaker"] == "closed" for e in pool.summary()["endpoints"])
+
+    steady.fail = flaky.fail = True
+    with pytest.raises(APIConnectionError):
+        pool.create(model="gpt-4.1-mini", messages=[])
+
+
+def test_breaker_is_decided_by_its_trial_call_only():
+    breaker = CircuitBreaker(min_requests=2, cooldown=0.05)
+    breaker.record(False)
+    breaker.record(False)
+    assert breaker.state == "open" and breaker.opened == 1
+    # a straggler that started before the breaker opened
+    breaker.record(True)
+    assert breaker.state == "open"
+
+    time.sleep(0.06)
+    assert breaker.begin()
+    assert not breaker.available() and not breaker.begin()
+    breaker.record(False, trial=True)
+    assert breaker.state == "open" and breaker.opened == 2
+
+    time.sleep(0.06)
+    assert breaker.begin()
+    breaker.record(True, trial=True)
+    assert breaker.state == "closed"
+
+
+class RateLimitedCompletions:
+    def __init__(self, failures, retry_after):
+        self.failures = failures
+        self.retry_after = retry_after
+        self.calls = 0
+
+    def create(self, **kwargs):
+        self.calls += 1
+        if self.calls <= self.failures:
+            response = SimpleNamespace(request=None, status_code=429, headers={"retry-after": self.retry_after})
+            raise RateLimitError("slow down", response=response, body=None)
+        return SimpleNamespace(usage=None, model=kwargs["model"])
+
+
+def test_pool_backs_off_once_every_endpoint_failed():
+    completions = RateLimitedCompletions(failures=2, retry_after="0.1")
+    pool = _pool([completions], retries=2)
+    started = time.monotonic()
+    pool.create(model="gpt-4.1-mini", messages=[])
+    assert completions.calls == 3
+    # both waits honoured the server's Retry-After over the 10ms backoff
+    assert time.monotonic() - started >= 0.2
+
+    completions = RateLimitedCompletions(failures=3, retry_after="0")
+    with pytest.raises(RateLimitError):
+        _pool([completions], retries=2).create(model="gpt-4.1-mini", messages=[])
+    assert completions.calls == 3
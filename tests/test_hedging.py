@@ -0,0 +1,125 @@
+import itertools
+import json
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from qolab.evaluation.streaming import ConstraintMonitor
+from qolab.generation.client import LLMClient, OpenAIClientConfig
+from qolab.generation.hedging import Deadline, RequestPolicy
+from qolab.logging.run_store import load_run
+from qolab.pipeline import JUDGE_DEADLINE_SKIP, run_experiment
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+CASE = str(REPO_ROOT / "configs/cases/linkedin_b2b_saas.json")
+SUITE = str(REPO_ROOT / "configs/prompt_suites/linkedin_v1.json")
+RUBRIC = str(REPO_ROOT / "configs/rubrics/judge_rubric_v1.json")
+
+
+class SlowCompletions:
+    # every 10th request stalls; the rest answer quickly
+    def __init__(self, fast=0.005, slow=0.3):
+        self.fast, self.slow = fast, slow
+        self.counter = itertools.count()
+        self.lock = threading.Lock()
+        self.timeouts = []
+
+    def create(self, **kwargs):
+        with self.lock:
+            n = next(self.counter)
+            self.timeouts.append(kwargs.get("timeout"))
+        time.sleep(self.slow if n % 10 == 9 else self.fast)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="I learned a lot. How do you plan?"))],
+            usage=SimpleNamespace(prompt_tokens=300, completion_tokens=100),
+        )
+
+
+def _client(hedge):
+    client = LLMClient(OpenAIClientConfig(api_key="test-key", timeout=5.0, hedge=hedge))
+    client.policy.min_samples = 5
+    completions = SlowCompletions()
+    client.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return client, completions
+
+
+def _worst_call(client, n):
+    worst = 0.0
+    for i in range(n):
+        started = time.perf_counter()
+        client.generate("system", f"user {i}", 0.2)
+        worst = max(worst, time.perf_counter() - started)
+    return worst
+
+
+def test_hedging_cuts_the_tail_of_slow_responses():
+    plain, completions = _client(hedge=False)
+    assert _worst_call(plain, n=10) >= 0.3
+    assert set(completions.timeouts) == {5.0}
+
+    hedged, _ = _client(hedge=True)
+    assert _worst_call(hedged, n=30) < 0.15
+    sent, won = hedged.policy.counters()
+    assert sent >= 2 and won >= 2
+
+
+class SlowStreams(SlowCompletions):
+    def create(self, **kwargs):
+        reply = super().create(**kwargs).choices[0].message.content
+        return [SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=w))], usage=None) for w in reply]
+
+
+def test_streamed_generations_are_hedged_too():
+    client = LLMClient(OpenAIClientConfig(api_key="test-key", timeout=5.0, hedge=True))
+    client.policy.min_samples = 5
+    completions = SlowStreams()
+    client.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    worst = 0.0
+    for i in range(30):
+        started = time.perf_counter()
+        result = client.generate_stream("system", f"user {i}", 0.2, ConstraintMonitor(max_words=150))
+        worst = max(worst, time.perf_counter() - started)
+        assert result.text == "I learned a lot. How do you plan?" and result.abort_reason is None
+    assert worst < 0.15
+    assert client.policy.latency.count == 30
+    sent, won = client.policy.counters()
+    assert sent >= 2 and won >= 2
+    assert set(completions.timeouts) == {5.0}
+
+
+def test_deadline_clamps_timeouts():
+    policy = RequestPolicy(timeout=30.0)
+    seen = []
+    policy.call(seen.append, Deadline(3600))
+    policy.call(seen.append, Deadline(0))
+    assert seen == [30.0, 1.0]
+
+
+def test_run_deadline_skips_judging_and_reports_latency(tmp_path):
+    client, _ = _client(hedge=False)
+    judge_calls = []
+
+    def create(**kwargs):
+        judge_calls.append(kwargs)
+        reply = json.dumps({"scores": {"clarity_structure": 4}, "checks": {}, "rationales": {}})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=reply))], usage=None)
+
+    results_path = run_experiment(
+        CASE,
+        SUITE,
+        runs_dir=str(tmp_path),
+        dry_run=False,
+        use_judge=True,
+        rubric_path=RUBRIC,
+        llm_client=client,
+        judge_client=SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create))),
+        deadline=0,
+    )
+    run = load_run(results_path)
+    assert not judge_calls
+    assert all(s.scores.judge["judge_error"] == JUDGE_DEADLINE_SKIP for s in run.samples)
+    latency = run.metadata.latency
+    assert latency["deadline"] == {"seconds": 0, "reached": True, "judge_skipped": 9}
+    assert latency["generation"]["count"] == 9
+    assert latency["generation"]["max"] >= latency["generation"]["p50"] > 0
@@ -0,0 +1,43 @@
+from pathlib import Path
+
+from qolab.logging.metrics import MetricsFileWriter, SweepMetrics, render_openmetrics
+from qolab.pipeline import run_experiment
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+CASE = str(REPO_ROOT / "configs/cases/linkedin_b2b_saas.json")
+SUITE = str(REPO_ROOT / "configs/prompt_suites/linkedin_v1.json")
+
+
+def test_rates_and_eta():
+    metrics = SweepMetrics()
+    metrics.add_cells(4)
+    metrics.request_started("generation")
+    metrics.request_finished("generation", error=True)
+    metrics.retry("generation")
+    metrics.request_started("generation")
+    metrics.request_finished("generation")
+    metrics.cache_lookup(True)
+    metrics.cache_lookup(False)
+    metrics.cell_done()
+    snap = metrics.snapshot()
+    assert snap["in_flight"] == 0
+    assert snap["error_rate"] == snap["retry_rate"] == 0.5
+    assert snap["cache_hit_rate"] == 0.5
+    assert snap["eta_seconds"] is not None and snap["eta_seconds"] >= 0
+
+    text = render_openmetrics(metrics)
+    assert 'qolab_request_retries_total{kind="generation"} 1' in text
+    assert "qolab_cells 4" in text
+
+
+def test_run_writes_metrics_file(tmp_path, monkeypatch):
+    monkeypatch.chdir(REPO_ROOT)
+    metrics = SweepMetrics()
+    target = tmp_path / "qolab.prom"
+    with MetricsFileWriter(metrics, target, interval=0.05):
+        run_experiment(CASE, SUITE, str(tmp_path), dry_run=True, use_judge=False, repeats=2, metrics=metrics)
+    text = target.read_text(encoding="utf-8")
+    assert "qolab_cells 18" in text
+    assert "qolab_cells_completed_total 18" in text
+    assert text.endswith("# EOF\n")
@@ -0,0 +1,61 @@
+import json
+import pstats
+import shutil
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from qolab.cli import main
+from qolab.generation.client import LLMClient, OpenAIClientConfig
+from qolab.pipeline import run_experiment
+from qolab.profiling import SamplingProfiler, stage_for
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+CASE = str(REPO_ROOT / "configs/cases/linkedin_b2b_saas.json")
+SUITE = str(REPO_ROOT / "configs/prompt_suites/linkedin_v1.json")
+
+
+def test_stage_rules_prefer_the_named_function():
+    judge = str(REPO_ROOT / "src/qolab/evaluation/judge.py")
+    assert stage_for(judge, "parse_judge_response") == "judge parsing"
+    assert stage_for(judge, "call_judge") == "judge wait"
+    assert stage_for(str(REPO_ROOT / "src/qolab/evaluation/heuristics.py"), "score_clarity") == "heuristics"
+    assert stage_for("/usr/lib/python3/json/decoder.py", "decode") is None
+
+
+def test_rescore_writes_a_cprofile_next_to_the_run(tmp_path):
+    results = tmp_path / "results.json"
+    shutil.copy(REPO_ROOT / "runs/hero_linkedin_b2b_saas/results.json", results)
+    main(["rescore", "--run", str(results), "--profile", "cprofile"])
+
+    stats = pstats.Stats(str(tmp_path / "profile.prof"))
+    assert any(name == "score_heuristics" for _, _, name in stats.stats)
+    report = json.loads((tmp_path / "profile.json").read_text(encoding="utf-8"))
+    assert report["mode"] == "cprofile"
+    assert report["stages"]["heuristics"] > 0
+    assert report["stages"]["serialisation"] > 0
+    assert len(report["top"]) > 0
+
+
+def test_sampling_attributes_waiting_to_generation(tmp_path):
+    def create(**kwargs):
+        time.sleep(0.02)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="I learned a lot. How do you plan?"))],
+            usage=None,
+        )
+
+    client = LLMClient(OpenAIClientConfig(api_key="test-key"))
+    client.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    profiler = SamplingProfiler(interval=0.001)
+    profiler.start()
+    try:
+        run_experiment(CASE, SUITE, runs_dir=str(tmp_path), dry_run=False, use_judge=False, llm_client=client)
+    finally:
+        profiler.stop()
+    report = profiler.save(tmp_path)
+
+    assert max(report.stages, key=report.stages.__getitem__) == "generation wait"
+    assert report.stages["generation wait"] >= 0.1
+    folded = (tmp_path / "profile.folded").read_text(encoding="utf-8")
+    assert "request (qolab/generation/client.py);create (test_profiling.py)" in folded
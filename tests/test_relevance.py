@@ -0,0 +1,89 @@
+import io
+import json
+import shutil
+from pathlib import Path
+
+import pytest
+
+from qolab.logging.run_store import load_run
+
+np = pytest.importorskip("numpy")
+
+from qolab.evaluation.relevance import (  # noqa: E402
+    RelevanceIdf,
+    add_relevance,
+    relevance_scores,
+    relevance_similarities,
+)
+from qolab.pipeline import rescore_run  # noqa: E402
+from qolab.scoring import fit_input_idf, score_stream  # noqa: E402
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+HERO_RUN = REPO_ROOT / "runs/hero_linkedin_b2b_saas/results.json"
+CASE = REPO_ROOT / "configs/cases/linkedin_b2b_saas.json"
+
+QUERY = "Write a LinkedIn post about a revenue forecasting platform.\nVP Sales and RevOps leaders."
+ON_TOPIC = [
+    "Forecasting revenue used to take our sales team days. Now RevOps leaders see the forecast in one place.",
+    "Our VP Sales asked why the forecast kept slipping. The platform showed which deals were stale.",
+]
+OFF_TOPIC = [
+    "Mix flour, sugar, eggs and mashed bananas, then bake the bread for an hour.",
+    "The hiking trail climbs steeply through pine forest before reaching the lake.",
+]
+
+
+def test_on_topic_outputs_score_higher():
+    similarities = relevance_similarities(QUERY, ON_TOPIC + OFF_TOPIC)
+    assert min(similarities[:2]) > 3 * max(similarities[2:])
+    scores = relevance_scores(QUERY, ON_TOPIC + OFF_TOPIC)
+    assert all(0 <= s <= 5 for s in scores)
+    assert min(scores[:2]) > max(scores[2:])
+    assert relevance_similarities(QUERY, []).shape == (0,)
+
+
+def test_add_relevance_keeps_the_total_in_step():
+    heuristics = {"length_fit": 5, "clarity": 4, "total_heuristics": 9}
+    once = add_relevance(heuristics, 3)
+    assert list(once) == ["length_fit", "clarity", "relevance", "total_heuristics"]
+    assert once["total_heuristics"] == 12
+    assert add_relevance(once, 1)["total_heuristics"] == 10
+
+
+def test_rescore_adds_relevance_when_the_case_opts_in(tmp_path):
+    results = tmp_path / "results.json"
+    shutil.copy(HERO_RUN, results)
+    case = json.loads(CASE.read_text(encoding="utf-8"))
+    case["constraints"]["relevance"] = True
+    case["keywords_file"] = str(REPO_ROOT / case["keywords_file"])
+    case_path = tmp_path / "case.json"
+    case_path.write_text(json.dumps(case), encoding="utf-8")
+
+    run = load_run(rescore_run(results, str(case_path)))
+    heuristics = [s.scores.heuristics for s in run.samples]
+    assert all(list(h)[-2:] == ["relevance", "total_heuristics"] for h in heuristics)
+    assert all(h["total_heuristics"] == sum(v for k, v in h.items() if k != "total_heuristics") for h in heuristics)
+    assert max(h["relevance"] for h in heuristics) >= 3
+
+
+def test_scores_do_not_depend_on_the_chunk_size(tmp_path):
+    lines = [json.dumps({"id": i, "output_text": text}) + "\n" for i, text in enumerate((ON_TOPIC + OFF_TOPIC) * 5)]
+    idf = fit_input_idf(lines)
+    idf.save(tmp_path / "idf")
+    loaded = RelevanceIdf.load(tmp_path / "idf")
+    assert loaded.docs == idf.docs == 20
+    assert np.array_equal(loaded.df, idf.df)
+
+    constraints = {"min_words": 10, "max_words": 150, "relevance": True}
+    outputs = []
+    for chunk_size, fitted in ((2, idf), (16, loaded)):
+        out = io.StringIO()
+        score_stream(
+            lines, out, constraints, [], workers=1, chunk_size=chunk_size, relevance_query=QUERY, relevance_idf=fitted
+        )
+        outputs.append(out.getvalue())
+    assert outputs[0] == outputs[1]
+    relevance = [json.loads(line)["scores"]["heuristics"]["relevance"] for line in outputs[0].splitlines()]
+    assert min(relevance[:2]) > max(relevance[2:4])
+    with pytest.raises(ValueError, match="relevance_idf"):
+        score_stream(lines, io.StringIO(), constraints, [], workers=1, relevance_query=QUERY)
@@ -0,0 +1,65 @@
+import shutil
+from pathlib import Path
+
+from qolab.logging import run_store
+from qolab.logging.run_store import load_run, write_run
+from qolab.report import (
+    SectionCache,
+    load_stats,
+    render_comparison,
+    render_summary,
+    stats_from_results,
+    stats_path_for,
+)
+
+
+HERO_DIR = Path(__file__).resolve().parents[1] / "runs" / "hero_linkedin_b2b_saas"
+
+
+def _copy_hero(tmp_path, name="hero"):
+    run_dir = tmp_path / name
+    run_dir.mkdir()
+    shutil.copy(HERO_DIR / "results.json", run_dir / "results.json")
+    return run_dir / "results.json"
+
+
+def test_summary_matches_committed_render_without_full_load(tmp_path, monkeypatch):
+    results = _copy_hero(tmp_path)
+
+    def _no_full_load(*args, **kwargs):
+        raise AssertionError("report should not validate the full run")
+
+    monkeypatch.setattr(run_store, "load_run", _no_full_load)
+    summary = render_summary(results)
+    assert summary.read_text(encoding="utf-8") == (HERO_DIR / "summary.md").read_text(encoding="utf-8")
+    assert stats_path_for(results).exists()
+
+
+def test_unchanged_sections_are_reused(tmp_path):
+    results = _copy_hero(tmp_path)
+    render_summary(results)
+    run = load_run(results)
+    run.metadata.run_id = "renamed"
+    stats = stats_from_results(run)
+    render_summary(results, stats=stats)
+    cache = SectionCache(results.with_name(".summary.md.sections.json"))
+    for name in ("metadata", "overview", "top"):
+        cache.section(name, stats["digests"][name], lambda: ["not used"])
+    assert cache.reused == 3
+    assert load_stats(results)["digests"]["overview"] == stats["digests"]["overview"]
+    assert "# Run Summary: renamed" in results.with_name("summary.md").read_text(encoding="utf-8")
+
+
+def test_compare_reports_deltas_per_variant_and_temperature(tmp_path):
+    base = _copy_hero(tmp_path, "base")
+    other_run = load_run(base)
+    for s in other_run.samples:
+        s.scores.final_score -= 1.0
+    other_dir = tmp_path / "other"
+    other_dir.mkdir()
+    write_run(other_run, other_dir / "results.json")
+
+    out = render_comparison([base, other_dir], tmp_path / "comparison.md")
+    text = out.read_text(encoding="utf-8")
+    assert "| Objection-handling | 1.0 | 27.40 | 26.40 (-1.00) |" in text
+    assert "| first_person_present | 100% | 100% |" in text
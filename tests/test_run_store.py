@@ -0,0 +1,92 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from qolab.logging.run_store import (
+    COMPACT_FORMAT,
+    is_compact_run,
+    load_run,
+    save_run,
+    write_run,
+)
+
+
+HERO_RESULTS = Path(__file__).resolve().parents[1] / "runs" / "hero_linkedin_b2b_saas" / "results.json"
+
+
+def _hero():
+    run = load_run(HERO_RESULTS)
+    for s in run.samples:
+        s.scores.judge = {"total_judge": 20, "raw_judge": '{"total_judge": 20}'}
+    return run
+
+
+def test_compact_gzip_round_trip(tmp_path):
+    run = _hero()
+    path = save_run(run, tmp_path, compact=True, compression="gzip")
+    assert path.name == "results.json.gz"
+    assert is_compact_run(path)
+    assert load_run(path) == run
+
+
+def test_compact_deduplicates_prompts_and_raw_responses(tmp_path):
+    run = _hero()
+    path = write_run(run, tmp_path / "results.json", compact=True)
+    data = json.loads(path.read_text(encoding="utf-8"))
+    assert data["format"] == COMPACT_FORMAT
+    # 3 prompts (one per variant) + 9 outputs + 1 shared raw judge response
+    assert len(data["blobs"]) == 3 + 9 + 1
+    assert "full_prompt" not in data["samples"][0]
+    assert data["samples"][0]["scores"]["judge"]["raw_judge_ref"] in data["blobs"]
+    assert path.stat().st_size < HERO_RESULTS.stat().st_size
+
+
+def test_legacy_results_still_load():
+    assert not is_compact_run(HERO_RESULTS)
+    assert len(load_run(HERO_RESULTS).samples) == 9
+
+
+def test_zstd_round_trip(tmp_path):
+    pytest.importorskip("zstandard")
+    run = _hero()
+    path = save_run(run, tmp_path, compression="zstd")
+    assert load_run(path) == run
+
+
+def test_scores_are_compact_and_convert_back_losslessly():
+    import pickle
+
+    from qolab.logging.score_map import ScoreMap
+
+    raw = json.loads(HERO_RESULTS.read_text(encoding="utf-8"))["samples"]
+    run = load_run(HERO_RESULTS)
+    first, second = run.samples[0].scores, run.samples[1].scores
+    assert isinstance(first.heuristics, ScoreMap) and isinstance(first.judge["scores"], ScoreMap)
+    # one key layout per key set, shared by every sample
+    assert first.judge["scores"]._layout is second.judge["scores"]._layout
+    for sample, original in zip(run.samples, raw):
+        dumped = sample.model_dump()["scores"]
+        assert dumped == original["scores"]
+        assert list(dumped["judge"]) == list(original["scores"]["judge"])
+        assert sample.scores.heuristics == original["scores"]["heuristics"]
+
+    first.judge = {"total_judge": 3, "scores": {"tone_voice": 3}}
+    assert isinstance(first.judge, ScoreMap) and first.judge.get("missing") is None
+    assert pickle.loads(pickle.dumps(first)) == first
+
+
+@pytest.mark.parametrize("fast", [False, True])
+def test_json_paths_write_non_finite_floats_alike(tmp_path, monkeypatch, fast):
+    from qolab.utils import io
+
+    if fast:
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(io, "_orjson_module", None)
+    data = {"score": float("nan"), "bounds": [float("-inf"), 1.5], "nested": {"x": float("inf")}}
+    for compact in (False, True):
+        io.dump_json(tmp_path / "data.json", data, compact=compact)
+        assert io.load_json(tmp_path / "data.json") == {"score": None, "bounds": [None, 1.5], "nested": {"x": None}}
+    # NaN literals from older stdlib-written files still load
+    assert io.loads_json(b'{"score": NaN}')["score"] != io.loads_json(b'{"score": NaN}')["score"]
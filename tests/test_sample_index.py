@@ -0,0 +1,66 @@
+from pathlib import Path
+
+import pytest
+
+from qolab.logging.run_store import load_run, write_run
+from qolab.logging.sample_index import SampleArchive, index_path_for, iter_sample_fields
+
+
+HERO_RESULTS = Path(__file__).resolve().parents[1] / "runs" / "hero_linkedin_b2b_saas" / "results.json"
+
+
+def _tricky_run():
+    run = load_run(HERO_RESULTS)
+    run.samples[0].output_text = 'He said "}]{[" then \\ left\n{"final_score": 99}'
+    return run
+
+
+def test_projection_matches_full_load(tmp_path):
+    run = _tricky_run()
+    path = write_run(run, tmp_path / "results.json")
+    rows = list(iter_sample_fields(path, ["variant_name", "scores.final_score", "missing.field"]))
+    assert [r["variant_name"] for r in rows] == [s.variant_name for s in run.samples]
+    assert [r["scores.final_score"] for r in rows] == [s.scores.final_score for s in run.samples]
+    assert all(r["missing.field"] is None for r in rows)
+
+
+def test_index_is_reused_and_invalidated(tmp_path):
+    run = _tricky_run()
+    path = write_run(run, tmp_path / "results.json")
+    with SampleArchive(path) as archive:
+        assert len(archive) == 9
+        list(archive.project(["scores.final_score"]))
+    idx = index_path_for(path)
+    assert idx.exists()
+    with SampleArchive(path) as archive:
+        # both sample spans and the projected field's value spans come from the index
+        assert isinstance(archive._spans, memoryview)
+        assert isinstance(archive._fields["scores.final_score"], memoryview)
+        assert archive.sample(0)["output_text"] == run.samples[0].output_text
+
+    run.samples.pop()
+    write_run(run, path, compact=True)
+    with SampleArchive(path) as archive:
+        assert len(archive) == 8
+        assert archive.sample(0)["output_text"] == run.samples[0].output_text
+        rows = list(archive.project(["output_text", "full_prompt"]))
+    assert rows[1]["output_text"] == run.samples[1].output_text
+    assert rows[1]["full_prompt"] == run.samples[1].full_prompt
+
+
+def test_compressed_runs_fall_back_to_full_parse(tmp_path):
+    run = _tricky_run()
+    path = write_run(run, tmp_path / "results.json.gz", compact=True)
+    rows = list(iter_sample_fields(path, ["temperature"]))
+    assert [r["temperature"] for r in rows] == [s.temperature for s in run.samples]
+
+
+def test_empty_and_truncated_files_are_reported(tmp_path):
+    path = tmp_path / "results.json"
+    path.write_bytes(b"")
+    with pytest.raises(ValueError, match="is empty"):
+        SampleArchive(path)
+    data = write_run(_tricky_run(), path).read_bytes()
+    path.write_bytes(data[: len(data) // 2])
+    with pytest.raises(ValueError, match="truncated"):
+        SampleArchive(path)
@@ -0,0 +1,55 @@
+import io
+import json
+
+from qolab.pipeline import score_heuristics
+from qolab.scoring import score_stream
+
+CONSTRAINTS = {"min_words": 5, "max_words": 40, "banned_phrases": ["game-changer"], "max_emojis": 0}
+KEYWORDS = ["onboarding", "pricing"]
+TEXTS = [
+    "I learned a lot about onboarding this week. What did you learn?",
+    "This game-changer fixes pricing!!! Book a demo.",
+    "Short.",
+]
+
+
+def _input(n):
+    lines = [json.dumps({"id": f"r{i}", "output_text": TEXTS[i % 3]}) + "\n" for i in range(n)]
+    lines[3] = "not json\n"
+    lines[5] = "\n"
+    return lines
+
+
+def test_score_stream_matches_pipeline_heuristics_in_input_order():
+    out = io.StringIO()
+    counts = score_stream(_input(50), out, CONSTRAINTS, KEYWORDS, workers=1, chunk_size=7)
+    rows = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert counts == {"records": 49, "errors": 1}
+    assert [r["line"] for r in rows] == [i + 1 for i in range(50) if i != 5]
+    assert rows[3]["error"].startswith("JSONDecodeError")
+    first = rows[0]
+    assert first["id"] == "r0"
+    assert first["scores"]["heuristics"] == score_heuristics(TEXTS[0], CONSTRAINTS, KEYWORDS)
+    assert first["scores"]["final_score"] == first["scores"]["heuristics"]["total_heuristics"]
+
+
+def test_score_stream_process_pool_and_judge():
+    serial, parallel = io.StringIO(), io.StringIO()
+    score_stream(_input(200), serial, CONSTRAINTS, KEYWORDS, workers=1, chunk_size=16)
+    score_stream(_input(200), parallel, CONSTRAINTS, KEYWORDS, workers=2, chunk_size=16)
+    assert parallel.getvalue() == serial.getvalue()
+
+    unordered = io.StringIO()
+    score_stream(_input(200), unordered, CONSTRAINTS, KEYWORDS, workers=2, chunk_size=16, ordered=False)
+    assert sorted(unordered.getvalue().splitlines()) == sorted(serial.getvalue().splitlines())
+
+    judged = io.StringIO()
+
+    def judge(text):
+        return {"scores": {"tone_voice": 4}, "total_judge": len(text) % 5, "judge_error": None}
+
+    score_stream(_input(20), judged, CONSTRAINTS, KEYWORDS, workers=1, chunk_size=4, judge=judge)
+    row = json.loads(judged.getvalue().splitlines()[0])
+    heuristics = row["scores"]["heuristics"]["total_heuristics"]
+    assert row["scores"]["judge"]["total_judge"] == len(TEXTS[0]) % 5
+    assert row["scores"]["final_score"] == 0.6 * (len(TEXTS[0]) % 5) + 0.4 * heuristics
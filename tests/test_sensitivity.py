@@ -0,0 +1,55 @@
+import shutil
+from pathlib import Path
+
+import pytest
+
+from qolab.logging.run_store import load_run, write_run
+
+np = pytest.importorskip("numpy")
+
+from qolab.sensitivity import analyze, render_sensitivity  # noqa: E402
+
+HERO = Path(__file__).resolve().parents[1] / "runs" / "hero_linkedin_b2b_saas" / "results.json"
+
+
+def _runs(tmp_path, n):
+    paths = []
+    for i in range(n):
+        run_dir = tmp_path / f"run{i}"
+        run_dir.mkdir()
+        shutil.copy(HERO, run_dir / "results.json")
+        paths.append(run_dir)
+    return paths
+
+
+def test_reference_draw_reproduces_final_scores(tmp_path):
+    (run,) = _runs(tmp_path, 1)
+    samples = load_run(run / "results.json").samples
+    report = analyze([run], draws=200, spread=0.5)
+    for row in report["dimensions"]["variant_name"]["groups"]:
+        finals = [s.scores.final_score for s in samples if s.variant_name == row["group"]]
+        assert row["score"] == pytest.approx(sum(finals) / len(finals))
+    ranked = report["dimensions"]["temperature"]["groups"]
+    assert [row["rank"] for row in ranked] == list(range(1, len(ranked) + 1))
+    assert all(row["rank_p5"] <= row["rank"] <= row["rank_p95"] for row in ranked)
+    assert "## Variants" in render_sensitivity(report)
+
+
+def test_no_spread_means_stable_rankings_and_case_weights_apply(tmp_path):
+    first, second = _runs(tmp_path, 2)
+    report = analyze([first, second], draws=50, spread=0.0)
+    variants = report["dimensions"]["variant_name"]
+    assert variants["tau_mean"] == pytest.approx(1.0)
+    assert variants["unchanged"] == 1.0
+    assert variants["groups"][0]["top1"] == 1.0
+    assert report["samples"] == 2 * len(load_run(first / "results.json").samples)
+
+    # a case that only cares about the judge ranks variants by judge score alone
+    run = load_run(second / "results.json")
+    run.metadata.case["weights"] = {"judge": 1.0}
+    write_run(run, second / "results.json")
+    judge_only = analyze([second], draws=10, spread=1.0)
+    best = judge_only["dimensions"]["variant_name"]["groups"][0]
+    judged = [s for s in run.samples if s.variant_name == best["group"]]
+    assert best["score"] == pytest.approx(sum(s.scores.judge["total_judge"] for s in judged) / len(judged))
+    assert judge_only["dimensions"]["variant_name"]["unchanged"] == 1.0
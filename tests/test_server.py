@@ -0,0 +1,153 @@
+import json
+import os
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+import pytest
+
+import qolab.server
+from qolab.generation.client import LLMClient, OpenAIClientConfig
+from qolab.server import EvaluationService, make_server, submit_job
+from qolab.utils.cache import FileCache, ResponseCache
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+def _start(concurrency=2):
+    server = make_server("127.0.0.1", 0, concurrency=concurrency)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}"
+
+
+def test_file_cache_invalidates_on_change(tmp_path):
+    path = tmp_path / "case.json"
+    path.write_text(json.dumps({"name": "a"}), encoding="utf-8")
+    cache = FileCache()
+    assert cache.load_json(path) == {"name": "a"}
+
+    path.write_text(json.dumps({"name": "bb"}), encoding="utf-8")
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert cache.load_json(path) == {"name": "bb"}
+    assert len(cache) == 1
+
+
+def test_response_cache_only_replays_greedy_generations():
+    calls = []
+
+    def create(**kwargs):
+        calls.append(kwargs["temperature"])
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=f"draw {len(calls)}"))], usage=None)
+
+    client = LLMClient(OpenAIClientConfig(api_key="test-key"), cache=ResponseCache())
+    client.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    sampled = [client.generate("system", "user", 0.7) for _ in range(2)]
+    greedy = [client.generate("system", "user", 0.0) for _ in range(2)]
+    assert sampled == ["draw 1", "draw 2"]
+    assert greedy == ["draw 3", "draw 3"]
+    assert calls == [0.7, 0.7, 0.0]
+
+
+def test_serve_processes_dry_run_and_report_jobs(tmp_path, monkeypatch):
+    monkeypatch.chdir(REPO_ROOT)
+    server, url = _start()
+    try:
+        params = {
+            "case": "configs/cases/linkedin_b2b_saas.json",
+            "suite": "configs/prompt_suites/linkedin_v1.json",
+            "runs_dir": str(tmp_path),
+            "dry_run": True,
+        }
+        first = submit_job(url, "run", params)
+        second = submit_job(url, "run", params)
+        assert first["status"] == "done", first["error"]
+        assert second["status"] == "done", second["error"]
+        # same case in the same second must not overwrite the first run
+        assert first["result"]["results"] != second["result"]["results"]
+        assert Path(first["result"]["summary"]).exists()
+
+        report = submit_job(
+            url,
+            "report",
+            {"run": first["result"]["results"], "output": str(tmp_path / "again.md")},
+        )
+        assert report["status"] == "done"
+        assert (tmp_path / "again.md").read_text(encoding="utf-8").startswith("# Run Summary")
+
+        with urlopen(f"{url}/health") as resp:
+            health = json.loads(resp.read())
+        assert health["jobs"]["done"] == 3
+        assert health["config_cache_entries"] >= 3
+
+        with urlopen(f"{url}/metrics") as resp:
+            metrics = resp.read().decode("utf-8")
+        assert "qolab_cells_completed_total 18" in metrics
+        assert metrics.endswith("# EOF\n")
+    finally:
+        server.shutdown()
+        server.server_close()
+        server.service.shutdown()
+
+
+def test_run_jobs_forward_timeout_and_hedging(tmp_path, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    calls = []
+    monkeypatch.setattr(qolab.server, "run_experiment", lambda **kwargs: calls.append(kwargs) or tmp_path / "r.json")
+    monkeypatch.setattr(qolab.server, "render_summary_markdown", lambda path: path.with_name("summary.md"))
+    service = EvaluationService(concurrency=1)
+    try:
+        params = {"case": "c.json", "suite": "s.json", "request_timeout": 5, "hedge": True, "deadline": 60}
+        service._run(params)
+        service._run({**params, "hedge": False})
+    finally:
+        service.shutdown()
+    assert [(c["request_timeout"], c["hedge"], c["deadline"]) for c in calls] == [(5.0, True, 60.0), (5.0, False, 60.0)]
+    hedged, plain = (c["llm_client"] for c in calls)
+    assert hedged is not plain
+    assert (hedged.policy.timeout, hedged.policy.hedge, plain.policy.hedge) == (5.0, True, False)
+
+
+def test_serve_rejects_unknown_job_type():
+    server, url = _start()
+    try:
+        with pytest.raises(HTTPError) as excinfo:
+            submit_job(url, "explode", {})
+        assert excinfo.value.code == 400
+    finally:
+        server.shutdown()
+        server.server_close()
+        server.service.shutdown()
+
+
+def test_serve_rejects_bodies_that_are_not_objects():
+    server, url = _start()
+    try:
+        for body in (b"[1, 2]", b'"run"', b'{"type": "run", "params": [1]}'):
+            with pytest.raises(HTTPError) as excinfo:
+                urlopen(Request(f"{url}/jobs", data=body, method="POST"))
+            assert excinfo.value.code == 400
+            assert "JSON object" in json.loads(excinfo.value.read())["error"]
+    finally:
+        server.shutdown()
+        server.server_close()
+        server.service.shutdown()
+
+
+def test_finished_jobs_are_evicted(tmp_path, monkeypatch):
+    monkeypatch.setattr(qolab.server, "render_summary_markdown", lambda run, output=None: tmp_path / "summary.md")
+    service = EvaluationService(concurrency=1, max_finished_jobs=2)
+    try:
+        jobs = [service.wait(service.submit("report", {"run": f"r{i}.json"})) for i in range(4)]
+        assert [service.get(j.id) is not None for j in jobs] == [False, True, True, True]
+        service.job_ttl = 0
+        latest = service.wait(service.submit("report", {"run": "r4.json"}))
+        assert [j for j in jobs if service.get(j.id)] == []
+        assert service.get(latest.id) is latest
+    finally:
+        service.shutdown()
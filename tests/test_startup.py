@@ -0,0 +1,74 @@
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+HERO_RESULTS = REPO_ROOT / "runs" / "hero_linkedin_b2b_saas" / "results.json"
+
+# Generous by default so slow CI boxes do not flake; tighten locally with the env var.
+IMPORT_BUDGET_MS = float(os.environ.get("QOLAB_IMPORT_BUDGET_MS", "1000"))
+
+_IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def _run_importtime(args):
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "qolab", *args],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "OPENAI_API_KEY": ""},
+    )
+    assert proc.returncode == 0, proc.stderr
+    modules = {}
+    total_us = 0
+    for line in proc.stderr.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        if not match:
+            continue
+        cumulative, indent, name = int(match.group(2)), match.group(3), match.group(4)
+        modules[name] = cumulative
+        if len(indent) == 1:
+            total_us += cumulative
+    return modules, total_us / 1000.0
+
+
+def test_report_does_not_import_openai_and_fits_budget(tmp_path):
+    results = tmp_path / "results.json"
+    results.write_bytes(HERO_RESULTS.read_bytes())
+    modules, total_ms = _run_importtime(["report", "--run", str(results)])
+    assert not any(m == "openai" or m.startswith("openai.") for m in modules)
+    assert total_ms < IMPORT_BUDGET_MS
+
+
+def test_dry_run_does_not_import_openai_and_fits_budget(tmp_path):
+    modules, total_ms = _run_importtime(
+        [
+            "run",
+            "--case",
+            "configs/cases/linkedin_b2b_saas.json",
+            "--suite",
+            "configs/prompt_suites/linkedin_v1.json",
+            "--runs-dir",
+            str(tmp_path),
+            "--dry-run",
+        ]
+    )
+    assert not any(m == "openai" or m.startswith("openai.") for m in modules)
+    assert total_ms < IMPORT_BUDGET_MS
+
+
+def test_cli_module_import_is_lightweight():
+    proc = subprocess.run(
+        [sys.executable, "-c", "import sys, qolab.cli; print(sorted(sys.modules))"],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    assert proc.returncode == 0, proc.stderr
+    loaded = proc.stdout
+    for heavy in ("'openai'", "'pydantic'", "'rich'", "'qolab.pipeline'"):
+        assert heavy not in loaded
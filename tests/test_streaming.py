@@ -0,0 +1,116 @@
+import json
+from pathlib import Path
+from types import SimpleNamespace
+
+from qolab.evaluation.streaming import ConstraintMonitor, apply_abort_penalty, replay
+from qolab.generation.client import LLMClient, OpenAIClientConfig
+from qolab.pipeline import run_experiment
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+CASE = str(REPO_ROOT / "configs/cases/linkedin_b2b_saas.json")
+SUITE = str(REPO_ROOT / "configs/prompt_suites/linkedin_v1.json")
+
+
+def test_word_count_survives_words_split_across_chunks():
+    monitor = ConstraintMonitor(max_words=5, word_slack=0)
+    for chunk in ["Fore", "cast ", "reviews are", " hard", "er than", " they look"]:
+        reason = monitor.feed(chunk)
+    assert monitor.words == 7
+    assert reason == "max_words:5"
+
+
+def test_banned_phrase_split_across_chunks_aborts():
+    monitor = ConstraintMonitor(banned_phrases=["game-changer"])
+    assert monitor.feed("This is a total game") is None
+    assert monitor.feed("-chang") is None
+    assert monitor.feed("er for teams") == "banned_phrase:game-changer"
+
+
+def test_replay_truncates_at_abort_point():
+    text, reason = replay(ConstraintMonitor(max_words=3, word_slack=0), "one two three four five")
+    assert reason == "max_words:3"
+    assert text == "one two three four "
+    assert replay(ConstraintMonitor(max_words=10), "one two")[1] is None
+
+
+def test_abort_penalty_zeroes_violated_constraint():
+    heuristics = {"length_fit": 5, "brand_voice": 4, "clarity": 5, "total_heuristics": 14}
+    assert apply_abort_penalty(heuristics, "max_words:150")["total_heuristics"] == 9
+    banned = apply_abort_penalty(heuristics, "banned_phrase:game-changer")
+    assert banned["brand_voice"] == 0
+    assert banned["total_heuristics"] == 10
+
+
+class _StreamingCompletions:
+    def __init__(self, deltas):
+        self.deltas = deltas
+        self.sent = 0
+        self.closed = False
+        self.kwargs = None
+
+    def create(self, **kwargs):
+        self.kwargs = kwargs
+        return self
+
+    def __iter__(self):
+        for delta in self.deltas:
+            self.sent += 1
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=delta))], usage=None)
+
+    def close(self):
+        self.closed = True
+
+
+def test_stream_is_closed_on_violation():
+    client = LLMClient(OpenAIClientConfig(api_key="test-key"))
+    completions = _StreamingCompletions(["Our ", "revolutionary ", "platform ", "does ", "it ", "all"])
+    client.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    result = client.generate_stream(
+        "sys", "user", 0.7, ConstraintMonitor(banned_phrases=["revolutionary"]), max_tokens=120
+    )
+    assert result.abort_reason == "banned_phrase:revolutionary"
+    assert result.text == "Our revolutionary "
+    assert completions.sent == 2 and completions.closed
+    assert completions.kwargs["stream"] and completions.kwargs["max_tokens"] == 120
+
+
+def test_dry_run_stream_records_aborted_samples(tmp_path, monkeypatch):
+    monkeypatch.chdir(REPO_ROOT)
+    path = run_experiment(CASE, SUITE, str(tmp_path), dry_run=True, use_judge=False, stream=True)
+    samples = json.loads(path.read_text(encoding="utf-8"))["samples"]
+    aborted = [s for s in samples if s["abort_reason"]]
+    assert aborted and len(aborted) < len(samples)
+    for s in aborted:
+        assert s["abort_reason"].startswith(("max_words", "banned_phrase"))
+        assert s["scores"]["final_score"] == s["scores"]["heuristics"]["total_heuristics"]
+
+
+class _EchoCompletions:
+    # answers with the same text, streamed word by word or in one response
+    def __init__(self, text):
+        self.text = text
+
+    def create(self, **kwargs):
+        if not kwargs.get("stream"):
+            message = SimpleNamespace(content=self.text)
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+        return _StreamingCompletions(self.text.split(" ")[:1] + [" " + w for w in self.text.split(" ")[1:]])
+
+
+def test_output_slightly_over_max_words_scores_the_same_streamed(tmp_path, monkeypatch):
+    monkeypatch.chdir(REPO_ROOT)
+    # one word over the case's 150
+    text = " ".join(["Pipeline"] + ["reviews"] * 149 + ["matter?"])
+    scores = {}
+    for stream in (False, True):
+        client = LLMClient(OpenAIClientConfig(api_key="test-key"))
+        client.client = SimpleNamespace(chat=SimpleNamespace(completions=_EchoCompletions(text)))
+        path = run_experiment(
+            CASE, SUITE, str(tmp_path / str(stream)), dry_run=False, use_judge=False, llm_client=client, stream=stream
+        )
+        samples = json.loads(path.read_text(encoding="utf-8"))["samples"]
+        assert not any(s["abort_reason"] for s in samples)
+        scores[stream] = [s["scores"] for s in samples]
+    assert scores[True] == scores[False]
+    assert scores[True][0]["heuristics"]["length_fit"] == 4
@@ -0,0 +1,75 @@
+import json
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from qolab.evaluation.surrogate import SurrogateJudge, collect_training_samples, train_surrogate, triage  # noqa: E402
+from qolab.pipeline import run_experiment  # noqa: E402
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+CASE = str(REPO_ROOT / "configs/cases/linkedin_b2b_saas.json")
+SUITE = str(REPO_ROOT / "configs/prompt_suites/linkedin_v1.json")
+CATEGORIES = ["instruction_following", "clarity_structure", "tone_voice", "usefulness", "conciseness", "non_repetition"]
+
+
+class _FakeJudge:
+    # scores salesy posts low, like the real rubric does
+    def __init__(self):
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, messages, **kwargs):
+        self.calls += 1
+        post = messages[-1]["content"].split("CANDIDATE OUTPUT:")[1].split("When scoring")[0].lower()
+        score = 1 if ("demo" in post or "!" in post) else 4
+        payload = {"scores": {c: score for c in CATEGORIES}, "checks": {}, "rationales": {}}
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=json.dumps(payload)))])
+
+
+def _judged_runs(tmp_path, n=3):
+    paths = []
+    for _ in range(n):
+        paths.append(
+            run_experiment(CASE, SUITE, str(tmp_path), dry_run=True, use_judge=True, judge_client=_FakeJudge(), repeats=2)
+        )
+    return paths
+
+
+def test_train_reports_held_out_error_and_round_trips(tmp_path, monkeypatch):
+    monkeypatch.chdir(REPO_ROOT)
+    samples = collect_training_samples(_judged_runs(tmp_path))
+    assert len(samples) == 54
+    model, report = train_surrogate(samples, folds=3, dim=256)
+    total = report["errors"]["total_judge"]
+    assert total["rmse"] < total["baseline_rmse"]
+
+    path = model.save(tmp_path / "surrogate.npz")
+    loaded = SurrogateJudge.load(path)
+    assert loaded.categories == CATEGORIES
+    texts = [s["output_text"] for s in samples[:4]]
+    heuristics = [s["scores.heuristics"] for s in samples[:4]]
+    np.testing.assert_allclose(loaded.predict(texts, heuristics)[0], model.predict(texts, heuristics)[0])
+
+
+def test_triage_keeps_top_and_uncertain_samples():
+    finals = [20.0, 18.0, 10.0, 17.5, 5.0]
+    spread = [0.1, 0.1, 0.1, 0.1, 3.0]
+    assert triage(finals, spread, sigma=1.0, top_n=2, margin=1.0, max_std=1.5) == [True, True, False, True, True]
+
+
+def test_triage_run_only_judges_what_can_change_the_ranking(tmp_path, monkeypatch):
+    monkeypatch.chdir(REPO_ROOT)
+    model, _ = train_surrogate(collect_training_samples(_judged_runs(tmp_path)), folds=3, dim=256)
+    judge = _FakeJudge()
+    path = run_experiment(
+        CASE, SUITE, str(tmp_path / "triaged"), dry_run=True, use_judge=True, judge_client=judge, surrogate=model
+    )
+    data = json.loads(path.read_text(encoding="utf-8"))
+    triaged = data["metadata"]["triage"]
+    assert 3 <= judge.calls == triaged["judged"] < 9
+    sources = [s["scores"]["judge"].get("source") for s in data["samples"]]
+    assert sources.count("surrogate") == 9 - judge.calls
@@ -0,0 +1,83 @@
+import json
+import shutil
+from pathlib import Path
+from types import SimpleNamespace
+
+from qolab.logging.run_store import load_run
+from qolab.watch import Watcher
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+class CountingClient:
+    def __init__(self):
+        self.calls = []
+
+    def generate(self, system, user, temperature, max_tokens=None, budget=None, repeat=0, metrics=None):
+        self.calls.append(system)
+        return f"I tried this at {temperature}. {system[-20:]} What would you change?"
+
+
+def _judge_client(calls):
+    def create(**kwargs):
+        calls.append(kwargs)
+        reply = json.dumps({"scores": {"clarity_structure": 4}, "checks": {}, "rationales": {}})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=reply))], usage=None)
+
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+def _configs(tmp_path):
+    for name in ("cases/linkedin_b2b_saas.json", "prompt_suites/linkedin_v1.json", "rubrics/judge_rubric_v1.json"):
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy(REPO_ROOT / "configs" / name, tmp_path / name)
+    keywords = tmp_path / "keywords.txt"
+    shutil.copy(REPO_ROOT / "configs/keywords/linkedin_keywords.txt", keywords)
+    case = json.loads((tmp_path / "cases/linkedin_b2b_saas.json").read_text(encoding="utf-8"))
+    case["keywords_file"] = str(keywords)
+    (tmp_path / "cases/linkedin_b2b_saas.json").write_text(json.dumps(case), encoding="utf-8")
+    return tmp_path / "cases/linkedin_b2b_saas.json", tmp_path / "prompt_suites/linkedin_v1.json", keywords
+
+
+def _watcher(tmp_path, case, suite, llm, judge_calls):
+    return Watcher(
+        str(case),
+        str(suite),
+        runs_dir=str(tmp_path / "runs"),
+        use_judge=True,
+        rubric_path=str(tmp_path / "rubrics/judge_rubric_v1.json"),
+        llm_client=llm,
+        judge_client=_judge_client(judge_calls),
+    )
+
+
+def test_only_invalidated_cells_are_recomputed(tmp_path):
+    case, suite, keywords = _configs(tmp_path)
+    llm, judge_calls = CountingClient(), []
+    watcher = _watcher(tmp_path, case, suite, llm, judge_calls)
+    first = watcher.refresh()
+    assert (first["cells"], first["generated"], first["judged"]) == (9, 9, 9)
+    assert not watcher.changed()
+    assert keywords in watcher.watched_paths()
+
+    # one variant's template changes: only its three cells are regenerated and re-judged
+    data = json.loads(suite.read_text(encoding="utf-8"))
+    data["variants"][1]["system_prompt"] += " Keep it short."
+    suite.write_text(json.dumps(data), encoding="utf-8")
+    assert watcher.changed()
+    second = watcher.refresh()
+    assert (second["generated"], second["judged"], second["reused"]) == (3, 3, 6)
+
+    # a keyword edit changes the judge prompt and the heuristics, but no generation
+    keywords.write_text(keywords.read_text(encoding="utf-8") + "\nforecast accuracy\n", encoding="utf-8")
+    third = watcher.refresh()
+    assert (third["generated"], third["judged"]) == (0, 9)
+
+    run = load_run(watcher.results_path)
+    assert len(run.samples) == 9 and all(s.scores.judge["total_judge"] == 4 for s in run.samples)
+    assert Path(third["summary"]).exists()
+
+    # a fresh watcher (e.g. after a restart) starts from the saved state
+    restarted = _watcher(tmp_path, case, suite, CountingClient(), [])
+    assert restarted.refresh()["reused"] == 9
+    assert len(llm.calls) == 12 and len(judge_calls) == 21
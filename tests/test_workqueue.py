@@ -0,0 +1,119 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+import qolab.workqueue
+from qolab.workqueue import WorkQueue, Worker
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+CASE = str(REPO_ROOT / "configs/cases/linkedin_b2b_saas.json")
+SUITE = str(REPO_ROOT / "configs/prompt_suites/linkedin_v1.json")
+
+
+def test_worker_processes_share_one_queue(tmp_path, monkeypatch):
+    monkeypatch.chdir(REPO_ROOT)
+    queue_path = tmp_path / "queue.db"
+    queue = WorkQueue(queue_path)
+    sweep = queue.enqueue(CASE, SUITE, runs_dir=str(tmp_path / "runs"), dry_run=True, repeats=2)
+
+    workers = [
+        subprocess.Popen(
+            [sys.executable, "-m", "qolab", "worker", "--queue", str(queue_path), "--idle-exit", "1"],
+            cwd=tmp_path,
+            stdout=subprocess.DEVNULL,
+        )
+        for _ in range(3)
+    ]
+    for proc in workers:
+        assert proc.wait(timeout=120) == 0
+
+    status = queue.wait(sweep, timeout=5)
+    assert status["cells"] == {"pending": 0, "leased": 0, "done": 18, "failed": 0}
+    data = json.loads(Path(status["results"]).read_text(encoding="utf-8"))
+    cells = {(s["variant_name"], s["temperature"], s["repeat"]) for s in data["samples"]}
+    assert len(cells) == len(data["samples"]) == 18
+    assert (Path(status["results"]).parent / "summary.md").exists()
+
+
+def test_expired_lease_is_retried_and_stale_owner_cannot_commit(tmp_path, monkeypatch):
+    monkeypatch.chdir(REPO_ROOT)
+    queue = WorkQueue(tmp_path / "queue.db", max_attempts=2)
+    sweep = queue.enqueue(CASE, SUITE, runs_dir=str(tmp_path / "runs"), dry_run=True)
+
+    crashed = queue.lease("crashed", lease_seconds=-1)
+    retried = queue.lease("healthy")
+    assert retried.id == crashed.id and retried.attempts == 2
+    assert not queue.complete(crashed, "crashed", {"stale": True})
+
+    worker = Worker(queue, worker_id="healthy", poll_interval=0.01)
+    queue.complete(retried, "healthy", worker.execute(retried).model_dump())
+    worker.run(idle_exit=0)
+    status = queue.status(sweep)
+    assert status["status"] == "done"
+    assert status["cells"]["done"] == 9
+
+
+def test_worker_runs_the_judge_from_queued_rubric(tmp_path, monkeypatch):
+    monkeypatch.chdir(REPO_ROOT)
+    queue = WorkQueue(tmp_path / "queue.db")
+    queue.enqueue(CASE, SUITE, runs_dir=str(tmp_path / "runs"), dry_run=True, use_judge=True)
+    reply = json.dumps({"scores": {"clarity_structure": 4}, "checks": {}, "rationales": {}})
+    completions = SimpleNamespace(
+        create=lambda **kwargs: SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=reply))])
+    )
+    worker = Worker(queue, worker_id="w")
+    worker._judge_client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    sample = worker.execute(queue.lease("w"))
+    assert sample.scores.judge["total_judge"] == 4
+
+
+def test_interrupted_collection_reuses_the_reserved_run(tmp_path, monkeypatch):
+    monkeypatch.chdir(REPO_ROOT)
+    queue = WorkQueue(tmp_path / "queue.db")
+    sweep = queue.enqueue(CASE, SUITE, runs_dir=str(tmp_path / "runs"), dry_run=True)
+    worker = Worker(queue, worker_id="crashed", poll_interval=0.01)
+    while (cell := queue.lease("crashed")) is not None:
+        queue.complete(cell, "crashed", worker.execute(cell).model_dump())
+
+    # the collector dies after writing the run but before marking the sweep done
+    def crash(results_path):
+        raise KeyboardInterrupt
+
+    with monkeypatch.context() as patch:
+        patch.setattr(qolab.workqueue, "render_summary_markdown", crash)
+        assert queue.claim_collection("crashed", lease_seconds=-1) == sweep
+        with pytest.raises(KeyboardInterrupt):
+            queue.collect(sweep, "crashed")
+    assert queue.status(sweep)["results"] is None
+
+    Worker(queue, worker_id="healthy", poll_interval=0.01).run(idle_exit=0)
+    status = queue.status(sweep)
+    assert status["status"] == "done"
+    assert [p.name for p in (tmp_path / "runs").iterdir()] == [Path(status["results"]).parent.name]
+    data = json.loads(Path(status["results"]).read_text(encoding="utf-8"))
+    assert data["metadata"]["run_id"] == Path(status["results"]).parent.name
+
+
+def test_failing_collection_is_retried_then_given_up(tmp_path, monkeypatch):
+    monkeypatch.chdir(REPO_ROOT)
+    queue = WorkQueue(tmp_path / "queue.db", max_attempts=2)
+    sweep = queue.enqueue(CASE, SUITE, runs_dir=str(tmp_path / "runs"), dry_run=True)
+    calls = []
+
+    def broken(results_path):
+        calls.append(results_path)
+        raise OSError("disk full")
+
+    monkeypatch.setattr(qolab.workqueue, "render_summary_markdown", broken)
+    # the worker survives the failures instead of crashing on every claim
+    Worker(queue, worker_id="w", poll_interval=0.01).run(idle_exit=0)
+    status = queue.wait(sweep, timeout=1)
+    assert status["status"] == "failed"
+    assert status["error"] == "OSError: disk full"
+    assert status["results"] is None
+    assert len(calls) == 2 and calls[0] == calls[1]